@@ -3,6 +3,8 @@ from django.contrib.gis.admin import OSMGeoAdmin
 from .models.user import Users, Follows, Notifications, Reports_users
 from .models.place import Places, Favorites
 from .models.post import Posts, Comments, Likes, Reports_posts
+from .models.upload import UploadSession
+from .models.image import StoredImage
 
 @admin.register(Users)
 class UsersAdmin(admin.ModelAdmin):
@@ -24,9 +26,14 @@ class NotificationsAdmin(admin.ModelAdmin):
 
 @admin.register(Places)
 class PlacesAdmin(OSMGeoAdmin):
-    list_display = ('name', 'rating', 'favorite_count')
+    list_display = ('name', 'rating', 'post_count', 'favorite_count')
     search_fields = ('name',)
     list_filter = ('rating',)
+    readonly_fields = (
+        'post_count', 'favorite_count', 'total_likes', 'latest_post', 'top_post',
+        'rating_count', 'rating_sum', 'rating_count_1', 'rating_count_2',
+        'rating_count_3', 'rating_count_4', 'rating_count_5',
+    )
 
 @admin.register(Favorites)
 class FavoritesAdmin(admin.ModelAdmin):
@@ -63,4 +70,17 @@ class ReportsUsersAdmin(admin.ModelAdmin):
 class ReportsPostsAdmin(admin.ModelAdmin):
     list_display = ('user', 'post', 'reason', 'created_at')
     search_fields = ('user__username', 'post__description', 'reason')
-    list_filter = ('created_at',)
\ No newline at end of file
+    list_filter = ('created_at',)
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'filename', 'received_size', 'total_size', 'expires_at')
+    search_fields = ('user__username', 'filename')
+    list_filter = ('created_at',)
+    readonly_fields = ('received_size',)
+
+@admin.register(StoredImage)
+class StoredImageAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256', 'name', 'source_sha256')
+    list_filter = ('created_at',)
+    readonly_fields = ('sha256', 'name', 'size', 'ref_count', 'renditions', 'source_sha256')
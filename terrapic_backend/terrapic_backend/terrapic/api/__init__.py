@@ -1,7 +1,8 @@
 from .auth import login_api, signup_api, home
 from .place import (
     NearbyPlacesView, PlaceSearchView, FavoriteView, 
-    FavoriteStatusView, get_top_photo, place_details,
+    FavoriteStatusView, get_top_photo, top_photos, spot_photos,
+    place_details, place_photos,
 )
 from .post import CreatePostView, LikeView, LikeStatusView, delete_post, update_post
 from .profile import (
@@ -13,6 +14,10 @@ from .ranking import (
     places_ranking, posts_ranking
 )
 from .search import search, search_suggestions
+from .tile import vector_tile
+from .heatmap import heatmap
+from .status import bulk_status
+from .upload import create_upload_session, upload_session, finalize_upload_session
 
 __all__ = [
     # 認証関連
@@ -26,7 +31,10 @@ __all__ = [
     'FavoriteView',
     'FavoriteStatusView',
     'get_top_photo',
+    'top_photos',
+    'spot_photos',
     'place_details',
+    'place_photos',
     
     # Post関連
     'CreatePostView',
@@ -52,4 +60,18 @@ __all__ = [
     # Search関連
     'search',
     'search_suggestions',
+
+    # タイル関連
+    'vector_tile',
+
+    # ヒートマップ関連
+    'heatmap',
+
+    # 状態取得関連
+    'bulk_status',
+
+    # アップロード関連
+    'create_upload_session',
+    'upload_session',
+    'finalize_upload_session',
 ]
\ No newline at end of file
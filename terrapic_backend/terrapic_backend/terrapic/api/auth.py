@@ -4,10 +4,11 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from django.contrib.gis.geos import Point
+from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Count
-from ..models import Places, Notifications
+from ..models import Notifications
+from ..services import PlaceService
 from ..forms import CustomSignupForm
 import logging
 
@@ -129,24 +130,13 @@ def home(request):
         user_lat = float(request.GET.get('latitude', 0))
         user_lon = float(request.GET.get('longitude', 0))
         
-        # 現在地の設定
-        user_location = Point(user_lon, user_lat, srid=4326)
-        
         # 検索半径（km）
         search_radius = 10
         
-        # 近くの場所を取得
-        nearby_places = Places.nearby_places(user_location, search_radius)
-        
-        # レスポンスデータの整形
-        places_data = [{
-            'id': place.id,
-            'name': place.name,
-            'latitude': place.location.y,
-            'longitude': place.location.x,
-            'rating': float(place.rating) if place.rating else None,
-            'distance': place.distance.km
-        } for place in nearby_places]
+        # 近くの場所を距離順に取得（件数はNEARBY_PLACES_LIMITまで）
+        places_data = PlaceService.find_nearby_places(
+            user_lat, user_lon, radius_km=search_radius
+        )
         
         # 未読通知数の取得
         unread_notifications = Notifications.objects.filter(
@@ -165,7 +155,7 @@ def home(request):
         
         return Response(response_data)
         
-    except ValueError as e:
+    except (ValueError, ValidationError) as e:
         logger.error(f"位置情報の形式が不正: {str(e)}")
         return Response(
             {'error': '位置情報の形式が不正です。'},
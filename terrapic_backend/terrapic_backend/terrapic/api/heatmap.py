@@ -0,0 +1,50 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework import status
+from ..services import HeatmapService
+from ..utils import format_api_error, validate_zoom
+import logging
+
+logger = logging.getLogger(__name__)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def heatmap(request):
+    """
+    撮影スポットの密度ヒートマップを取得するAPI
+
+    Parameters:
+        min_lat, max_lat, min_lon, max_lon: 表示範囲
+        zoom: 地図のズームレベル
+    """
+    try:
+        params = ('min_lat', 'max_lat', 'min_lon', 'max_lon', 'zoom')
+        if not all(request.GET.get(key) for key in params):
+            return Response(
+                format_api_error('min_lat, max_lat, min_lon, max_lon, zoomは必須です。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        min_lat = float(request.GET['min_lat'])
+        max_lat = float(request.GET['max_lat'])
+        min_lon = float(request.GET['min_lon'])
+        max_lon = float(request.GET['max_lon'])
+        zoom = validate_zoom(request.GET['zoom'])
+
+        data = HeatmapService.get_heatmap(
+            min_lat, max_lat, min_lon, max_lon, zoom
+        )
+        return Response(data)
+
+    except ValueError as e:
+        return Response(
+            format_api_error(str(e)),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        logger.error(f"ヒートマップ取得中にエラー: {str(e)}")
+        return Response(
+            format_api_error('ヒートマップの取得中にエラーが発生しました。'),
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -3,28 +3,19 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Avg
-from ..models import Places, Favorites, Posts, Likes
+from ..models import Places, Favorites
 from ..serializers import (
     PlaceWithPostsSerializer, TopPhotoSerializer,
-    PlaceSearchSerializer
+    PlaceSearchSerializer, PlacePhotoSerializer, ViewerState
+)
+from ..services import PlaceService, MapCacheService, CacheService
+from ..utils import (
+    format_api_error, validate_zoom, validate_location_data, build_etag, etag_matches
 )
-from ..services import PlaceService
-from ..utils import format_api_error
-import logging
-import requests
-
-logger = logging.getLogger(__name__)
-
-from rest_framework import status
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from django.contrib.gis.geos import Polygon
-from django.db.models import Count
-from django.db.models import Prefetch
-from ..models import Places, Posts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,27 +35,108 @@ class NearbyPlacesView(APIView):
             if not all([min_lat, max_lat, min_lon, max_lon]):
                 return Response({'error': 'Missing required parameters.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            places = self.get_places_by_bbox(min_lat, max_lat, min_lon, max_lon)
-            
-            places = places.annotate(
-                posts_count=Count('posts', distinct=True),
-                favorites_count=Count('favorites', distinct=True),
-            ).prefetch_related(
-                Prefetch(
-                    'posts',
-                    queryset=Posts.objects.exclude(photo_spot_location__isnull=True),
-                    to_attr='location_posts'
+            # ズームレベルの指定がある場合はレスポンスをモード付きで返す
+            zoom = request.GET.get('zoom')
+            if zoom is not None:
+                zoom = validate_zoom(zoom)
+
+                # ズームアウト時は個々の場所ではなくクラスタを返す
+                if zoom < settings.MAP_CLUSTER_MAX_ZOOM:
+                    clusters = PlaceService.cluster_places_in_bounds(
+                        float(min_lat), float(max_lat),
+                        float(min_lon), float(max_lon),
+                        zoom
+                    )
+                    return Response({
+                        'mode': 'clusters',
+                        'zoom': zoom,
+                        'clusters': clusters,
+                    })
+
+            # 前回の表示範囲の指定がある場合は差分のみを返す
+            # （前回の結果が打ち切られていた場合や差分が多すぎる場合は全件の形式で返す）
+            viewport = request.GET.get('viewport')
+            previous = [
+                request.GET.get(f'prev_{key}')
+                for key in ('min_lat', 'max_lat', 'min_lon', 'max_lon')
+            ]
+            wants_delta = bool(viewport) or all(previous)
+            order = request.GET.get('order', 'popularity')
+            if wants_delta:
+                previous_complete = None
+                if viewport:
+                    previous, previous_complete = PlaceService.decode_viewport(viewport)
+                delta = PlaceService.find_viewport_delta(
+                    (min_lat, max_lat, min_lon, max_lon),
+                    previous,
+                    limit=request.GET.get('limit'),
+                    previous_complete=previous_complete,
+                    order=order
                 )
+                if delta is not None:
+                    added, removed_ids = delta
+                    return Response({
+                        'mode': 'delta',
+                        'zoom': zoom,
+                        'added': PlaceWithPostsSerializer(
+                            added,
+                            many=True,
+                            context={'request': request}
+                        ).data,
+                        'removed': removed_ids,
+                        'truncated': False,
+                        'viewport': PlaceService.encode_viewport(
+                            min_lat, max_lat, min_lon, max_lon
+                        ),
+                    })
+
+            # 件数・並び順・カーソルを指定して場所を取得（件数はサーバー側で上限あり）
+            # タイル単位のキャッシュを優先し、範囲が広すぎる場合はデータベースを直接検索する
+            result = MapCacheService.find_places_in_bounds(
+                min_lat, max_lat, min_lon, max_lon,
+                order=order,
+                limit=request.GET.get('limit'),
+                cursor=request.GET.get('cursor')
             )
+            if result is not None:
+                places_data, next_cursor = result
+            else:
+                places, next_cursor = PlaceService.find_places_in_bounds(
+                    min_lat, max_lat, min_lon, max_lon,
+                    order=order,
+                    limit=request.GET.get('limit'),
+                    cursor=request.GET.get('cursor'),
+                    with_posts=True
+                )
+                places_data = PlaceWithPostsSerializer(
+                    places, 
+                    many=True,
+                    context={'request': request}
+                ).data
 
-            logger.debug(f"Found {places.count()} places")
+            logger.debug(f"Found {len(places_data)} places")
 
-            serializer = PlaceWithPostsSerializer(
-                places, 
-                many=True,
-                context={'request': request}
-            )
-            return Response(serializer.data)
+            # 新しいパラメータを指定したクライアントにはモード付きで返す
+            if wants_delta or any(key in request.GET for key in ('zoom', 'limit', 'order', 'cursor')):
+                return Response({
+                    'mode': 'places',
+                    'zoom': zoom,
+                    'places': places_data,
+                    'truncated': next_cursor is not None,
+                    'next_cursor': next_cursor,
+                    # 1ページ目で全件を返した場合のみ次回の差分取得に使える
+                    'viewport': PlaceService.encode_viewport(
+                        min_lat, max_lat, min_lon, max_lon,
+                        complete=not request.GET.get('cursor') and next_cursor is None
+                    ),
+                })
+
+            # 従来の配列形式では打ち切りの有無と続きのカーソルをヘッダーで返す
+            response = Response(places_data)
+            response['X-Truncated'] = 'true' if next_cursor else 'false'
+            if next_cursor:
+                response['X-Next-Cursor'] = next_cursor
+            return response
 
         except ValueError as e:
             logger.error(f"Invalid parameter values: {str(e)}")
@@ -79,31 +151,6 @@ class NearbyPlacesView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def get_places_by_bbox(self, min_lat, max_lat, min_lon, max_lon):
-        """
-        バウンディングボックス内の場所を取得する
-
-        Args:
-            min_lat (str): 最小緯度
-            max_lat (str): 最大緯度
-            min_lon (str): 最小経度
-            max_lon (str): 最大経度
-
-        Returns:
-            QuerySet: 条件に合致する場所のクエリセット
-        """
-        try:
-            min_lat, max_lat = float(min_lat), float(max_lat)
-            min_lon, max_lon = float(min_lon), float(max_lon)
-            
-            bbox = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
-            places = Places.objects.filter(location__within=bbox)
-            
-            return places
-            
-        except ValueError:
-            raise ValueError('緯度経度の値が不正です')
-
 
 class PlaceSearchView(APIView):
     """投稿用の場所検索APIビュー"""
@@ -156,11 +203,13 @@ class FavoriteView(APIView):
             
             if not created:
                 favorite.delete()
+                place.refresh_from_db(fields=['favorite_count'])
                 return Response({
                     'status': 'unfavorited',
                     'favorite_count': place.favorite_count
                 })
-                
+
+            place.refresh_from_db(fields=['favorite_count'])
             return Response({
                 'status': 'favorited',
                 'favorite_count': place.favorite_count
@@ -203,12 +252,22 @@ class FavoriteStatusView(APIView):
 def get_top_photo(request, place_id):
     """場所のトップ写真を取得するAPI"""
     try:
-        # 場所の存在確認
-        place = get_object_or_404(Places, id=place_id)
-        
         # 写真スポットの位置情報を取得
         latitude = request.query_params.get('latitude')
         longitude = request.query_params.get('longitude')
+
+        # 場所の存在確認（トップ投稿も合わせて取得する）
+        # 削除された場所に304を返さないよう、ETagの確認より前に行う
+        place = Places.objects.select_related('top_post').get(id=place_id)
+
+        # 場所のバージョンが変わっていなければ304を返す
+        etag = build_etag(
+            'top_photo', place_id,
+            CacheService.get_version('place', place_id),
+            latitude, longitude
+        )
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
         
         if latitude and longitude:
             # 特定の撮影位置での投稿を取得
@@ -217,7 +276,7 @@ def get_top_photo(request, place_id):
             )
         else:
             # 最もいいねの多い投稿を取得
-            post = PlaceService.get_top_rated_photo(place_id)
+            post = place.top_post
 
         if not post:
             return Response(
@@ -232,8 +291,13 @@ def get_top_photo(request, place_id):
             'name': place.name,
             'favorite_count': place.favorite_count,
             'rating': str(place.rating) if place.rating is not None else '未評価'
-        })
+        }, headers={'ETag': etag})
 
+    except Places.DoesNotExist:
+        return Response(
+            {'error': '場所が見つかりません'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     except Exception as e:
         logger.error(f"トップ写真取得中にエラー: {str(e)}")
         return Response(
@@ -241,84 +305,235 @@ def get_top_photo(request, place_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def _build_place_details_body(request, place_id):
+    """
+    場所の詳細情報のうち閲覧ユーザーに依存しない部分を生成する
+
+    Returns:
+        dict: レスポンスの本文（写真のいいね状態は含まない）
+    """
+    place = Places.objects.select_related('top_post').get(id=place_id)
+
+    # 評価の分布は場所に保持している集計値から取得する
+    total_ratings = place.rating_count
+
+    # 写真は最初のページのみ返し、続きは写真一覧APIで取得する
+    photos, photos_next_cursor = PlaceService.get_place_photos(place.id)
+
+    # トップ画像の取得（いいね数が最も多い投稿の画像）
+    top_post = place.top_post
+    image_url = None
+    if top_post and top_post.photo_image:
+        image_url = request.build_absolute_uri(top_post.photo_url('full'))
+
+    if total_ratings > 0:
+        # 各評価の件数を取得
+        ratings_distribution = place.rating_histogram
+
+        rating_percentages = {
+            'five_star': round((ratings_distribution[5] / total_ratings) * 100, 1),
+            'four_star': round((ratings_distribution[4] / total_ratings) * 100, 1),
+            'three_star': round((ratings_distribution[3] / total_ratings) * 100, 1),
+            'two_star': round((ratings_distribution[2] / total_ratings) * 100, 1),
+            'one_star': round((ratings_distribution[1] / total_ratings) * 100, 1),
+        }
+    else:
+        rating_percentages = {f"{i}_star": 0.0 for i in range(1, 6)}
+
+    # 閲覧ユーザーのいいね状態は含めず、レスポンス時に反映する
+    photo_data = PlacePhotoSerializer(
+        photos,
+        many=True,
+        context={'request': request, 'viewer_state': False}
+    ).data
+
+    return {
+        'id': place.id,
+        'name': place.name,
+        'image_url': image_url,  # トップ画像URLを追加
+        'rating': str(place.rating) if place.rating is not None else 'N/A',
+        'total_reviews': total_ratings,
+        'rating_distribution': rating_percentages,
+        'favorite_count': place.favorite_count,
+        'photos': [dict(photo) for photo in photo_data],
+        'photos_next_cursor': photos_next_cursor,
+        'latitude': place.location.y,
+        'longitude': place.location.x,
+    }
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def top_photos(request):
+    """
+    複数の場所のトップ写真をまとめて取得するAPI
+
+    地図に表示中のマーカーの情報ウィンドウを1回のリクエストで先読みするために使用する
+
+    Parameters:
+        ids: カンマ区切りの場所ID（上限はTOP_PHOTOS_MAX_IDS）
+    """
+    try:
+        try:
+            place_ids = list(dict.fromkeys(
+                int(place_id) for place_id in request.GET.get('ids', '').split(',')
+                if place_id.strip()
+            ))
+        except ValueError:
+            return Response(
+                format_api_error('場所IDが不正です。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not place_ids:
+            return Response(
+                format_api_error('場所IDを指定してください。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(place_ids) > settings.TOP_PHOTOS_MAX_IDS:
+            return Response(
+                format_api_error(
+                    f'場所IDは{settings.TOP_PHOTOS_MAX_IDS}件以内で指定してください。'
+                ),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # いずれの場所のバージョンも変わっていなければ304を返す
+        versions = CacheService.get_versions('place', place_ids)
+        etag = build_etag(
+            'top_photos',
+            *(f'{place_id}:{versions[place_id]}' for place_id in place_ids)
+        )
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        places = PlaceService.get_top_photos(place_ids)
+
+        places_data = []
+        for place in places:
+            top_post = place.top_post
+            places_data.append({
+                'id': place.id,
+                'image_url': request.build_absolute_uri(
+                    top_post.photo_url('card')
+                ) if top_post and top_post.photo_image else None,
+                'name': place.name,
+                'favorite_count': place.favorite_count,
+                'rating': str(place.rating) if place.rating is not None else '未評価'
+            })
+
+        return Response({'places': places_data}, headers={'ETag': etag})
+
+    except Exception as e:
+        logger.error(f"トップ写真の一括取得中にエラー: {str(e)}")
+        return Response(
+            format_api_error('写真の取得中にエラーが発生しました。'),
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def spot_photos(request):
+    """
+    地図に表示中の撮影スポットの写真をまとめて取得するAPI
+
+    Parameters:
+        spots: 「緯度,経度」をセミコロンで区切った撮影位置（上限はSPOT_PHOTOS_MAX_SPOTS）
+        place_id: 場所のID（オプション。指定した場合はその場所の投稿に限定する）
+    """
+    try:
+        try:
+            spots = []
+            for spot in request.GET.get('spots', '').split(';'):
+                if not spot.strip():
+                    continue
+                latitude, longitude = (float(value) for value in spot.split(','))
+                validate_location_data(latitude, longitude)
+                spots.append((latitude, longitude))
+            place_id = request.GET.get('place_id')
+            place_id = int(place_id) if place_id else None
+        except (ValueError, ValidationError):
+            return Response(
+                format_api_error('撮影位置の指定が不正です。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not spots:
+            return Response(
+                format_api_error('撮影位置を指定してください。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(spots) > settings.SPOT_PHOTOS_MAX_SPOTS:
+            return Response(
+                format_api_error(
+                    f'撮影位置は{settings.SPOT_PHOTOS_MAX_SPOTS}件以内で指定してください。'
+                ),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        posts = PlaceService.get_photos_at_locations(spots, place_id=place_id)
+
+        photos_data = [{
+            'latitude': latitude,
+            'longitude': longitude,
+            'post_id': post.id if post else None,
+            'place_id': post.place_id if post else None,
+            'image_url': request.build_absolute_uri(
+                post.photo_url('thumb')
+            ) if post and post.photo_image else None,
+        } for (latitude, longitude), post in zip(spots, posts)]
+
+        return Response({'photos': photos_data})
+
+    except Exception as e:
+        logger.error(f"撮影スポットの写真の一括取得中にエラー: {str(e)}")
+        return Response(
+            format_api_error('写真の取得中にエラーが発生しました。'),
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def place_details(request, place_id):
     """
     場所の詳細情報を取得するAPI
+
+    閲覧ユーザーに依存しない本文は場所のバージョンごとにキャッシュして共有し、
+    写真のいいね状態のみをレスポンス時に閲覧ユーザーごとに反映する
     """
     try:
-        place = Places.objects.get(id=place_id)
-        
-        # 評価の分布を計算
-        posts = Posts.objects.filter(place=place)
-        total_ratings = posts.count()
-
-        # トップ画像の取得（いいね数が最も多い投稿の画像）
-        top_post = posts.order_by('-like_count', '-created_at').first()
-        image_url = None
-        if top_post and top_post.photo_image:
-            image_url = request.build_absolute_uri(top_post.photo_image.url)
-
-        if total_ratings > 0:
-            # 各評価の件数を取得
-            ratings_distribution = {
-                rating: posts.filter(rating=rating).count()
-                for rating in range(1, 6)
-            }
-            
-            rating_percentages = {
-                'five_star': round((ratings_distribution[5] / total_ratings) * 100, 1),
-                'four_star': round((ratings_distribution[4] / total_ratings) * 100, 1),
-                'three_star': round((ratings_distribution[3] / total_ratings) * 100, 1),
-                'two_star': round((ratings_distribution[2] / total_ratings) * 100, 1),
-                'one_star': round((ratings_distribution[1] / total_ratings) * 100, 1),
-            }
-        else:
-            rating_percentages = {f"{i}_star": 0.0 for i in range(1, 6)}
-
-        # 写真の取得（いいね順）
-        photos = posts.order_by('-like_count', '-created_at')
-        photo_data = [{
-            'id': post.id,
-            'url': request.build_absolute_uri(post.photo_image.url),
-            'likes': post.like_count,
-            'is_liked': Likes.objects.filter(
-                user=request.user, 
-                post=post
-            ).exists() if request.user.is_authenticated else False,
-            'created_at': post.created_at.isoformat(),
-            'user': {
-                'id': post.user.id,
-                'username': post.user.username,
-                'profile_image': request.build_absolute_uri(
-                    post.user.profile_image.url
-                ) if post.user.profile_image else None,
-            },
-            'description': post.description,
-            'photo_spot_location': {
-                'type': 'Point',
-                'coordinates': [
-                    post.photo_spot_location.x,
-                    post.photo_spot_location.y
-                ]
-            } if post.photo_spot_location else None
-        } for post in photos]
-
+        # 削除された場所に304やキャッシュした本文を返さないよう、先に存在を確認する
+        if not Places.objects.filter(id=place_id).exists():
+            raise Places.DoesNotExist
+
+        place_version = CacheService.get_version('place', place_id)
+
+        # いいね状態は閲覧ユーザーごとに異なるためETagにユーザーIDを含める
+        viewer_id = request.user.id if request.user.is_authenticated else 0
+        etag = build_etag('place_details', place_id, place_version, viewer_id)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        # 画像URLは絶対URLのため、キャッシュはスキーム・ホストごとに分ける
+        cache_key = (
+            f'place_details_{place_id}_{place_version}_'
+            f'{request.scheme}_{request.get_host()}'
+        )
+        body = cache.get(cache_key)
+        if body is None:
+            body = _build_place_details_body(request, place_id)
+            cache.set(cache_key, body, settings.PLACE_DETAILS_CACHE_TIMEOUT)
+
+        # 閲覧ユーザーのいいね状態をまとめて取得して反映する
+        viewer_state = ViewerState.for_request(request).prime(
+            post_ids=[photo['id'] for photo in body['photos']]
+        )
         response_data = {
-            'id': place.id,
-            'name': place.name,
-            'image_url': image_url,  # トップ画像URLを追加
-            'rating': str(place.rating) if place.rating is not None else 'N/A',
-            'total_reviews': total_ratings,
-            'rating_distribution': rating_percentages,
-            'favorite_count': place.favorite_count,
-            'photos': photo_data,
-            'latitude': place.location.y,
-            'longitude': place.location.x,
+            **body,
+            'photos': [
+                {**photo, 'is_liked': viewer_state.is_liked(photo['id'])}
+                for photo in body['photos']
+            ],
         }
-        
-        return Response(response_data)
+
+        return Response(response_data, headers={'ETag': etag})
 
     except Places.DoesNotExist:
         return Response(
@@ -330,4 +545,50 @@ def place_details(request, place_id):
         return Response(
             {"error": "内部サーバーエラー"}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def place_photos(request, place_id):
+    """
+    場所の写真一覧をいいね数順にページングして取得するAPI
+
+    Parameters:
+        cursor: 前回のレスポンスの next_cursor（オプション）
+        limit: 取得件数（オプション）
+    """
+    try:
+        if not Places.objects.filter(id=place_id).exists():
+            return Response(
+                format_api_error('場所が見つかりません'),
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        photos, next_cursor = PlaceService.get_place_photos(
+            place_id,
+            cursor=request.GET.get('cursor'),
+            limit=request.GET.get('limit')
+        )
+
+        serializer = PlacePhotoSerializer(
+            photos,
+            many=True,
+            context={'request': request}
+        )
+
+        return Response({
+            'photos': serializer.data,
+            'next_cursor': next_cursor,
+        })
+
+    except ValueError as e:
+        return Response(
+            format_api_error(str(e)),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        logger.error(f"場所の写真一覧取得中にエラー: {str(e)}")
+        return Response(
+            format_api_error('写真の取得中にエラーが発生しました。'),
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -135,7 +135,7 @@ class LikeStatusView(APIView):
             post_image_url = None
             if post.photo_image:
                 post_image_url = request.build_absolute_uri(
-                    post.photo_image.url
+                    post.photo_url('full')
                 )
             
             return Response({
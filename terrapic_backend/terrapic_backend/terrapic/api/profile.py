@@ -6,11 +6,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.core.paginator import Paginator
-from django.db.models import Count, Sum
-from ..models import Users, Follows, Posts, Places, Favorites
-from ..serializers import ProfileSerializer, PostSerializer
-from ..services import ProfileService, PostService
-from ..utils import format_api_error
+from ..models import Users, Follows, Posts
+from ..serializers import ProfileSerializer, PostSerializer, ViewerState
+from ..services import ProfileService, PostService, CacheService
+from ..utils import format_api_error, build_etag, etag_matches
 import logging
 
 
@@ -23,15 +22,24 @@ def profile(request):
     ログインユーザーのプロフィール情報を取得するAPI
     """
     try:
+        # ページネーション情報
+        page = int(request.GET.get('page', 1))
+        posts_per_page = 12
+
+        # プロフィールのバージョンが変わっていなければ304を返す
+        etag = build_etag(
+            'profile', request.user.id,
+            CacheService.get_version('user', request.user.id),
+            page
+        )
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
         # プロフィール情報と統計データの取得
         profile_data = ProfileService.get_profile_details(
             user_id=request.user.id
         )
 
-        # ページネーション情報
-        page = int(request.GET.get('page', 1))
-        posts_per_page = 12
-
         # 投稿データの取得
         posts, total_posts = PostService.get_user_posts(
             user_id=request.user.id,
@@ -39,10 +47,11 @@ def profile(request):
             per_page=posts_per_page
         )
 
+        # 投稿一覧はグリッド表示のため小さい縮小画像を返す
         posts_serializer = PostSerializer(
             posts,
             many=True,
-            context={'request': request}
+            context={'request': request, 'photo_rendition': 'thumb'}
         )
 
         response_data = {
@@ -53,7 +62,7 @@ def profile(request):
             'statistics': profile_data['statistics']
         }
 
-        return Response(response_data)
+        return Response(response_data, headers={'ETag': etag})
 
     except Exception as e:
         logger.error(f"プロフィール取得中にエラー: {str(e)}")
@@ -107,13 +116,22 @@ def user_profile(request, user_id):
     指定したユーザーのプロフィール情報を取得するAPI
     """
     try:
-        # プロフィール情報と統計データの取得
-        profile_data = ProfileService.get_profile_details(user_id)
-
         # ページネーション情報
         page = int(request.GET.get('page', 1))
         posts_per_page = 12
 
+        # いいね・フォロー状態は閲覧ユーザーごとに異なるためETagにユーザーIDを含める
+        etag = build_etag(
+            'user_profile', user_id,
+            CacheService.get_version('user', user_id),
+            request.user.id, page
+        )
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        # プロフィール情報と統計データの取得
+        profile_data = ProfileService.get_profile_details(user_id)
+
         # 投稿データの取得
         posts, total_posts = PostService.get_user_posts(
             user_id=user_id,
@@ -129,14 +147,16 @@ def user_profile(request, user_id):
 
         response_data = {
             'profile': ProfileSerializer(profile_data['user']).data,
-            'posts': PostSerializer(posts, many=True, context={'request': request}).data,
+            'posts': PostSerializer(
+                posts, many=True, context={'request': request, 'photo_rendition': 'thumb'}
+            ).data,
             'has_next': (page * posts_per_page) < total_posts,
             'total_posts': total_posts,
             'is_following': is_following,
             'statistics': profile_data['statistics']
         }
 
-        return Response(response_data)
+        return Response(response_data, headers={'ETag': etag})
 
     except Users.DoesNotExist:
         return Response(
@@ -204,6 +224,11 @@ def get_followers(request, user_id):
             per_page=per_page
         )
         
+        # 一覧のユーザーのフォロー状態をまとめて取得する
+        viewer_state = ViewerState.for_request(request).prime(
+            user_ids=[follow.follower_id for follow in followers]
+        )
+
         followers_data = [{
             'id': follow.follower.id,
             'username': follow.follower.username,
@@ -211,10 +236,7 @@ def get_followers(request, user_id):
             'profile_image': request.build_absolute_uri(
                 follow.follower.profile_image.url
             ) if follow.follower.profile_image else None,
-            'is_following': Follows.objects.filter(
-                follower=request.user,
-                followed=follow.follower
-            ).exists()
+            'is_following': viewer_state.is_following(follow.follower_id)
         } for follow in followers]
         
         return Response({
@@ -247,6 +269,11 @@ def get_following(request, user_id):
             per_page=per_page
         )
         
+        # 一覧のユーザーのフォロー状態をまとめて取得する
+        viewer_state = ViewerState.for_request(request).prime(
+            user_ids=[follow.followed_id for follow in following]
+        )
+
         following_data = [{
             'id': follow.followed.id,
             'username': follow.followed.username,
@@ -254,10 +281,7 @@ def get_following(request, user_id):
             'profile_image': request.build_absolute_uri(
                 follow.followed.profile_image.url
             ) if follow.followed.profile_image else None,
-            'is_following': Follows.objects.filter(
-                follower=request.user,
-                followed=follow.followed
-            ).exists()
+            'is_following': viewer_state.is_following(follow.followed_id)
         } for follow in following]
         
         return Response({
@@ -289,7 +313,9 @@ def profile_likes(request):
         paginator = Paginator(liked_posts, posts_per_page)
         page_obj = paginator.get_page(page)
         
-        serializer = PostSerializer(page_obj, many=True, context={'request': request})
+        serializer = PostSerializer(
+            page_obj, many=True, context={'request': request, 'photo_rendition': 'thumb'}
+        )
         
         return Response({
             'posts': serializer.data,
@@ -306,48 +332,61 @@ def profile_likes(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def profile_favorites(request):
-    """ユーザーがお気に入りした場所を取得するエンドポイント"""
+    """
+    ユーザーがお気に入りした場所を取得するエンドポイント
+
+    Parameters:
+        cursor: 前回のレスポンスの next_cursor（オプション）
+        page: ページ番号（cursorを指定しない場合に使用）
+    """
     try:
         user = request.user
         page = int(request.GET.get('page', 1))
         places_per_page = 10
         
-        favorite_places = Places.objects.filter(
-            favorites__user=user
-        ).annotate(
-            post_count=Count('posts'),
-            total_likes=Sum('posts__like_count')  # 総いいね数を追加
-        ).order_by('-favorites__created_at')
-        
-        paginator = Paginator(favorite_places, places_per_page)
-        page_obj = paginator.get_page(page)
+        # 場所・トップ投稿を結合した1回のクエリで取得する
+        favorites, next_cursor, total_places = ProfileService.get_favorite_places(
+            user_id=user.id,
+            cursor=request.GET.get('cursor'),
+            page=page,
+            per_page=places_per_page
+        )
         
         places_data = []
-        for place in page_obj:
-            # トップ投稿を取得
-            top_post = Posts.objects.filter(
-                place=place
-            ).order_by('-like_count', '-created_at').first()
+        for favorite in favorites:
+            place = favorite.place
+            # トップ投稿は場所に保持しているものを使用する
+            top_post = place.top_post
             
             places_data.append({
                 'id': place.id,
                 'name': place.name,
                 'latest_image': request.build_absolute_uri(
-                    top_post.photo_image.url
+                    top_post.photo_url('card')
                 ) if top_post and top_post.photo_image else None,
                 'post_count': place.post_count,
                 'rating': place.rating,
                 'latitude': place.location.y if place.location else None,
                 'longitude': place.location.x if place.location else None,
-                'favorite_count': Favorites.objects.filter(place=place).count(),
-                'total_likes': place.total_likes or 0,  # 総いいね数を追加
+                'favorite_count': place.favorite_count,
+                'total_likes': place.total_likes,
             })
         
-        return Response({
+        response_data = {
             'places': places_data,
-            'has_next': page_obj.has_next(),
-            'total_places': favorite_places.count(),
-        })
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor,
+        }
+        # 総数はページ番号指定時のみ返す
+        if total_places is not None:
+            response_data['total_places'] = total_places
+
+        return Response(response_data)
+    except ValueError as e:
+        return Response(
+            format_api_error(str(e)),
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"お気に入り場所取得中にエラー: {str(e)}")
         return Response(
@@ -2,16 +2,33 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
 from ..serializers import (
     PlaceRankingSerializer,
     PostRankingSerializer,
 )
-from ..services import PlaceService, PostService, ProfileService
-from ..utils import format_api_error
+from ..services import PlaceService, PostService, ProfileService, CacheService
+from ..utils import format_api_error, build_etag, etag_matches
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _ranking_etag(kind, period, limit):
+    """
+    ランキングのETagを生成する
+
+    期間指定のランキングは書き込みがなくても集計範囲が移動するため、
+    一定時間ごとにETagが変わるようにする
+    """
+    window = 0
+    if period != 'all':
+        window = int(time.time() // settings.RANKING_ETAG_WINDOW)
+    return build_etag(
+        'ranking', kind, CacheService.get_version('ranking', kind),
+        period, limit, window
+    )
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def places_ranking(request):
@@ -25,6 +42,11 @@ def places_ranking(request):
     try:
         period = request.GET.get('period', 'all')
         limit = int(request.GET.get('limit', 10))
+
+        # ランキングのバージョンが変わっていなければ304を返す
+        etag = _ranking_etag('places', period, limit)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
         
         # PlaceServiceを使用してランキングデータを取得
         ranked_places = PlaceService.get_ranking(
@@ -38,7 +60,7 @@ def places_ranking(request):
             context={'request': request}
         )
         
-        return Response(serializer.data)
+        return Response(serializer.data, headers={'ETag': etag})
 
     except ValueError as e:
         return Response(
@@ -65,6 +87,11 @@ def posts_ranking(request):
     try:
         period = request.GET.get('period', 'all')
         limit = int(request.GET.get('limit', 10))
+
+        # ランキングのバージョンが変わっていなければ304を返す
+        etag = _ranking_etag('posts', period, limit)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
         
         # PostServiceを使用してランキングデータを取得
         ranked_posts = PostService.get_ranking(
@@ -78,7 +105,7 @@ def posts_ranking(request):
             context={'request': request}
         )
         
-        return Response(serializer.data)
+        return Response(serializer.data, headers={'ETag': etag})
 
     except ValueError as e:
         return Response(
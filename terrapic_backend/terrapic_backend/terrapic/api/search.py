@@ -73,9 +73,7 @@ def search(request):
                     SearchSerializer.format_place(
                         place, 
                         request, 
-                        top_post=getattr(place, 'top_posts', [])[0] 
-                            if hasattr(place, 'top_posts') and place.top_posts 
-                            else None
+                        top_post=place.top_post
                     )
                     for place in places
                 ]
@@ -0,0 +1,87 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from django.conf import settings
+from ..models import Posts, Places
+from ..serializers import ViewerState
+from ..utils import format_api_error
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _parse_ids(value, label):
+    """
+    リクエストのIDリストを検証して重複のない整数のリストに変換する
+
+    Raises:
+        ValueError: IDの指定が不正な場合
+    """
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ValueError(f'{label}はリストで指定してください。')
+    try:
+        ids = list(dict.fromkeys(int(item) for item in value))
+    except (TypeError, ValueError):
+        raise ValueError(f'{label}が不正です。')
+    if len(ids) > settings.STATUS_BULK_MAX_IDS:
+        raise ValueError(
+            f'{label}は{settings.STATUS_BULK_MAX_IDS}件以内で指定してください。'
+        )
+    return ids
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_status(request):
+    """
+    複数の投稿・場所のいいね・お気に入り状態と集計値をまとめて取得するAPI
+
+    アプリがフォアグラウンドに戻った際に、表示中のグリッド・地図の状態を
+    1回のリクエストで更新するために使用する
+
+    Request Body:
+        post_ids: 投稿IDのリスト（オプション）
+        place_ids: 場所IDのリスト（オプション）
+    """
+    try:
+        post_ids = _parse_ids(request.data.get('post_ids'), '投稿ID')
+        place_ids = _parse_ids(request.data.get('place_ids'), '場所ID')
+
+        # 閲覧ユーザーのいいね・お気に入り状態を関係ごとに1回のクエリで取得する
+        viewer_state = ViewerState.for_request(request).prime(
+            post_ids=post_ids, place_ids=place_ids
+        )
+
+        like_counts = dict(Posts.objects.filter(
+            id__in=post_ids
+        ).values_list('id', 'like_count')) if post_ids else {}
+        favorite_counts = dict(Places.objects.filter(
+            id__in=place_ids
+        ).values_list('id', 'favorite_count')) if place_ids else {}
+
+        # 存在しない投稿・場所は結果に含めない
+        return Response({
+            'posts': [{
+                'id': post_id,
+                'is_liked': viewer_state.is_liked(post_id),
+                'like_count': like_counts[post_id],
+            } for post_id in post_ids if post_id in like_counts],
+            'places': [{
+                'id': place_id,
+                'is_favorited': viewer_state.is_favorited(place_id),
+                'favorite_count': favorite_counts[place_id],
+            } for place_id in place_ids if place_id in favorite_counts],
+        })
+
+    except ValueError as e:
+        return Response(
+            format_api_error(str(e)),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        logger.error(f"状態の一括取得中にエラー: {str(e)}")
+        return Response(
+            format_api_error('状態の取得中にエラーが発生しました。'),
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_GET
+from ..services import TileService
+from ..utils import format_api_error, validate_tile
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ベクタータイルのMIMEタイプ
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+@require_GET
+def vector_tile(request, z, x, y):
+    """
+    場所と撮影スポットのベクタータイル（MVT）を取得するAPI
+
+    バイナリを返すため、DRFのレンダラーを通さないDjangoビューとして実装
+
+    Parameters:
+        v: タイルのバージョン（オプション。一致する場合は長期キャッシュ可能）
+    """
+    try:
+        validate_tile(z, x, y, max_zoom=settings.MAP_TILE_MAX_ZOOM)
+    except ValueError as e:
+        return JsonResponse(format_api_error(str(e)), status=400)
+
+    try:
+        # バージョンが変わっていなければタイルを生成せずに304を返す
+        version = TileService.get_tile_version(z, x, y)
+        etag = f'"{version}"'
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        tile, version = TileService.get_tile(z, x, y)
+
+        response = HttpResponse(tile, content_type=MVT_CONTENT_TYPE)
+        response['ETag'] = f'"{version}"'
+        response['X-Tile-Version'] = str(version)
+
+        # バージョン指定のURLはタイル内容が変わらないため長期キャッシュ可能
+        if request.GET.get('v') == str(version):
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={settings.MAP_TILE_HTTP_MAX_AGE}'
+
+        return response
+
+    except Exception as e:
+        logger.error(f"ベクタータイル取得中にエラー: {str(e)}")
+        return JsonResponse(
+            format_api_error('タイルの取得中にエラーが発生しました。', 500),
+            status=500
+        )
@@ -0,0 +1,191 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from django.core.exceptions import ValidationError
+from ..models import UploadSession
+from ..serializers import PostSerializer
+from ..services import UploadService, UploadOffsetError
+from ..utils import format_api_error
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Content-Rangeヘッダーの形式（bytes 開始位置-終了位置/全体のバイト数）
+_CONTENT_RANGE_PATTERN = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+def _session_data(session):
+    """アップロードセッションのレスポンスデータを生成する"""
+    return {
+        'id': str(session.id),
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'received_size': session.received_size,
+        'expires_at': session.expires_at,
+    }
+
+def _offset_error_response(error):
+    """開始位置の不一致を受信済みのバイト数とともに返す"""
+    body = format_api_error(str(error), status.HTTP_409_CONFLICT)
+    body['received_size'] = error.received_size
+    return Response(body, status=status.HTTP_409_CONFLICT)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload_session(request):
+    """
+    再開可能な画像アップロードのセッションを作成するAPI
+
+    Request Body:
+        filename: ファイル名
+        total_size: ファイル全体のバイト数
+    """
+    try:
+        session = UploadService.create_session(
+            user=request.user,
+            filename=request.data.get('filename'),
+            total_size=request.data.get('total_size')
+        )
+        return Response(_session_data(session), status=status.HTTP_201_CREATED)
+
+    except ValueError as e:
+        return Response(
+            format_api_error(str(e)),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        logger.error(f"アップロードセッション作成中にエラー: {str(e)}")
+        return Response(
+            format_api_error('アップロードの開始中にエラーが発生しました。'),
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_session(request, session_id):
+    """
+    アップロードセッションの受信状況の取得・バイト列の送信・中止を行うAPI
+
+    GET: 受信済みのバイト数を取得する（再開時はこの位置から送信する）
+    PUT: Content-Rangeヘッダーで範囲を指定してバイト列を送信する
+    DELETE: アップロードを中止する
+    """
+    try:
+        if request.method == 'DELETE':
+            UploadService.delete_session(request.user, session_id)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if request.method == 'GET':
+            session = UploadService.get_session(request.user, session_id)
+            return Response(_session_data(session))
+
+        match = _CONTENT_RANGE_PATTERN.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response(
+                format_api_error('Content-Rangeヘッダーの形式が不正です。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end, total = (int(value) for value in match.groups())
+        if end < start:
+            return Response(
+                format_api_error('Content-Rangeヘッダーの範囲が不正です。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        session = UploadService.get_session(request.user, session_id)
+        if total != session.total_size:
+            return Response(
+                format_api_error('ファイルサイズがセッションと一致しません。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # リクエストボディはメモリに読み込まず、ストリームから一時ファイルに書き込む
+        session = UploadService.append_chunk(
+            user=request.user,
+            session_id=session_id,
+            offset=start,
+            stream=request.stream,
+            length=end - start + 1
+        )
+        return Response(_session_data(session))
+
+    except UploadSession.DoesNotExist:
+        return Response(
+            format_api_error('アップロードが見つかりません'),
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except UploadOffsetError as e:
+        return _offset_error_response(e)
+    except ValueError as e:
+        return Response(
+            format_api_error(str(e)),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        logger.error(f"アップロード処理中にエラー: {str(e)}")
+        return Response(
+            format_api_error('アップロードの処理中にエラーが発生しました。'),
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def finalize_upload_session(request, session_id):
+    """
+    受信が完了したアップロードから投稿を作成するAPI
+
+    Request Body:
+        place_data: 場所情報（name, latitude, longitude）
+        description: 説明文
+        rating: 評価（オプション）
+        weather: 天気（オプション）
+        season: 季節（オプション）
+    """
+    try:
+        place_data = request.data.get('place_data') or {}
+        if isinstance(place_data, str):
+            place_data = json.loads(place_data)
+        if not place_data:
+            return Response(
+                format_api_error('場所情報は必須です。'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        post = UploadService.finalize(
+            user=request.user,
+            session_id=session_id,
+            place_data=place_data,
+            description=request.data.get('description', ''),
+            rating=request.data.get('rating'),
+            weather=request.data.get('weather'),
+            season=request.data.get('season')
+        )
+
+        serializer = PostSerializer(post, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    except UploadSession.DoesNotExist:
+        return Response(
+            format_api_error('アップロードが見つかりません'),
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except UploadOffsetError as e:
+        return _offset_error_response(e)
+    except ValidationError as e:
+        return Response(
+            format_api_error(e.messages[0]),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except ValueError as e:
+        return Response(
+            format_api_error(str(e)),
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        logger.error(f"アップロードからの投稿作成中にエラー: {str(e)}")
+        return Response(
+            format_api_error('投稿の作成中にエラーが発生しました。'),
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from terrapic.models import Places, Posts
+
+
+class Command(BaseCommand):
+    """
+    既存の場所・投稿の空間セルIDを位置情報から計算して保存するコマンド
+    """
+    help = '場所・投稿の空間セルIDを位置情報から計算して保存します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='1回の更新で処理する件数'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='計算済みのレコードも含めてすべて再計算する'
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            (Places, 'location', '場所'),
+            (Posts, 'photo_spot_location', '投稿'),
+        ]
+        for model, location_field, label in targets:
+            updated = self._backfill(
+                model, location_field,
+                options['batch_size'], options['all']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{updated}件の{label}の空間セルIDを更新しました'
+            ))
+
+    def _backfill(self, model, location_field, batch_size, recompute):
+        """
+        主キー順にバッチで空間セルIDを更新する
+        """
+        queryset = model.objects.exclude(**{f'{location_field}__isnull': True})
+        if not recompute:
+            missing = Q()
+            for field in model.CELL_FIELDS:
+                missing |= Q(**{f'{field}__isnull': True})
+            queryset = queryset.filter(missing)
+
+        queryset = queryset.only('id', location_field, *model.CELL_FIELDS).order_by('id')
+
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for obj in batch:
+                obj.update_cells()
+            with transaction.atomic():
+                model.objects.bulk_update(batch, model.CELL_FIELDS)
+            updated += len(batch)
+            last_id = batch[-1].id
+        return updated
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from terrapic.services import UploadService
+
+
+class Command(BaseCommand):
+    """
+    期限切れのアップロードセッションと受信途中の一時ファイルを削除するコマンド
+
+    cronなどで定期実行する
+    """
+    help = '期限切れのアップロードセッションを削除します'
+
+    def handle(self, *args, **options):
+        deleted, orphans = UploadService.delete_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted}件の期限切れのアップロードセッションと'
+            f'{orphans}件のセッションのない一時ファイルを削除しました'
+        ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from terrapic.services import ImageService
+import time
+
+
+class Command(BaseCommand):
+    """
+    縮小画像が未生成の投稿写真のメタデータを除去し、縮小画像を生成するコマンド
+
+    投稿時のバックグラウンド生成に失敗した投稿や既存の投稿の処理に使用する。
+    cronなどで定期実行するか、--intervalを指定して常駐させる。
+    生成に繰り返し失敗した投稿は--retry-failedを指定した場合のみ再処理する
+    """
+    help = '縮小画像が未生成の投稿写真の縮小画像を生成します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='1回に処理する投稿数'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='指定した秒数ごとに処理を繰り返す（省略時は1回のみ実行）'
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='失敗回数の上限に達した投稿も再処理する'
+        )
+
+    def handle(self, *args, **options):
+        retry_failed = options['retry_failed']
+        while True:
+            generated, failed = ImageService.generate_pending_renditions(
+                options['batch_size'], retry_failed=retry_failed
+            )
+            # 失敗回数のリセットは最初の1回のみ行う
+            retry_failed = False
+            self.stdout.write(self.style.SUCCESS(
+                f'{generated}件の投稿の縮小画像を生成しました（失敗: {failed}件）'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from terrapic.models import Places
+
+
+class Command(BaseCommand):
+    """
+    場所の評価（平均・合計・件数・分布）を投稿から一括で再計算するコマンド
+
+    評価は投稿の作成・更新・削除時に差分で更新されるため、
+    ずれが生じた場合の修復に使用する
+    """
+    help = '場所の評価を投稿から一括で再計算します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--place-id',
+            type=int,
+            action='append',
+            help='対象とする場所のID（複数指定可。省略時は全件）'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='1回の更新で処理する場所の件数'
+        )
+
+    def handle(self, *args, **options):
+        places = Places.objects.all()
+        if options['place_id']:
+            places = places.filter(id__in=options['place_id'])
+
+        # 長時間のロックを避けるため主キー順にバッチで更新する
+        updated = 0
+        last_id = 0
+        while True:
+            batch_ids = list(places.filter(id__gt=last_id).order_by('id').values_list(
+                'id', flat=True
+            )[:options['batch_size']])
+            if not batch_ids:
+                break
+            with transaction.atomic():
+                updated += Places.recalculate_ratings(
+                    Places.objects.filter(id__in=batch_ids)
+                )
+            last_id = batch_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated}件の場所の評価を再計算しました'
+        ))
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from terrapic.models import Places, Posts, Favorites
+
+
+class Command(BaseCommand):
+    """
+    場所の集計値（投稿数・お気に入り数・総いいね数・最新の投稿・トップ投稿・評価の分布）を
+    実データから再計算してずれを修正するコマンド
+    """
+    help = '場所の集計値を投稿・お気に入りから再計算してずれを修正します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--place-id',
+            type=int,
+            action='append',
+            help='対象とする場所のID（複数指定可。省略時は全件）'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='ずれのある場所の件数のみ表示して更新しない'
+        )
+
+    def handle(self, *args, **options):
+        places = Places.objects.all()
+        if options['place_id']:
+            places = places.filter(id__in=options['place_id'])
+
+        # 実データとずれている場所を検出する
+        posts = Posts.objects.filter(place=OuterRef('pk')).order_by()
+        favorites = Favorites.objects.filter(place=OuterRef('pk')).order_by()
+        drifted = places.annotate(
+            actual_post_count=Coalesce(Subquery(
+                posts.values('place').annotate(c=Count('id')).values('c')
+            ), 0),
+            actual_favorite_count=Coalesce(Subquery(
+                favorites.values('place').annotate(c=Count('id')).values('c')
+            ), 0),
+            actual_total_likes=Coalesce(Subquery(
+                posts.values('place').annotate(s=Sum('like_count')).values('s')
+            ), 0),
+            actual_rating_count=Coalesce(Subquery(
+                posts.filter(rating__isnull=False).values('place').annotate(
+                    c=Count('id')
+                ).values('c')
+            ), 0),
+        ).filter(
+            ~Q(post_count=F('actual_post_count')) |
+            ~Q(favorite_count=F('actual_favorite_count')) |
+            ~Q(total_likes=F('actual_total_likes')) |
+            ~Q(rating_count=F('actual_rating_count'))
+        )
+
+        drifted_ids = list(drifted.values_list('id', flat=True))
+        self.stdout.write(f'集計値にずれのある場所: {len(drifted_ids)}件')
+
+        if options['dry_run']:
+            return
+
+        # 最新の投稿・トップ投稿も含めて対象の場所をすべて再計算する
+        with transaction.atomic():
+            updated = Places.recalculate_counters(places)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated}件の場所の集計値を再計算しました'
+        ))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from terrapic.models import StoredImage, Posts, Users
+
+
+class Command(BaseCommand):
+    """
+    内容のハッシュで管理する画像の参照数を投稿・ユーザーから再計算してずれを修正し、
+    参照のない画像とレコードのないファイルを削除するコマンド
+
+    ユーザーの削除に伴う投稿の一括削除など、参照の解除を経由しない削除や、
+    ロールバックされたトランザクションで書き込まれたファイルの後始末に使用する
+    """
+    help = '画像の参照数を投稿・ユーザーから再計算し、参照のない画像とファイルを削除します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='ずれのある画像の件数のみ表示して更新しない'
+        )
+        parser.add_argument(
+            '--orphan-age',
+            type=int,
+            default=24 * 60 * 60,
+            help='レコードのないファイルを削除対象とする最終更新からの経過秒数'
+        )
+
+    def handle(self, *args, **options):
+        # 実際の参照数とずれている画像を検出する
+        posts = Posts.objects.filter(photo_image=OuterRef('name')).order_by()
+        users = Users.objects.filter(profile_image=OuterRef('name')).order_by()
+        drifted = StoredImage.objects.annotate(
+            actual_post_refs=Coalesce(Subquery(
+                posts.values('photo_image').annotate(c=Count('id')).values('c')
+            ), 0),
+            actual_user_refs=Coalesce(Subquery(
+                users.values('profile_image').annotate(c=Count('id')).values('c')
+            ), 0),
+        ).annotate(
+            actual_ref_count=F('actual_post_refs') + F('actual_user_refs')
+        ).filter(
+            ~Q(ref_count=F('actual_ref_count'))
+        )
+
+        drifted = list(drifted.values_list('sha256', 'actual_ref_count'))
+        self.stdout.write(f'参照数にずれのある画像: {len(drifted)}件')
+
+        if options['dry_run']:
+            return
+
+        for digest, actual_ref_count in drifted:
+            StoredImage.objects.filter(pk=digest).update(ref_count=actual_ref_count)
+
+        deleted = 0
+        unreferenced = StoredImage.objects.filter(
+            ref_count__lte=0
+        ).values_list('sha256', flat=True)
+        for digest in list(unreferenced):
+            if StoredImage.delete_if_unreferenced(digest):
+                deleted += 1
+
+        orphans = StoredImage.delete_orphan_files(options['orphan_age'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(drifted)}件の画像の参照数を修正し、参照のない{deleted}件の画像と'
+            f'レコードのない{orphans}件のファイルを削除しました'
+        ))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from terrapic.services import HeatmapService
+import time
+
+
+class Command(BaseCommand):
+    """
+    更新待ちのヒートマップセルを投稿から再集計するコマンド
+
+    cronなどで定期実行するか、--intervalを指定して常駐させる
+    """
+    help = '更新待ちのヒートマップセルを投稿から再集計します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='1回の集計で処理するセル数'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='撮影スポットのある全セルを再集計する'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='指定した秒数ごとに再集計を繰り返す（省略時は1回のみ実行）'
+        )
+
+    def handle(self, *args, **options):
+        if options['full']:
+            HeatmapService.mark_all_dirty(options['batch_size'])
+
+        while True:
+            refreshed = HeatmapService.refresh_dirty_cells(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{refreshed}件のヒートマップセルを再集計しました'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
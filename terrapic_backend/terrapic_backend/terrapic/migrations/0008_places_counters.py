@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-17 10:12
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_place_counters(apps, schema_editor):
+    """既存の場所の集計値を投稿・お気に入りから計算する"""
+    Places = apps.get_model('terrapic', 'Places')
+    Posts = apps.get_model('terrapic', 'Posts')
+    Favorites = apps.get_model('terrapic', 'Favorites')
+
+    posts = Posts.objects.filter(place=models.OuterRef('pk')).order_by()
+    favorites = Favorites.objects.filter(place=models.OuterRef('pk')).order_by()
+
+    Places.objects.update(
+        post_count=Coalesce(models.Subquery(
+            posts.values('place').annotate(c=models.Count('id')).values('c')
+        ), 0),
+        favorite_count=Coalesce(models.Subquery(
+            favorites.values('place').annotate(c=models.Count('id')).values('c')
+        ), 0),
+        total_likes=Coalesce(models.Subquery(
+            posts.values('place').annotate(s=models.Sum('like_count')).values('s')
+        ), 0),
+        latest_post_id=models.Subquery(
+            posts.order_by('-created_at', '-id').values('id')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0007_alter_posts_place'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='places',
+            name='post_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='favorite_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='total_likes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='latest_post',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='terrapic.posts'),
+        ),
+        migrations.RunPython(fill_place_counters, migrations.RunPython.noop),
+    ]
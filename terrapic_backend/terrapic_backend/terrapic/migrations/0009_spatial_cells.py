@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-17 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0008_places_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='places',
+            name='cell_z8',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='cell_z12',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='cell_z16',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='cell_z8',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='cell_z12',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='cell_z16',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
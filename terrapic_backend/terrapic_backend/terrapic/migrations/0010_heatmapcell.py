@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0009_spatial_cells'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeatmapCell',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('zoom', models.SmallIntegerField()),
+                ('cell', models.BigIntegerField()),
+                ('x', models.IntegerField()),
+                ('y', models.IntegerField()),
+                ('post_count', models.IntegerField(default=0)),
+                ('like_count', models.IntegerField(default=0)),
+                ('dirty', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['zoom', 'x', 'y'], name='heatmap_cell_xy_idx'),
+                    models.Index(condition=models.Q(('dirty', True)), fields=['zoom'], name='heatmap_cell_dirty_idx'),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='heatmapcell',
+            constraint=models.UniqueConstraint(fields=('zoom', 'cell'), name='heatmap_cell_unique'),
+        ),
+    ]
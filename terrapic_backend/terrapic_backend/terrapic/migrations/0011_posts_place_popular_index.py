@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-17 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0010_heatmapcell'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='posts',
+            index=models.Index(fields=['place', '-like_count', '-created_at', 'id'], name='post_place_popular_idx'),
+        ),
+    ]
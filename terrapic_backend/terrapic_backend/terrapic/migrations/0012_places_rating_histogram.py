@@ -0,0 +1,88 @@
+# Generated by Django 4.2 on 2026-10-17 14:40
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def rating_bucket_filter(bucket):
+    """評価が指定した星（四捨五入、1〜5に収める）に入る条件"""
+    condition = models.Q(rating__isnull=False)
+    if bucket > 1:
+        condition &= models.Q(rating__gte=Decimal(bucket) - Decimal('0.5'))
+    if bucket < 5:
+        condition &= models.Q(rating__lt=Decimal(bucket) + Decimal('0.5'))
+    return condition
+
+
+def fill_rating_histogram(apps, schema_editor):
+    """既存の場所の評価の分布を投稿から計算する"""
+    Places = apps.get_model('terrapic', 'Places')
+    Posts = apps.get_model('terrapic', 'Posts')
+
+    posts = Posts.objects.filter(place=models.OuterRef('pk')).order_by()
+
+    Places.objects.update(
+        rating_count=Coalesce(models.Subquery(
+            posts.filter(rating__isnull=False).values('place').annotate(
+                c=models.Count('id')
+            ).values('c')
+        ), 0),
+        rating_sum=Coalesce(models.Subquery(
+            posts.values('place').annotate(s=models.Sum('rating')).values('s')
+        ), Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=1)),
+        **{
+            f'rating_count_{bucket}': Coalesce(models.Subquery(
+                posts.filter(rating_bucket_filter(bucket)).values('place').annotate(
+                    c=models.Count('id')
+                ).values('c')
+            ), 0)
+            for bucket in range(1, 6)
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0011_posts_place_popular_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='places',
+            name='rating_count_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='rating_count_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='rating_count_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='rating_count_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='rating_count_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='places',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=12),
+        ),
+        migrations.RunPython(fill_rating_histogram, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-17 15:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_top_post(apps, schema_editor):
+    """既存の場所のトップ投稿を投稿から設定する"""
+    Places = apps.get_model('terrapic', 'Places')
+    Posts = apps.get_model('terrapic', 'Posts')
+
+    top = Posts.objects.filter(
+        place=models.OuterRef('pk')
+    ).order_by('-like_count', '-created_at', 'id').values('id')[:1]
+    Places.objects.update(top_post_id=models.Subquery(top))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0012_places_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='places',
+            name='top_post',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='terrapic.posts'),
+        ),
+        migrations.RunPython(fill_top_post, migrations.RunPython.noop),
+    ]
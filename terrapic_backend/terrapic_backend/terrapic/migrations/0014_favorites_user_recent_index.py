@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0013_places_top_post'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorites',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_recent_idx'),
+        ),
+    ]
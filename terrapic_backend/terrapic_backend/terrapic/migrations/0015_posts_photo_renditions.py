@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0014_favorites_user_recent_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='photo_thumb',
+            field=models.ImageField(blank=True, default='', upload_to='post_renditions/'),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='photo_card',
+            field=models.ImageField(blank=True, default='', upload_to='post_renditions/'),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='photo_full',
+            field=models.ImageField(blank=True, default='', upload_to='post_renditions/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0016_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='taken_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2 on 2026-10-18 09:20
+
+from django.db import migrations
+from terrapic.utils import lonlat_to_cell, cell_to_tile, SPATIAL_CELL_ZOOMS
+
+BATCH_SIZE = 1000
+CELL_FIELDS = [f'cell_z{zoom}' for zoom in SPATIAL_CELL_ZOOMS]
+
+
+def fill_cells(model, location_field):
+    """位置情報から空間セルIDが未計算のレコードのセルIDを主キー順に計算する"""
+    queryset = model.objects.exclude(**{
+        f'{location_field}__isnull': True
+    }).filter(**{
+        'cell_z16__isnull': True
+    }).only('id', location_field, *CELL_FIELDS).order_by('id')
+
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        for obj in batch:
+            location = getattr(obj, location_field)
+            for zoom in SPATIAL_CELL_ZOOMS:
+                setattr(obj, f'cell_z{zoom}', lonlat_to_cell(location.x, location.y, zoom))
+        model.objects.bulk_update(batch, CELL_FIELDS)
+        last_id = batch[-1].id
+
+
+def fill_spatial_cells(apps, schema_editor):
+    """既存の場所・投稿の空間セルIDを計算し、ヒートマップのセルを再集計待ちにする"""
+    Places = apps.get_model('terrapic', 'Places')
+    Posts = apps.get_model('terrapic', 'Posts')
+    HeatmapCell = apps.get_model('terrapic', 'HeatmapCell')
+
+    fill_cells(Places, 'location')
+    fill_cells(Posts, 'photo_spot_location')
+
+    # 撮影スポットのあるセルを登録し、refresh_heatmapコマンドで集計させる
+    for zoom in SPATIAL_CELL_ZOOMS:
+        cell_ids = Posts.objects.filter(**{
+            f'cell_z{zoom}__isnull': False
+        }).values_list(f'cell_z{zoom}', flat=True).distinct().order_by()
+        cells = []
+        for cell_id in cell_ids.iterator():
+            x, y = cell_to_tile(cell_id, zoom)
+            cells.append(HeatmapCell(zoom=zoom, cell=cell_id, x=x, y=y, dirty=True))
+            if len(cells) >= BATCH_SIZE:
+                HeatmapCell.objects.bulk_create(cells, ignore_conflicts=True)
+                cells = []
+        if cells:
+            HeatmapCell.objects.bulk_create(cells, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0018_storedimage'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_spatial_cells, migrations.RunPython.noop),
+    ]
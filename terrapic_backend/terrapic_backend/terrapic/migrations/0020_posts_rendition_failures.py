@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0019_fill_spatial_cells'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='rendition_failures',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='rendition_failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
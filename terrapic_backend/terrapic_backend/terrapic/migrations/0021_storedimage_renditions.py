@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('terrapic', '0020_posts_rendition_failures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='storedimage',
+            name='source_sha256',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
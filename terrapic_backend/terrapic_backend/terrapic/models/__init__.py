@@ -1,6 +1,9 @@
 from .user import Users, Follows, Notifications, Reports_users
 from .place import Places, Favorites
 from .post import Posts, Comments, Likes, Reports_posts
+from .heatmap import HeatmapCell
+from .upload import UploadSession
+from .image import StoredImage
 
 __all__ = [
     'Users',
@@ -13,4 +16,7 @@ __all__ = [
     'Comments',
     'Likes',
     'Reports_posts',
-]
\ No newline at end of file
+    'HeatmapCell',
+    'UploadSession',
+    'StoredImage',
+]
@@ -0,0 +1,85 @@
+from django.db import models, transaction
+from ..utils import lonlat_to_tile, tile_to_cell, SPATIAL_CELL_ZOOMS
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HeatmapCell(models.Model):
+    """
+    撮影スポットの密度を空間セル単位で集計したヒートマップのモデル
+
+    投稿やいいねの変更時はセルを更新待ち（dirty）にするだけで、
+    集計値はrefresh_heatmapコマンドでまとめて再計算する
+    """
+    # セルを一意に識別するID
+    id = models.BigAutoField(primary_key=True)
+    # セルのズームレベル（SPATIAL_CELL_ZOOMSのいずれか）
+    zoom = models.SmallIntegerField()
+    # 空間セルID（投稿のcell_z{zoom}と同じ値）
+    cell = models.BigIntegerField()
+    # セルのタイル座標（範囲検索用）
+    x = models.IntegerField()
+    y = models.IntegerField()
+    # セル内の撮影スポットの投稿数
+    post_count = models.IntegerField(default=0)
+    # セル内の投稿が受け取った総いいね数
+    like_count = models.IntegerField(default=0)
+    # 再集計が必要かどうか
+    dirty = models.BooleanField(default=True)
+    # 最終更新日時（更新待ちにした日時）
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['zoom', 'cell'], name='heatmap_cell_unique'
+            ),
+        ]
+        # 範囲検索と更新待ちセルの取得を高速化するためのインデックス
+        indexes = [
+            models.Index(fields=['zoom', 'x', 'y'], name='heatmap_cell_xy_idx'),
+            models.Index(
+                fields=['zoom'], name='heatmap_cell_dirty_idx',
+                condition=models.Q(dirty=True)
+            ),
+        ]
+
+    @classmethod
+    def mark_dirty(cls, *locations):
+        """
+        指定された位置を含む全ズームレベルのセルをコミット後に更新待ちにする
+
+        人気のセルで行ロックの競合が起きないよう、トランザクションの外で更新する
+
+        Args:
+            locations: 撮影スポットのPointのリスト
+        """
+        cells = []
+        for location in locations:
+            if location is None:
+                continue
+            for zoom in SPATIAL_CELL_ZOOMS:
+                x, y = lonlat_to_tile(location.x, location.y, zoom)
+                cells.append(cls(
+                    zoom=zoom, cell=tile_to_cell(x, y, zoom),
+                    x=x, y=y, dirty=True
+                ))
+        if not cells:
+            return
+
+        def mark():
+            try:
+                cls.objects.bulk_create(
+                    cells,
+                    update_conflicts=True,
+                    unique_fields=['zoom', 'cell'],
+                    update_fields=['dirty', 'updated_at']
+                )
+            except Exception as e:
+                # 集計の更新待ち登録の失敗で書き込み処理を失敗させない
+                logger.error(f"ヒートマップセルの更新待ち登録中にエラー: {str(e)}")
+
+        transaction.on_commit(mark)
+
+    def __str__(self):
+        return f"ヒートマップセル z{self.zoom} ({self.x}, {self.y})"
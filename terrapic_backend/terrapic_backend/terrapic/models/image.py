@@ -0,0 +1,333 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from ..utils import HashingFile, detect_image_extension
+import os
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StoredImage(models.Model):
+    """
+    内容のハッシュで管理する画像ファイルのモデル
+
+    画像はSHA-256から決まる分散ディレクトリ（images/ab/cd/<sha256>.jpg）に保存し、
+    同じ内容の画像は1つのファイルを共有する。参照している投稿・ユーザーの数を
+    ref_countで管理し、参照がなくなった時点でファイルを削除する。
+    ファイル名が内容から決まるため、URLは内容が変わらない限り変化しない。
+    縮小画像も同じディレクトリ（<sha256>_thumb.jpgなど）に保存し、画像とともに削除する
+    """
+    # 画像のSHA-256（16進数）
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    # ストレージ上のファイル名
+    name = models.CharField(max_length=255, unique=True)
+    # ファイルのバイト数
+    size = models.IntegerField()
+    # 画像を参照している投稿・ユーザーの数
+    ref_count = models.IntegerField(default=0)
+    # 縮小画像の種類ごとのファイル名（生成前は空）
+    renditions = models.JSONField(default=dict, blank=True)
+    # この画像の生成元（メタデータを除去する前のアップロード）のSHA-256
+    source_sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # 作成日時
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # 保存先のディレクトリ
+    DIRECTORY = 'images'
+    # ハッシュの計算中に書き込む一時ファイルのディレクトリ
+    TEMP_DIRECTORY = 'images/tmp'
+
+    @classmethod
+    def content_name(cls, digest, suffix):
+        """
+        ハッシュから保存先のファイル名を生成する
+
+        1ディレクトリのファイル数が増えすぎないよう、ハッシュの先頭4文字で2階層に分ける
+        """
+        return f'{cls.DIRECTORY}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}'
+
+    @classmethod
+    def processed(cls, digest):
+        """
+        指定した内容の画像から生成済みの（縮小画像のある）画像を取得するクエリセット
+
+        Args:
+            digest: 画像またはその生成元のアップロードのSHA-256
+        """
+        return cls.objects.filter(
+            Q(pk=digest) | Q(source_sha256=digest)
+        ).exclude(renditions={}).order_by('created_at')
+
+    @classmethod
+    def acquire(cls, queryset):
+        """
+        条件に合う最初の画像の参照数を1増やして取得する
+
+        Returns:
+            StoredImage: 画像（ない場合はNone）
+        """
+        with transaction.atomic():
+            stored = queryset.select_for_update().first()
+            if stored is not None:
+                cls.objects.filter(pk=stored.pk).update(ref_count=F('ref_count') + 1)
+            return stored
+
+    @staticmethod
+    def _move(source, target):
+        """
+        ストレージ上のファイルを移動する
+
+        ローカルのストレージでは名前の変更のみ行い、ファイルを読み直さない
+
+        Returns:
+            str: 移動先のファイル名
+        """
+        try:
+            source_path = default_storage.path(source)
+            target_path = default_storage.path(target)
+        except NotImplementedError:
+            # パスを持たないストレージでは書き込み直す
+            with default_storage.open(source, 'rb') as content:
+                saved_name = default_storage.save(target, content)
+            default_storage.delete(source)
+            return saved_name
+
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.replace(source_path, target_path)
+        return target
+
+    @classmethod
+    def store(cls, file, max_size=settings.IMAGE_UPLOAD_MAX_SIZE):
+        """
+        画像を保存して参照数を1増やす
+
+        ファイルは1回だけ読み出し、一時ファイルに書き込みながらハッシュを計算してから
+        ハッシュで決まるファイル名に移動する。同じ内容の画像が保存済みの場合は
+        一時ファイルを削除して既存のファイルを参照する。
+        同じ内容のアップロードから生成済みの画像がある場合は、メタデータの除去も
+        行わずに生成済みの画像（縮小画像を含む）を参照する。
+        拡張子は元のファイル名ではなく内容から判定する。
+        書き込んだ後に保存が失敗した場合はファイルを削除する（呼び出し側の
+        トランザクションのロールバックで残ったファイルはreconcile_stored_imagesで削除する）
+
+        Args:
+            file: 保存する画像ファイル
+            max_size: ファイルサイズの上限（Noneの場合は制限しない）
+
+        Returns:
+            StoredImage: 保存した画像
+
+        Raises:
+            ValidationError: ファイルサイズが上限を超える場合
+        """
+        extension = detect_image_extension(file)
+
+        # 書き込みと同時にハッシュとサイズを計算する（チャンク単位で読むためメモリに保持しない）
+        hashing = HashingFile(file, max_size=max_size)
+        # 書き込みの途中で上限を超えた場合も削除できるよう、名前を先に決めておく
+        temp_name = f'{cls.TEMP_DIRECTORY}/{uuid.uuid4().hex}'
+        written = []
+        try:
+            temp_name = default_storage.save(temp_name, hashing)
+            digest = hashing.hexdigest()
+
+            with transaction.atomic():
+                stored = cls.acquire(cls.processed(digest))
+                if stored is not None:
+                    return stored
+
+                stored, created = cls.objects.select_for_update().get_or_create(
+                    sha256=digest,
+                    defaults={
+                        'name': cls.content_name(digest, extension),
+                        'size': hashing.bytes_read,
+                    }
+                )
+                if created:
+                    saved_name = cls._move(temp_name, stored.name)
+                    temp_name = None
+                    written.append(saved_name)
+                    if saved_name != stored.name:
+                        # ストレージが別名で保存した場合はその名前を記録する
+                        stored.name = saved_name
+                        stored.save(update_fields=['name'])
+                cls.objects.filter(pk=digest).update(ref_count=F('ref_count') + 1)
+
+            return stored
+
+        except Exception:
+            for name in written:
+                default_storage.delete(name)
+            raise
+
+        finally:
+            # 保存済みの画像を参照した場合や保存に失敗した場合は一時ファイルを削除する
+            if temp_name:
+                default_storage.delete(temp_name)
+
+    def save_renditions(self, renditions, source_sha256=''):
+        """
+        縮小画像を内容のハッシュから決まるファイル名で保存して登録する
+
+        縮小画像を登録済みの場合は書き込みを行わず、登録済みのものを使用する
+
+        Args:
+            renditions: 縮小画像の種類をキーとしたJPEGデータ（bytes）の辞書
+            source_sha256: 生成元のアップロードのSHA-256
+
+        Returns:
+            dict: 縮小画像の種類ごとのファイル名
+        """
+        written = []
+        try:
+            with transaction.atomic():
+                stored = StoredImage.objects.select_for_update().get(pk=self.pk)
+                if not stored.renditions:
+                    for name, data in renditions.items():
+                        saved_name = default_storage.save(
+                            self.content_name(self.sha256, f'_{name}.jpg'), ContentFile(data)
+                        )
+                        written.append(saved_name)
+                        stored.renditions[name] = saved_name
+                if source_sha256 and not stored.source_sha256:
+                    stored.source_sha256 = source_sha256
+                stored.save(update_fields=['renditions', 'source_sha256'])
+
+        except Exception:
+            for name in written:
+                default_storage.delete(name)
+            raise
+
+        self.renditions = stored.renditions
+        self.source_sha256 = stored.source_sha256
+        return self.renditions
+
+    @classmethod
+    def release(cls, name):
+        """
+        画像の参照数を1減らし、参照がなくなった場合はコミット後にファイルを削除する
+
+        Args:
+            name: ストレージ上のファイル名
+
+        Returns:
+            bool: 内容のハッシュで管理している画像の場合はTrue
+        """
+        if not name:
+            return False
+        digest = cls.objects.filter(name=name).values_list('sha256', flat=True).first()
+        if digest is None:
+            return False
+        cls.objects.filter(pk=digest).update(ref_count=F('ref_count') - 1)
+
+        def delete_unreferenced():
+            try:
+                cls.delete_if_unreferenced(digest)
+            except Exception as e:
+                # ファイル削除の失敗で書き込み処理を失敗させない
+                logger.error(f"参照のない画像の削除中にエラー: {str(e)}")
+
+        transaction.on_commit(delete_unreferenced)
+        return True
+
+    @staticmethod
+    def delete_file_on_commit(name):
+        """
+        内容のハッシュで管理していないファイルをコミット後に削除する
+
+        Args:
+            name: ストレージ上のファイル名
+        """
+        def delete_file():
+            try:
+                default_storage.delete(name)
+            except Exception as e:
+                # ファイル削除の失敗で書き込み処理を失敗させない
+                logger.error(f"画像ファイルの削除中にエラー: {str(e)}")
+
+        if name:
+            transaction.on_commit(delete_file)
+
+    @classmethod
+    def delete_if_unreferenced(cls, digest):
+        """
+        参照のない画像のファイル（縮小画像を含む）とレコードを削除する
+
+        同じ画像の保存と競合しないよう、行ロックを取得してから削除する
+
+        Returns:
+            bool: 削除した場合はTrue
+        """
+        with transaction.atomic():
+            stored = cls.objects.select_for_update().filter(
+                pk=digest, ref_count__lte=0
+            ).first()
+            if stored is None:
+                return False
+            default_storage.delete(stored.name)
+            for name in stored.renditions.values():
+                default_storage.delete(name)
+            stored.delete()
+            return True
+
+    @classmethod
+    def delete_orphan_files(cls, min_age):
+        """
+        レコードのないファイルを画像のディレクトリから削除する
+
+        ロールバックされたトランザクションで書き込まれたファイルや、処理の中断で残った
+        一時ファイルなどが対象。保存中のファイルと競合しないよう、指定した時間より前に
+        更新されたファイルのみ削除する
+
+        Args:
+            min_age: 削除対象とするファイルの最終更新からの経過秒数
+
+        Returns:
+            int: 削除したファイル数
+        """
+        cutoff = timezone.now() - timedelta(seconds=min_age)
+        deleted = 0
+        try:
+            first_levels, _ = default_storage.listdir(cls.DIRECTORY)
+        except FileNotFoundError:
+            return 0
+
+        temp_directory = os.path.basename(cls.TEMP_DIRECTORY)
+        for first in first_levels:
+            if first == temp_directory:
+                _, filenames = default_storage.listdir(cls.TEMP_DIRECTORY)
+                for filename in filenames:
+                    path = f'{cls.TEMP_DIRECTORY}/{filename}'
+                    if default_storage.get_modified_time(path) <= cutoff:
+                        default_storage.delete(path)
+                        deleted += 1
+                continue
+
+            second_levels, _ = default_storage.listdir(f'{cls.DIRECTORY}/{first}')
+            for second in second_levels:
+                directory = f'{cls.DIRECTORY}/{first}/{second}'
+                _, filenames = default_storage.listdir(directory)
+
+                # ディレクトリに対応するハッシュの画像と縮小画像のファイル名
+                known = set()
+                for name, renditions in cls.objects.filter(
+                    sha256__startswith=f'{first}{second}'
+                ).values_list('name', 'renditions'):
+                    known.add(name)
+                    known.update(renditions.values())
+
+                for filename in filenames:
+                    path = f'{directory}/{filename}'
+                    if path in known or default_storage.get_modified_time(path) > cutoff:
+                        continue
+                    default_storage.delete(path)
+                    deleted += 1
+        return deleted
+
+    def __str__(self):
+        return f"{self.name} (参照数: {self.ref_count})"
@@ -1,9 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.gis.db import models as gis_models
 from django.contrib.gis.geos import Point, Polygon
 from django.contrib.gis.measure import D
 from django.contrib.gis.db.models.functions import Distance
+from django.db.models.functions import Coalesce
 from .user import Users
+from ..utils import lonlat_to_cell, SPATIAL_CELL_ZOOMS
+from decimal import Decimal, ROUND_HALF_UP
 
 class Places(models.Model):
     """
@@ -24,6 +27,48 @@ class Places(models.Model):
         null=True, 
         blank=True
     )
+    # 投稿数（投稿の作成・削除時に更新される集計値）
+    post_count = models.IntegerField(default=0)
+    # お気に入り登録数（お気に入りの登録・解除時に更新される集計値）
+    favorite_count = models.IntegerField(default=0)
+    # 投稿が受け取った総いいね数（いいねの追加・解除時に更新される集計値）
+    total_likes = models.IntegerField(default=0)
+    # 最新の投稿
+    latest_post = models.ForeignKey(
+        'Posts',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    # トップ投稿（いいね数が最も多く、同数の場合は新しい投稿）
+    top_post = models.ForeignKey(
+        'Posts',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    # 評価の分布（星1〜5ごとの評価数。小数の評価は四捨五入した星に数える）
+    rating_count_1 = models.IntegerField(default=0)
+    rating_count_2 = models.IntegerField(default=0)
+    rating_count_3 = models.IntegerField(default=0)
+    rating_count_4 = models.IntegerField(default=0)
+    rating_count_5 = models.IntegerField(default=0)
+    # 評価された投稿数と評価の合計
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.DecimalField(max_digits=12, decimal_places=1, default=0)
+    # 位置を含む空間セルのID（ズームレベル8・12・16のモートン符号）
+    cell_z8 = models.BigIntegerField(null=True, blank=True, db_index=True)
+    cell_z12 = models.BigIntegerField(null=True, blank=True, db_index=True)
+    cell_z16 = models.BigIntegerField(null=True, blank=True, db_index=True)
+
+    CELL_FIELDS = [f'cell_z{zoom}' for zoom in SPATIAL_CELL_ZOOMS]
+    # タイル・地図のキャッシュにシリアライズされるフィールド
+    SERIALIZED_FIELDS = {
+        'name', 'location', 'rating', 'post_count', 'favorite_count',
+        'top_post', 'top_post_id', 'latest_post', 'latest_post_id',
+    }
 
     class Meta:
         # 検索を高速化するためのインデックス
@@ -32,6 +77,43 @@ class Places(models.Model):
             gis_models.Index(fields=['location'], name='location_idx'),
         ]
 
+    def update_cells(self):
+        """
+        位置情報から各ズームレベルの空間セルIDを計算する
+        """
+        for zoom in SPATIAL_CELL_ZOOMS:
+            cell = None
+            if self.location:
+                cell = lonlat_to_cell(self.location.x, self.location.y, zoom)
+            setattr(self, f'cell_z{zoom}', cell)
+
+    def save(self, *args, **kwargs):
+        """
+        場所保存時に空間セルIDを更新
+
+        名前・評価など地図に表示するフィールドを更新した場合はキャッシュを無効化し、
+        位置が変わった場合は移動前と移動後の両方のタイルのキャッシュを無効化する
+        """
+        update_fields = kwargs.get('update_fields')
+        location_changed = update_fields is None or 'location' in update_fields
+        serialized_changed = not self._state.adding and (
+            update_fields is None or not self.SERIALIZED_FIELDS.isdisjoint(update_fields)
+        )
+        if location_changed:
+            self.update_cells()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.CELL_FIELDS}
+        with transaction.atomic():
+            old_location = None
+            if location_changed and not self._state.adding:
+                old_location = Places.objects.filter(
+                    pk=self.pk
+                ).values_list('location', flat=True).first()
+            super().save(*args, **kwargs)
+            if serialized_changed:
+                moved = old_location is not None and old_location != self.location
+                self.invalidate_caches(*([old_location] if moved else []))
+
     @classmethod
     def nearby_places(cls, point, distance_km):
         """
@@ -65,21 +147,275 @@ class Places(models.Model):
 
     def update_rating(self):
         """
-        場所の評価を投稿の評価から更新
+        場所の評価を投稿の評価から再計算する（集計値の修復用）
+
+        通常の投稿の作成・更新・削除ではadjust_ratingで差分更新する
+        """
+        Places.recalculate_ratings(Places.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=[
+            'rating', 'rating_count', 'rating_sum',
+            *(f'rating_count_{bucket}' for bucket in range(1, 6))
+        ])
+
+    @classmethod
+    def adjust_counters(cls, place_id, post_count=0, favorite_count=0, total_likes=0):
         """
-        from .post import Posts
-        avg_rating = Posts.objects.filter(place=self).aggregate(
-            models.Avg('rating'))['rating__avg']
-        self.rating = avg_rating
-        self.save()
+        場所の集計値を差分で更新する
+
+        同時更新で値が失われないようにF式で加算する
+
+        Args:
+            place_id: 場所のID
+            post_count: 投稿数の増減
+            favorite_count: お気に入り数の増減
+            total_likes: 総いいね数の増減
+        """
+        changes = {}
+        if post_count:
+            changes['post_count'] = models.F('post_count') + post_count
+        if favorite_count:
+            changes['favorite_count'] = models.F('favorite_count') + favorite_count
+        if total_likes:
+            changes['total_likes'] = models.F('total_likes') + total_likes
+        if changes:
+            cls.objects.filter(pk=place_id).update(**changes)
+
+    @staticmethod
+    def rating_bucket(rating):
+        """
+        評価を分布の段階（星1〜5）に変換する
+
+        小数の評価は四捨五入し、1〜5の範囲に収める
+
+        Args:
+            rating: 投稿の評価
+
+        Returns:
+            int: 星の数（評価がない場合はNone）
+        """
+        if rating is None:
+            return None
+        bucket = int(Decimal(str(rating)).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+        return min(max(bucket, 1), 5)
+
+    @staticmethod
+    def rating_bucket_filter(bucket, field='rating'):
+        """
+        評価が指定した段階に入る投稿の条件を取得する（rating_bucketと同じ区切り）
+
+        Args:
+            bucket: 星の数（1〜5）
+            field: 評価のフィールド名
+        """
+        condition = models.Q(**{f'{field}__isnull': False})
+        if bucket > 1:
+            condition &= models.Q(**{f'{field}__gte': Decimal(bucket) - Decimal('0.5')})
+        if bucket < 5:
+            condition &= models.Q(**{f'{field}__lt': Decimal(bucket) + Decimal('0.5')})
+        return condition
 
     @property
-    def favorite_count(self):
+    def rating_histogram(self):
+        """星1〜5ごとの評価数を取得"""
+        return {
+            bucket: getattr(self, f'rating_count_{bucket}')
+            for bucket in range(1, 6)
+        }
+
+    @classmethod
+    def adjust_rating(cls, place_id, old_rating=None, new_rating=None):
         """
-        お気に入り登録数を取得
+        場所の評価（平均）と評価の分布を差分で更新する
+
+        評価の合計と件数をF式で加減し、平均は同じUPDATE内で合計÷件数から求めるため、
+        場所の投稿数に関係なく一定の処理量で更新できる。
+        投稿の作成・更新・削除と同じトランザクションで呼び出す
+
+        Args:
+            place_id: 場所のID
+            old_rating: 取り除く評価（作成時はNone）
+            new_rating: 追加する評価（削除時はNone）
         """
-        count = self.favorites.count()
-        return int(count) if count is not None else 0
+        deltas = {}
+        for rating, sign in ((old_rating, -1), (new_rating, 1)):
+            if rating is None:
+                continue
+            bucket_field = f'rating_count_{cls.rating_bucket(rating)}'
+            deltas[bucket_field] = deltas.get(bucket_field, 0) + sign
+            deltas['rating_count'] = deltas.get('rating_count', 0) + sign
+            deltas['rating_sum'] = deltas.get('rating_sum', 0) + sign * Decimal(str(rating))
+
+        changes = {
+            field: models.F(field) + delta
+            for field, delta in deltas.items() if delta
+        }
+        if not changes:
+            return
+
+        # UPDATE内のF式は更新前の値を参照するため、差分を加えた値で平均を計算する
+        count_delta = deltas.get('rating_count', 0)
+        sum_delta = deltas.get('rating_sum', 0)
+        changes['rating'] = models.Case(
+            models.When(
+                rating_count__gt=-count_delta,
+                then=models.ExpressionWrapper(
+                    (models.F('rating_sum') + sum_delta) /
+                    (models.F('rating_count') + count_delta),
+                    output_field=models.DecimalField(max_digits=3, decimal_places=2)
+                )
+            ),
+            default=models.Value(None),
+            output_field=models.DecimalField(max_digits=3, decimal_places=2)
+        )
+        cls.objects.filter(pk=place_id).update(**changes)
+
+    @classmethod
+    def refresh_latest_post(cls, place_id):
+        """
+        場所の最新の投稿を再設定する
+
+        Args:
+            place_id: 場所のID
+        """
+        from .post import Posts
+        latest = Posts.objects.filter(
+            place_id=place_id
+        ).order_by('-created_at', '-id').values('id')[:1]
+        cls.objects.filter(pk=place_id).update(
+            latest_post_id=models.Subquery(latest)
+        )
+
+    @staticmethod
+    def top_post_ordering():
+        """トップ投稿を決める並び順（写真一覧と同じ）"""
+        return ('-like_count', '-created_at', 'id')
+
+    @classmethod
+    def promote_top_post(cls, place_id, post_id, like_count, created_at):
+        """
+        投稿が現在のトップ投稿を上回る場合にトップ投稿を置き換える
+
+        投稿の作成時といいねの追加時に呼び出し、並び順の比較のみで判定するため
+        場所の投稿を走査しない
+
+        Args:
+            place_id: 場所のID
+            post_id: 投稿のID
+            like_count: 投稿の現在のいいね数
+            created_at: 投稿の作成日時
+        """
+        cls.objects.filter(pk=place_id).filter(
+            models.Q(top_post__isnull=True) |
+            models.Q(top_post__like_count__lt=like_count) |
+            models.Q(top_post__like_count=like_count, top_post__created_at__lt=created_at)
+        ).update(top_post_id=post_id)
+
+    @classmethod
+    def refresh_top_post(cls, place_id, post_id=None):
+        """
+        場所のトップ投稿を再設定する
+
+        Args:
+            place_id: 場所のID
+            post_id: 指定した場合、この投稿がトップ投稿のときのみ再設定する
+                     （いいねの解除時に使用）
+        """
+        from .post import Posts
+        places = cls.objects.filter(pk=place_id)
+        if post_id is not None:
+            places = places.filter(top_post_id=post_id)
+        top = Posts.objects.filter(
+            place_id=place_id
+        ).order_by(*cls.top_post_ordering()).values('id')[:1]
+        places.update(top_post_id=models.Subquery(top))
+
+    @classmethod
+    def recalculate_counters(cls, queryset=None):
+        """
+        場所の集計値（評価を含む）を投稿・お気に入りから再計算する
+
+        Args:
+            queryset: 対象とする場所（省略時は全件）
+
+        Returns:
+            int: 更新した場所の件数
+        """
+        from .post import Posts
+        queryset = cls.objects.all() if queryset is None else queryset
+
+        posts = Posts.objects.filter(place=models.OuterRef('pk')).order_by()
+        favorites = Favorites.objects.filter(place=models.OuterRef('pk')).order_by()
+
+        updated = queryset.update(
+            post_count=Coalesce(models.Subquery(
+                posts.values('place').annotate(c=models.Count('id')).values('c')
+            ), 0),
+            favorite_count=Coalesce(models.Subquery(
+                favorites.values('place').annotate(c=models.Count('id')).values('c')
+            ), 0),
+            total_likes=Coalesce(models.Subquery(
+                posts.values('place').annotate(s=models.Sum('like_count')).values('s')
+            ), 0),
+            latest_post_id=models.Subquery(
+                posts.order_by('-created_at', '-id').values('id')[:1]
+            ),
+            top_post_id=models.Subquery(
+                posts.order_by(*cls.top_post_ordering()).values('id')[:1]
+            ),
+        )
+        cls.recalculate_ratings(queryset)
+        return updated
+
+    @classmethod
+    def recalculate_ratings(cls, queryset=None):
+        """
+        場所の評価（平均・合計・件数・分布）を投稿から再計算する
+
+        Args:
+            queryset: 対象とする場所（省略時は全件）
+
+        Returns:
+            int: 更新した場所の件数
+        """
+        from .post import Posts
+        queryset = cls.objects.all() if queryset is None else queryset
+
+        posts = Posts.objects.filter(place=models.OuterRef('pk')).order_by()
+
+        return queryset.update(
+            rating=models.Subquery(
+                posts.values('place').annotate(a=models.Avg('rating')).values('a')
+            ),
+            rating_count=Coalesce(models.Subquery(
+                posts.filter(rating__isnull=False).values('place').annotate(
+                    c=models.Count('id')
+                ).values('c')
+            ), 0),
+            rating_sum=Coalesce(models.Subquery(
+                posts.values('place').annotate(s=models.Sum('rating')).values('s')
+            ), Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=1)),
+            **{
+                f'rating_count_{bucket}': Coalesce(models.Subquery(
+                    posts.filter(cls.rating_bucket_filter(bucket)).values('place').annotate(
+                        c=models.Count('id')
+                    ).values('c')
+                ), 0)
+                for bucket in range(1, 6)
+            }
+        )
+
+    def invalidate_caches(self, *locations):
+        """
+        場所に関連するキャッシュ（タイル・場所詳細・ランキング）をコミット後に無効化
+
+        Args:
+            locations: 場所の位置以外に無効化対象とする位置（撮影スポットなど）
+        """
+        from ..services import CacheService, TileService
+        points = [self.location, *locations]
+        transaction.on_commit(lambda: TileService.invalidate_locations(points))
+        CacheService.bump_versions_on_commit('place', self.pk)
+        CacheService.bump_versions_on_commit('ranking', 'places', 'posts')
 
     def __str__(self):
         return self.name
@@ -101,5 +437,37 @@ class Favorites(models.Model):
     # 登録された日時
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # ユーザーごとのお気に入り一覧（登録の新しい順）を高速化するためのインデックス
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                name='favorite_user_recent_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        お気に入り登録時に場所のお気に入り数を更新し、キャッシュを無効化
+        """
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                Places.adjust_counters(self.place_id, favorite_count=1)
+            self.place.invalidate_caches()
+            Users.invalidate_profile_caches(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        """
+        お気に入り解除時に場所のお気に入り数を更新し、キャッシュを無効化
+        """
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Places.adjust_counters(self.place_id, favorite_count=-1)
+            self.place.invalidate_caches()
+            Users.invalidate_profile_caches(self.user_id)
+            return result
+
     def __str__(self):
         return f"{self.user.name}さんのお気に入り"
\ No newline at end of file
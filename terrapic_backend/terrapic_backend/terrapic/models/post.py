@@ -1,7 +1,12 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.gis.db import models as gis_models
+from django.templatetags.static import static
 from .user import Users
 from .place import Places
+from .heatmap import HeatmapCell
+from .image import StoredImage
+from ..utils import lonlat_to_cell, SPATIAL_CELL_ZOOMS
 
 class Posts(models.Model):
     """
@@ -27,6 +32,13 @@ class Posts(models.Model):
     )
     # 投稿写真
     photo_image = models.ImageField(upload_to='post_images/')
+    # 表示サイズごとの縮小画像（バックグラウンドで生成され、生成前は空）
+    photo_thumb = models.ImageField(upload_to='post_renditions/', blank=True, default='')
+    photo_card = models.ImageField(upload_to='post_renditions/', blank=True, default='')
+    photo_full = models.ImageField(upload_to='post_renditions/', blank=True, default='')
+    # 縮小画像の生成に連続で失敗した回数と最後に失敗した日時
+    rendition_failures = models.PositiveSmallIntegerField(default=0)
+    rendition_failed_at = models.DateTimeField(null=True, blank=True)
     # 投稿の説明文
     description = models.TextField()
     # 場所の評価（1-5）
@@ -42,22 +54,195 @@ class Posts(models.Model):
     season = models.CharField(max_length=100)
     # いいねの数
     like_count = models.IntegerField(default=0)
+    # 撮影日時（画像のEXIFから取得、ない場合は空）
+    taken_at = models.DateTimeField(null=True, blank=True)
     # 投稿日時
     created_at = models.DateTimeField(auto_now_add=True)
     # 最終更新日時
     updated_at = models.DateTimeField(auto_now=True)
     # 論理削除用の日時
     deleted_at = models.DateTimeField(null=True, blank=True)
+    # 撮影位置を含む空間セルのID（ズームレベル8・12・16のモートン符号）
+    cell_z8 = models.BigIntegerField(null=True, blank=True, db_index=True)
+    cell_z12 = models.BigIntegerField(null=True, blank=True, db_index=True)
+    cell_z16 = models.BigIntegerField(null=True, blank=True, db_index=True)
+
+    CELL_FIELDS = [f'cell_z{zoom}' for zoom in SPATIAL_CELL_ZOOMS]
+    # 縮小画像の種類とフィールド名
+    RENDITION_FIELDS = {
+        'thumb': 'photo_thumb',
+        'card': 'photo_card',
+        'full': 'photo_full',
+    }
+
+    class Meta:
+        # 場所ごとの写真一覧（いいね数順）を高速化するためのインデックス
+        indexes = [
+            models.Index(
+                fields=['place', '-like_count', '-created_at', 'id'],
+                name='post_place_popular_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username}さんの投稿"
 
+    def photo_url(self, rendition=None):
+        """
+        投稿写真のURLを取得する
+
+        メタデータを除去する前の元画像を公開しないよう、縮小画像（full）の生成前は
+        処理中を表す画像のURLを返す
+
+        Args:
+            rendition: 縮小画像の種類（thumb/card/full。省略時は元画像）
+
+        Returns:
+            str: 画像のURL（縮小画像が未生成の場合は処理中を表す画像のURL）
+        """
+        if not self.photo_image:
+            return None
+        if not self.photo_full:
+            return static(settings.POST_PHOTO_PLACEHOLDER)
+        image = getattr(self, self.RENDITION_FIELDS[rendition]) if rendition else None
+        return (image or self.photo_image).url
+
+    @classmethod
+    def image_fields(cls, stored):
+        """
+        保存済みの画像から投稿写真と縮小画像のフィールドの値を取得する
+
+        Args:
+            stored: StoredImage
+
+        Returns:
+            dict: フィールド名をキーとしたファイル名（縮小画像が未生成の場合は空）
+        """
+        return {
+            'photo_image': stored.name,
+            **{
+                field: stored.renditions.get(name, '')
+                for name, field in cls.RENDITION_FIELDS.items()
+            }
+        }
+
+    @property
+    def renditions_ready(self):
+        """すべての縮小画像が生成済みかを確認"""
+        return all(getattr(self, field) for field in self.RENDITION_FIELDS.values())
+
+    def update_cells(self):
+        """
+        撮影位置から各ズームレベルの空間セルIDを計算する
+        """
+        for zoom in SPATIAL_CELL_ZOOMS:
+            cell = None
+            if self.photo_spot_location:
+                cell = lonlat_to_cell(
+                    self.photo_spot_location.x, self.photo_spot_location.y, zoom
+                )
+            setattr(self, f'cell_z{zoom}', cell)
+
+    # 保存前の値と比較して場所の集計値・キャッシュを更新するフィールド
+    TRACKED_FIELDS = {'rating', 'photo_spot_location', 'place', 'place_id'}
+
     def save(self, *args, **kwargs):
         """
-        投稿保存時に関連する場所の評価を更新
+        投稿保存時に空間セルID、関連する場所の評価・評価の分布・集計値を更新
+
+        撮影位置や場所が変わった場合は、変更前の場所・タイル・ヒートマップのセルも更新する
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'photo_spot_location' in update_fields:
+            self.update_cells()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.CELL_FIELDS}
+        with transaction.atomic():
+            adding = self._state.adding
+            rating_changed = update_fields is None or 'rating' in update_fields
+            old = None
+            if not adding and (
+                update_fields is None or not self.TRACKED_FIELDS.isdisjoint(update_fields)
+            ):
+                # 場所の集計値を差分で更新するため保存前の値を取得する
+                old = Posts.objects.select_for_update().filter(pk=self.pk).values(
+                    'rating', 'photo_spot_location', 'place_id', 'like_count'
+                ).first()
+            super().save(*args, **kwargs)
+            if adding:
+                Places.adjust_counters(
+                    self.place_id,
+                    post_count=1,
+                    total_likes=self.like_count
+                )
+                Places.objects.filter(pk=self.place_id).update(latest_post=self)
+                Places.promote_top_post(
+                    self.place_id, self.pk, self.like_count, self.created_at
+                )
+
+            old_rating = old['rating'] if old else None
+            new_rating = old_rating
+            if rating_changed:
+                new_rating = self._meta.get_field('rating').to_python(self.rating)
+            old_location = old['photo_spot_location'] if old else None
+            old_place_id = old['place_id'] if old else self.place_id
+
+            if old_place_id != self.place_id:
+                # 別の場所に移った場合は集計値・評価・代表投稿を移動元から移動先に移す
+                Places.adjust_counters(
+                    old_place_id, post_count=-1, total_likes=-old['like_count']
+                )
+                Places.adjust_counters(
+                    self.place_id, post_count=1, total_likes=old['like_count']
+                )
+                Places.adjust_rating(old_place_id, old_rating=old_rating)
+                Places.adjust_rating(self.place_id, new_rating=new_rating)
+                for place_id in (old_place_id, self.place_id):
+                    Places.refresh_latest_post(place_id)
+                    Places.refresh_top_post(place_id)
+                old_place = Places.objects.filter(pk=old_place_id).first()
+                if old_place is not None:
+                    old_place.invalidate_caches(old_location)
+            elif old_rating != new_rating:
+                # 評価が実際に変わった場合のみ場所の評価を差分で更新する
+                Places.adjust_rating(self.place_id, old_rating, new_rating)
+
+            moved = old_location is not None and old_location != self.photo_spot_location
+            stale_locations = [old_location] if moved else []
+            self.place.invalidate_caches(self.photo_spot_location, *stale_locations)
+            Users.invalidate_profile_caches(self.user_id)
+            HeatmapCell.mark_dirty(self.photo_spot_location, *stale_locations)
+
+    def delete(self, *args, **kwargs):
+        """
+        投稿削除時に関連する場所の集計値と評価を更新し、キャッシュを無効化
+
+        投稿画像の参照を解除し、他に参照がなければコミット後に縮小画像とともにファイルを削除する
         """
-        super().save(*args, **kwargs)
-        self.place.update_rating()
+        with transaction.atomic():
+            # いいね数はF式で更新されるため削除前に最新の値を取得する
+            like_count, rating = Posts.objects.filter(pk=self.pk).values_list(
+                'like_count', 'rating'
+            ).first() or (0, None)
+            result = super().delete(*args, **kwargs)
+            Places.adjust_counters(
+                self.place_id,
+                post_count=-1,
+                total_likes=-like_count
+            )
+            Places.adjust_rating(self.place_id, old_rating=rating)
+            Places.refresh_latest_post(self.place_id)
+            Places.refresh_top_post(self.place_id)
+            self.place.invalidate_caches(self.photo_spot_location)
+            Users.invalidate_profile_caches(self.user_id)
+            HeatmapCell.mark_dirty(self.photo_spot_location)
+            StoredImage.release(self.photo_image.name)
+            # 内容のハッシュで管理していない縮小画像（投稿ごとに生成したもの）は投稿とともに削除する
+            for field in self.RENDITION_FIELDS.values():
+                name = getattr(self, field).name
+                if name and not name.startswith(f'{StoredImage.DIRECTORY}/'):
+                    StoredImage.delete_file_on_commit(name)
+            return result
 
 class Comments(models.Model):
     """
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import models
+from .user import Users
+import os
+import uuid
+
+class UploadSession(models.Model):
+    """
+    再開可能な画像アップロードのセッションを管理するモデル
+
+    受信したバイト列はローカルディスクの一時ファイルに先頭から順に追記し、
+    受信済みのバイト数（received_size）から途中でアップロードを再開できる
+    """
+    # セッションを一意に識別するID（推測されないようUUIDを使用）
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # アップロードするユーザー
+    user = models.ForeignKey(
+        Users,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    # 元のファイル名
+    filename = models.CharField(max_length=255)
+    # ファイル全体のバイト数
+    total_size = models.IntegerField()
+    # 受信済みのバイト数（次に受け付ける開始位置）
+    received_size = models.IntegerField(default=0)
+    # 作成日時
+    created_at = models.DateTimeField(auto_now_add=True)
+    # 最終更新日時
+    updated_at = models.DateTimeField(auto_now=True)
+    # 有効期限（期限切れのセッションはcleanup_upload_sessionsコマンドで削除する）
+    expires_at = models.DateTimeField(db_index=True)
+
+    @property
+    def staging_path(self):
+        """受信したバイト列を保存する一時ファイルのパス"""
+        return os.path.join(settings.UPLOAD_SESSION_DIR, f'{self.id}.part')
+
+    @property
+    def is_complete(self):
+        """ファイル全体を受信済みかどうか"""
+        return self.received_size >= self.total_size
+
+    def __str__(self):
+        return f"{self.user.username}さんのアップロード ({self.received_size}/{self.total_size})"
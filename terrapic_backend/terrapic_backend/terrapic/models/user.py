@@ -54,6 +54,17 @@ class Users(AbstractUser):
     def __str__(self):
         return self.email
 
+    @classmethod
+    def invalidate_profile_caches(cls, *user_ids):
+        """
+        ユーザーのプロフィールに関連するキャッシュをコミット後に無効化
+
+        Args:
+            user_ids: 対象のユーザーID
+        """
+        from ..services import CacheService
+        CacheService.bump_versions_on_commit('user', *user_ids)
+
     @property
     def posts(self):
         """ユーザーの投稿を取得するプロパティ"""
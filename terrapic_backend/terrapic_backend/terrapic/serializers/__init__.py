@@ -2,7 +2,8 @@ from .place import (
     PlaceSerializer,
     PlaceWithPostsSerializer,
     PlaceSearchSerializer,
-    TopPhotoSerializer
+    TopPhotoSerializer,
+    PlacePhotoSerializer
 )
 from .post import (
     PostSerializer,
@@ -16,6 +17,7 @@ from .ranking import (
 )
 from .profile import ProfileSerializer
 from .search import SearchSerializer
+from .viewer_state import ViewerState, ViewerStateListSerializer
 
 __all__ = [
     # Place関連
@@ -23,6 +25,7 @@ __all__ = [
     'PlaceWithPostsSerializer',
     'PlaceSearchSerializer',
     'TopPhotoSerializer',
+    'PlacePhotoSerializer',
     
     # Post関連
     'PostSerializer',
@@ -39,4 +42,8 @@ __all__ = [
 
     # Search関連
     'SearchSerializer',
+
+    # 閲覧ユーザーの状態
+    'ViewerState',
+    'ViewerStateListSerializer',
 ]
\ No newline at end of file
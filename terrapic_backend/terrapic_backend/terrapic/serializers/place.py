@@ -1,10 +1,9 @@
 from rest_framework import serializers
-from ..models import Places, Posts, Favorites
-from django.db.models import Sum
+from ..models import Places, Posts
 
 from rest_framework import serializers
-from django.db.models import Sum
-from ..models import Places, Posts, Favorites
+from ..models import Places, Posts
+from .viewer_state import ViewerState, ViewerStateListSerializer
 
 class PlaceSerializer(serializers.ModelSerializer):
     """
@@ -32,6 +31,12 @@ class PlaceSerializer(serializers.ModelSerializer):
             'post_count', 'is_favorited', 'favorite_count', 'latest_image',
             'total_likes'
         ]
+        list_serializer_class = ViewerStateListSerializer
+
+    @staticmethod
+    def prime_viewer_state(state, instances):
+        """一覧の場所のお気に入り状態をまとめて取得する"""
+        state.prime(place_ids=[obj.id for obj in instances])
 
     def get_latitude(self, obj):
         """緯度を取得"""
@@ -43,29 +48,22 @@ class PlaceSerializer(serializers.ModelSerializer):
 
     def get_is_favorited(self, obj):
         """現在のユーザーがお気に入り登録しているかを確認"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorites.objects.filter(
-                user=request.user,
-                place=obj
-            ).exists()
-        return False
+        return ViewerState.for_request(
+            self.context.get('request')
+        ).is_favorited(obj.id)
 
     def get_latest_image(self, obj):
         """最新の投稿画像URLを取得"""
         request = self.context.get('request')
-        latest_post = Posts.objects.filter(
-            place=obj
-        ).order_by('-created_at').first()
+        latest_post = obj.latest_post
         
         if latest_post and latest_post.photo_image and request:
-            return request.build_absolute_uri(latest_post.photo_image.url)
+            return request.build_absolute_uri(latest_post.photo_url('card'))
         return None
 
     def get_total_likes(self, obj):
         """場所の総いいね数を取得"""
-        return Posts.objects.filter(place=obj).aggregate(
-            Sum('like_count'))['like_count__sum'] or 0
+        return obj.total_likes
 
 class PlaceWithPostsSerializer(serializers.ModelSerializer):
     """
@@ -73,8 +71,8 @@ class PlaceWithPostsSerializer(serializers.ModelSerializer):
     """
     latitude = serializers.SerializerMethodField()
     longitude = serializers.SerializerMethodField()
-    post_count = serializers.IntegerField(source='posts_count')
-    favorite_count = serializers.IntegerField(source='favorites_count')
+    post_count = serializers.IntegerField(read_only=True)
+    favorite_count = serializers.IntegerField(read_only=True)
     posts = serializers.SerializerMethodField()
 
     class Meta:
@@ -136,9 +134,89 @@ class TopPhotoSerializer(serializers.ModelSerializer):
         fields = ['id', 'image_url']
 
     def get_image_url(self, obj):
-        """投稿画像のURLを取得"""
+        """投稿画像（カード用の縮小画像）のURLを取得"""
         request = self.context.get('request')
         if obj.photo_image and hasattr(obj.photo_image, 'url'):
-            return request.build_absolute_uri(obj.photo_image.url) if request else obj.photo_image.url
+            url = obj.photo_url('card')
+            return request.build_absolute_uri(url) if request else url
         return None
 
+class PlacePhotoSerializer(serializers.ModelSerializer):
+    """
+    場所の詳細画面の写真一覧を表すシリアライザー
+
+    いいね状態は一覧の投稿IDをまとめてViewerStateから取得する。
+    コンテキストのviewer_stateがFalseの場合はいいね状態を含めない
+    """
+    url = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
+    likes = serializers.IntegerField(source='like_count', read_only=True)
+    is_liked = serializers.SerializerMethodField()
+    created_at = serializers.SerializerMethodField()
+    user = serializers.SerializerMethodField()
+    photo_spot_location = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Posts
+        fields = [
+            'id', 'url', 'renditions', 'likes', 'is_liked', 'created_at',
+            'user', 'description', 'photo_spot_location'
+        ]
+        list_serializer_class = ViewerStateListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('viewer_state', True):
+            self.fields.pop('is_liked')
+
+    @staticmethod
+    def prime_viewer_state(state, instances):
+        """一覧の写真のいいね状態をまとめて取得する"""
+        state.prime(post_ids=[obj.id for obj in instances])
+
+    def _absolute_url(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_url(self, obj):
+        """投稿画像（全画面用の縮小画像）のURLを取得"""
+        return self._absolute_url(obj.photo_url('full')) if obj.photo_image else None
+
+    def get_renditions(self, obj):
+        """縮小画像の種類ごとのURLを取得（未生成の場合は元画像）"""
+        if not obj.photo_image:
+            return None
+        return {
+            name: self._absolute_url(obj.photo_url(name))
+            for name in Posts.RENDITION_FIELDS
+        }
+
+    def get_is_liked(self, obj):
+        """閲覧ユーザーのいいね状態を取得"""
+        return ViewerState.for_request(self.context.get('request')).is_liked(obj.id)
+
+    def get_created_at(self, obj):
+        """投稿日時をISO 8601形式で取得"""
+        return obj.created_at.isoformat()
+
+    def get_user(self, obj):
+        """投稿ユーザーの情報を取得"""
+        return {
+            'id': obj.user.id,
+            'username': obj.user.username,
+            'profile_image': self._absolute_url(
+                obj.user.profile_image.url
+            ) if obj.user.profile_image else None,
+        }
+
+    def get_photo_spot_location(self, obj):
+        """撮影位置をGeoJSON形式で取得"""
+        if not obj.photo_spot_location:
+            return None
+        return {
+            'type': 'Point',
+            'coordinates': [
+                obj.photo_spot_location.x,
+                obj.photo_spot_location.y
+            ]
+        }
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.gis.geos import Point
 from django.core.files.base import ContentFile
 from ..models import Posts, Likes
+from .viewer_state import ViewerState, ViewerStateListSerializer
 import uuid
 import logging
 
@@ -41,12 +42,18 @@ class PostSerializer(serializers.ModelSerializer):
             'id', 'user', 'user_id', 'place_name', 'displayed_place_name', 
             'place_id', 'photo_image', 'description', 'rating', 'weather', 
             'season', 'likes', 'is_liked', 'created_at', 'latitude', 'longitude',
-            'photo_spot_location',
+            'photo_spot_location', 'taken_at',
         ]
         read_only_fields = [
             'id', 'user_id', 'place_id', 'likes', 
-            'created_at', 'displayed_place_name', 'photo_spot_location',
+            'created_at', 'displayed_place_name', 'photo_spot_location', 'taken_at',
         ]
+        list_serializer_class = ViewerStateListSerializer
+
+    @staticmethod
+    def prime_viewer_state(state, instances):
+        """一覧の投稿のいいね状態をまとめて取得する"""
+        state.prime(post_ids=[obj.id for obj in instances])
 
     def get_user(self, obj):
         """投稿ユーザーの情報を取得"""
@@ -72,10 +79,7 @@ class PostSerializer(serializers.ModelSerializer):
 
     def get_is_liked(self, obj):
         """現在のユーザーがいいねしているかを確認"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Likes.objects.filter(user=request.user, post=obj).exists()
-        return False
+        return ViewerState.for_request(self.context.get('request')).is_liked(obj.id)
     
     def get_photo_spot_location(self, obj):
         """撮影位置を取得する"""
@@ -110,7 +114,7 @@ class PostSerializer(serializers.ModelSerializer):
             # 既存の場所の位置情報を更新
             if not created and place.location != location:
                 place.location = location
-                place.save()
+                place.save(update_fields=['location'])
                 logger.info(f"既存の場所の位置情報を更新: {place.id}")
 
             # 投稿データの準備
@@ -140,10 +144,20 @@ class PostSerializer(serializers.ModelSerializer):
         try:
             data = super().to_representation(instance)
             request = self.context.get('request')
-            if request and instance.photo_image:
-                data['photo_image'] = request.build_absolute_uri(
-                    instance.photo_image.url
+
+            def absolute(url):
+                return request.build_absolute_uri(url) if request and url else url
+
+            # 元画像ではなく縮小画像を返す（未生成の場合は元画像）
+            # 一覧表示ではcontextのphoto_renditionで小さい縮小画像を指定できる
+            if instance.photo_image:
+                data['photo_image'] = absolute(
+                    instance.photo_url(self.context.get('photo_rendition', 'full'))
                 )
+            data['photo_renditions'] = {
+                name: absolute(instance.photo_url(name))
+                for name in Posts.RENDITION_FIELDS
+            } if instance.photo_image else None
             return data
         except Exception as e:
             logger.error(f"データの変換中にエラーが発生: {str(e)}")
@@ -15,8 +15,8 @@ class PlaceRankingSerializer(RankingSerializer):
     """
     場所のランキングシリアライザー
     """
-    post_count = serializers.IntegerField()
-    favorite_count = serializers.IntegerField(source='favorites_count')
+    post_count = serializers.IntegerField(source='ranking_post_count')
+    favorite_count = serializers.IntegerField()
     rating = serializers.SerializerMethodField()
     latest_image = serializers.SerializerMethodField()
 
@@ -38,11 +38,11 @@ class PlaceRankingSerializer(RankingSerializer):
 
     def get_latest_image(self, obj):
         """最新の投稿画像URLを取得"""
-        latest_post = Posts.objects.filter(place=obj).order_by('-created_at').first()
+        latest_post = obj.latest_post
         if latest_post and latest_post.photo_image:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(latest_post.photo_image.url)
+                return request.build_absolute_uri(latest_post.photo_url('card'))
         return None
 
     def to_representation(self, instance):
@@ -60,11 +60,12 @@ class PostRankingSerializer(RankingSerializer):
     user = serializers.SerializerMethodField()
     place = serializers.SerializerMethodField()
     photo_image = serializers.SerializerMethodField()
+    photo_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Posts
         fields = [
-            'id', 'photo_image', 'like_count', 'user', 
+            'id', 'photo_image', 'photo_renditions', 'like_count', 'user', 
             'place', 'created_at', 'rank'
         ]
 
@@ -86,7 +87,16 @@ class PostRankingSerializer(RankingSerializer):
         }
 
     def get_photo_image(self, obj):
-        """投稿画像のURLを取得"""
+        """投稿画像（カード用の縮小画像）のURLを取得"""
         if obj.photo_image:
-            return self.context['request'].build_absolute_uri(obj.photo_image.url)
-        return None
\ No newline at end of file
+            return self.context['request'].build_absolute_uri(obj.photo_url('card'))
+        return None
+
+    def get_photo_renditions(self, obj):
+        """縮小画像の種類ごとのURLを取得（未生成の場合は元画像）"""
+        if not obj.photo_image:
+            return None
+        return {
+            name: self.context['request'].build_absolute_uri(obj.photo_url(name))
+            for name in Posts.RENDITION_FIELDS
+        }
\ No newline at end of file
@@ -36,8 +36,12 @@ class SearchSerializer:
             'id': str(post.id),
             'type': 'post',
             'photo_image': request.build_absolute_uri(
-                post.photo_image.url
+                post.photo_url('card')
             ) if post.photo_image else None,
+            'photo_renditions': {
+                name: request.build_absolute_uri(post.photo_url(name))
+                for name in post.RENDITION_FIELDS
+            } if post.photo_image else None,
             'description': post.description,
             'like_count': post.like_count,
             'created_at': post.created_at.isoformat(),
@@ -88,10 +92,10 @@ class SearchSerializer:
                 'type': 'place',
                 'name': place.name,
                 'image_url': request.build_absolute_uri(
-                    top_post.photo_image.url
+                    top_post.photo_url('thumb')
                 ) if top_post and top_post.photo_image else None,
                 'post_count': getattr(place, 'post_count', 0),
-                'favorite_count': getattr(place, 'favorites_count', 0),
+                'favorite_count': getattr(place, 'favorite_count', 0),
                 'rating': float(place.rating) if place.rating else None,
                 'location': {
                     'latitude': place.location.y if place.location else None,
@@ -0,0 +1,119 @@
+from rest_framework import serializers
+from django.db import models
+from ..models import Likes, Favorites, Follows
+
+
+class ViewerState:
+    """
+    閲覧ユーザーのいいね・お気に入り・フォロー状態をまとめて解決するクラス
+
+    リクエストごとに1つ生成され、レスポンスに含まれる投稿・場所・ユーザーのIDを
+    先に登録（prime）しておくことで、関係ごとに1回のINクエリで状態を取得する。
+    登録されていないIDを参照した場合はそのIDのみを取得する
+    """
+
+    def __init__(self, user=None):
+        self.user = user if user is not None and user.is_authenticated else None
+        # 関係ごとに (確認済みのID, 状態がTrueのID) を保持する
+        self._resolved = {
+            'liked': (set(), set()),
+            'favorited': (set(), set()),
+            'following': (set(), set()),
+        }
+
+    @classmethod
+    def for_request(cls, request):
+        """
+        リクエストに紐づくViewerStateを取得する（なければ生成する）
+
+        Args:
+            request: リクエスト（Noneの場合は未ログインとして扱う）
+
+        Returns:
+            ViewerState: リクエストごとの閲覧状態
+        """
+        if request is None:
+            return cls()
+        state = getattr(request, '_viewer_state', None)
+        if state is None:
+            state = cls(getattr(request, 'user', None))
+            request._viewer_state = state
+        return state
+
+    def _queryset(self, relation, ids):
+        """関係ごとに状態がTrueのIDを取得するクエリを生成する"""
+        if relation == 'liked':
+            return Likes.objects.filter(
+                user=self.user, post_id__in=ids
+            ).values_list('post_id', flat=True)
+        if relation == 'favorited':
+            return Favorites.objects.filter(
+                user=self.user, place_id__in=ids
+            ).values_list('place_id', flat=True)
+        return Follows.objects.filter(
+            follower=self.user, followed_id__in=ids
+        ).values_list('followed_id', flat=True)
+
+    def _load(self, relation, ids):
+        """未確認のIDの状態を1回のクエリで取得する"""
+        checked, matched = self._resolved[relation]
+        ids = {pk for pk in ids if pk is not None} - checked
+        if not ids:
+            return
+        if self.user is not None:
+            matched.update(self._queryset(relation, ids))
+        checked.update(ids)
+
+    def prime(self, post_ids=(), place_ids=(), user_ids=()):
+        """
+        レスポンスで参照するIDを登録し、状態をまとめて取得する
+
+        Args:
+            post_ids: いいね状態を確認する投稿IDのリスト
+            place_ids: お気に入り状態を確認する場所IDのリスト
+            user_ids: フォロー状態を確認するユーザーIDのリスト
+
+        Returns:
+            ViewerState: 自身（メソッドチェーン用）
+        """
+        self._load('liked', post_ids)
+        self._load('favorited', place_ids)
+        self._load('following', user_ids)
+        return self
+
+    def _has(self, relation, pk):
+        self._load(relation, [pk])
+        return pk in self._resolved[relation][1]
+
+    def is_liked(self, post_id):
+        """投稿にいいねしているかを取得する"""
+        return self._has('liked', post_id)
+
+    def is_favorited(self, place_id):
+        """場所をお気に入り登録しているかを取得する"""
+        return self._has('favorited', place_id)
+
+    def is_following(self, user_id):
+        """ユーザーをフォローしているかを取得する"""
+        return self._has('following', user_id)
+
+
+class ViewerStateListSerializer(serializers.ListSerializer):
+    """
+    一覧のシリアライズ前に、要素のIDをViewerStateにまとめて登録するシリアライザー
+
+    子のシリアライザーはprime_viewer_state(state, instances)を実装する。
+    コンテキストのviewer_stateがFalseの場合（閲覧ユーザー間で共有する本文の生成時）は
+    状態を取得しない
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        instances = list(data)
+        if self.context.get('viewer_state', True):
+            self.child.prime_viewer_state(
+                ViewerState.for_request(self.context.get('request')),
+                instances
+            )
+        return super().to_representation(instances)
@@ -1,9 +1,22 @@
 from .place_service import PlaceService
 from .post_service import PostService
 from .profile_service import ProfileService
+from .cache_service import CacheService
+from .tile_service import TileService
+from .map_cache_service import MapCacheService
+from .heatmap_service import HeatmapService
+from .image_service import ImageService
+from .upload_service import UploadService, UploadOffsetError
 
 __all__ = [
     'PlaceService',
     'PostService',
     'ProfileService',
+    'CacheService',
+    'TileService',
+    'MapCacheService',
+    'HeatmapService',
+    'ImageService',
+    'UploadService',
+    'UploadOffsetError',
 ]
\ No newline at end of file
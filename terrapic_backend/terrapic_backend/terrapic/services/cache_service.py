@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from django.db import transaction
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CacheService:
+    """キャッシュのバージョン管理を行うサービスクラス"""
+
+    @staticmethod
+    def _version_key(scope, key):
+        return f'version:{scope}:{key}'
+
+    @staticmethod
+    def get_version(scope, key):
+        """
+        キャッシュのバージョンを取得する
+
+        バージョンが存在しない場合は現在時刻（ミリ秒）で初期化するため、
+        キャッシュから追い出された後も以前のバージョンと衝突しない
+
+        Args:
+            scope: バージョンの種類（tile, place など）
+            key: 対象の識別子
+
+        Returns:
+            int: 現在のバージョン
+        """
+        cache_key = CacheService._version_key(scope, key)
+        version = cache.get(cache_key)
+        if version is None:
+            cache.add(cache_key, int(time.time() * 1000), None)
+            version = cache.get(cache_key, int(time.time() * 1000))
+        return version
+
+    @staticmethod
+    def get_versions(scope, keys):
+        """
+        複数のキャッシュのバージョンをまとめて取得する
+
+        Args:
+            scope: バージョンの種類（tile, place など）
+            keys: 対象の識別子のリスト
+
+        Returns:
+            dict: 識別子をキーとしたバージョンの辞書
+        """
+        cache_keys = {CacheService._version_key(scope, key): key for key in keys}
+        found = cache.get_many(list(cache_keys))
+        versions = {cache_keys[cache_key]: version for cache_key, version in found.items()}
+        for key in keys:
+            if key not in versions:
+                versions[key] = CacheService.get_version(scope, key)
+        return versions
+
+    @staticmethod
+    def bump_version(scope, key):
+        """
+        キャッシュのバージョンを更新する
+
+        Args:
+            scope: バージョンの種類（tile, place など）
+            key: 対象の識別子
+
+        Returns:
+            int: 更新後のバージョン
+        """
+        cache_key = CacheService._version_key(scope, key)
+        try:
+            return cache.incr(cache_key)
+        except ValueError:
+            version = int(time.time() * 1000)
+            cache.set(cache_key, version, None)
+            return version
+
+    @staticmethod
+    def bump_versions_on_commit(scope, *keys):
+        """
+        トランザクションのコミット後にキャッシュのバージョンを更新する
+
+        コミット前に更新すると、古いデータを新しいバージョンで
+        キャッシュされる可能性があるためコミット後に行う
+
+        Args:
+            scope: バージョンの種類（tile, place など）
+            keys: 対象の識別子
+        """
+        def bump():
+            try:
+                for key in keys:
+                    CacheService.bump_version(scope, key)
+            except Exception as e:
+                # キャッシュの無効化失敗で書き込み処理を失敗させない
+                logger.error(f"キャッシュのバージョン更新中にエラー: {str(e)}")
+
+        transaction.on_commit(bump)
@@ -0,0 +1,193 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum, F, Value, IntegerField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from ..models import HeatmapCell, Posts
+from ..utils import (
+    lonlat_to_tile,
+    tile_bounds,
+    cell_to_tile,
+    validate_bbox,
+    SPATIAL_CELL_ZOOMS
+)
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HeatmapService:
+    """撮影スポットの密度ヒートマップを管理するサービスクラス"""
+
+    @staticmethod
+    def get_heatmap(min_lat, max_lat, min_lon, max_lon, zoom):
+        """
+        境界ボックス内の撮影スポットの密度をグリッドで取得する
+
+        事前集計したセルを表示用のグリッドにまとめるため、投稿テーブルは参照しない
+
+        Args:
+            min_lat: 最小緯度
+            max_lat: 最大緯度
+            min_lon: 最小経度
+            max_lon: 最大経度
+            zoom: 地図のズームレベル
+
+        Returns:
+            dict: グリッドのズームレベルと、セルごとの
+                  [中心の緯度, 中心の経度, 投稿数, 総いいね数] のリスト
+
+        Raises:
+            ValueError: 範囲が不正、またはズームレベルに対して広すぎる場合
+        """
+        try:
+            # 返すセル数を抑えるため、範囲を覆うタイル数をズームレベルに応じて制限する
+            validate_bbox(
+                min_lat, max_lat, min_lon, max_lon, zoom, settings.MAP_HEATMAP_MAX_TILES
+            )
+
+            # 1タイルをMAP_HEATMAP_CELLS_PER_TILE分割したグリッドで集計する
+            grid_zoom = min(
+                zoom + int(math.log2(settings.MAP_HEATMAP_CELLS_PER_TILE)),
+                SPATIAL_CELL_ZOOMS[-1]
+            )
+            cell_zoom = next(z for z in SPATIAL_CELL_ZOOMS if z >= grid_zoom)
+            scale = 2 ** (cell_zoom - grid_zoom)
+
+            min_x, min_y = lonlat_to_tile(min_lon, max_lat, cell_zoom)
+            max_x, max_y = lonlat_to_tile(max_lon, min_lat, cell_zoom)
+
+            rows = HeatmapCell.objects.filter(
+                zoom=cell_zoom,
+                x__gte=min_x, x__lte=max_x,
+                y__gte=min_y, y__lte=max_y,
+                post_count__gt=0
+            ).annotate(
+                grid_x=F('x') / Value(scale, output_field=IntegerField()),
+                grid_y=F('y') / Value(scale, output_field=IntegerField()),
+            ).values(
+                'grid_x', 'grid_y'
+            ).annotate(
+                posts=Sum('post_count'),
+                likes=Sum('like_count'),
+            ).order_by()
+
+            cells = []
+            for row in rows:
+                west, south, east, north = tile_bounds(
+                    row['grid_x'], row['grid_y'], grid_zoom
+                )
+                cells.append([
+                    round((south + north) / 2, 6),
+                    round((west + east) / 2, 6),
+                    row['posts'],
+                    row['likes'],
+                ])
+
+            return {
+                'zoom': zoom,
+                'grid_zoom': grid_zoom,
+                'cells': cells,
+            }
+
+        except Exception as e:
+            logger.error(f"ヒートマップ取得中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def refresh_dirty_cells(batch_size=1000):
+        """
+        更新待ちのセルを投稿から再集計する
+
+        集計中に再び更新待ちになったセルは次回の再集計の対象に残す
+
+        Args:
+            batch_size: 1回の集計で処理するセル数
+
+        Returns:
+            int: 再集計したセル数
+        """
+        try:
+            refreshed = 0
+            for zoom in SPATIAL_CELL_ZOOMS:
+                cell_field = f'cell_z{zoom}'
+                last_id = 0
+                while True:
+                    started_at = timezone.now()
+                    batch = list(HeatmapCell.objects.filter(
+                        zoom=zoom, dirty=True, id__gt=last_id
+                    ).order_by('id')[:batch_size])
+                    if not batch:
+                        break
+                    last_id = batch[-1].id
+
+                    # 事前計算した空間セルIDでグループ化して集計する
+                    totals = {
+                        row[cell_field]: row
+                        for row in Posts.objects.filter(**{
+                            f'{cell_field}__in': [cell.cell for cell in batch]
+                        }).values(cell_field).annotate(
+                            posts=Count('id'),
+                            likes=Coalesce(Sum('like_count'), 0),
+                        ).order_by()
+                    }
+
+                    empty_ids = []
+                    for cell in batch:
+                        row = totals.get(cell.cell)
+                        cell.post_count = row['posts'] if row else 0
+                        cell.like_count = row['likes'] if row else 0
+                        if not row:
+                            empty_ids.append(cell.id)
+
+                    with transaction.atomic():
+                        HeatmapCell.objects.bulk_update(
+                            batch, ['post_count', 'like_count']
+                        )
+                        settled = HeatmapCell.objects.filter(
+                            id__in=[cell.id for cell in batch],
+                            updated_at__lte=started_at
+                        )
+                        # 投稿のなくなったセルは削除し、それ以外は更新待ちを解除する
+                        settled.filter(id__in=empty_ids).delete()
+                        settled.update(dirty=False)
+
+                    refreshed += len(batch)
+
+            return refreshed
+
+        except Exception as e:
+            logger.error(f"ヒートマップの再集計中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def mark_all_dirty(batch_size=1000):
+        """
+        撮影スポットのある全セルを更新待ちにする（全件の再集計用）
+
+        Args:
+            batch_size: 1回の登録で処理するセル数
+        """
+        try:
+            HeatmapCell.objects.update(dirty=True)
+            for zoom in SPATIAL_CELL_ZOOMS:
+                cell_field = f'cell_z{zoom}'
+                cell_ids = Posts.objects.filter(**{
+                    f'{cell_field}__isnull': False
+                }).values_list(cell_field, flat=True).distinct().order_by()
+
+                cells = []
+                for cell_id in cell_ids.iterator():
+                    x, y = cell_to_tile(cell_id, zoom)
+                    cells.append(HeatmapCell(
+                        zoom=zoom, cell=cell_id, x=x, y=y, dirty=True
+                    ))
+                    if len(cells) >= batch_size:
+                        HeatmapCell.objects.bulk_create(cells, ignore_conflicts=True)
+                        cells = []
+                if cells:
+                    HeatmapCell.objects.bulk_create(cells, ignore_conflicts=True)
+
+        except Exception as e:
+            logger.error(f"ヒートマップの全件更新待ち登録中にエラー: {str(e)}")
+            raise
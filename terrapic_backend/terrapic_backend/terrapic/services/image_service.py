@@ -0,0 +1,442 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from ..models import Posts, Users, StoredImage
+from .cache_service import CacheService
+import io
+import tempfile
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# EXIFのタグ番号
+_EXIF_ORIENTATION = 0x0112
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_EXIF_DATETIME_ORIGINAL = 0x9003
+_EXIF_OFFSET_TIME_ORIGINAL = 0x9011
+
+# 元画像を保存し直す際に残す画像情報（EXIF・XMP・コメントなどはすべて取り除く）
+_KEPT_INFO = ('icc_profile', 'dpi', 'transparency', 'background', 'duration', 'loop', 'disposal')
+# 保存時に画像情報から引き継がれないよう明示的に空にするメタデータ
+_EMPTY_METADATA = {'exif': b'', 'comment': b'', 'xmp': b''}
+
+def _gps_to_degrees(value, ref):
+    """EXIFの度・分・秒の緯度経度を10進数の度に変換する"""
+    degrees, minutes, seconds = (float(part) for part in value)
+    result = degrees + minutes / 60 + seconds / 3600
+    return -result if ref in ('S', 'W') else result
+
+def _read_location(exif):
+    """EXIFのGPS情報から撮影位置を取得する（取得できない場合はNone）"""
+    try:
+        gps = exif.get_ifd(_GPS_IFD)
+        if not all(tag in gps for tag in (1, 2, 3, 4)):
+            return None
+        latitude = _gps_to_degrees(gps[2], gps[1])
+        longitude = _gps_to_degrees(gps[4], gps[3])
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    # 範囲外の値と未測位（0, 0）は無視する
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    if latitude == 0 and longitude == 0:
+        return None
+    return Point(longitude, latitude, srid=4326)
+
+def _read_taken_at(exif):
+    """EXIFの撮影日時を取得する（取得できない場合はNone）"""
+    try:
+        exif_ifd = exif.get_ifd(_EXIF_IFD)
+        value = exif_ifd.get(_EXIF_DATETIME_ORIGINAL)
+        if not value:
+            return None
+        taken_at = datetime.strptime(str(value).strip('\x00 '), '%Y:%m:%d %H:%M:%S')
+        offset = str(exif_ifd.get(_EXIF_OFFSET_TIME_ORIGINAL) or '').strip('\x00 ')
+        if offset:
+            # タイムゾーンのオフセット（+09:00など）がある場合はそれを使用する
+            return datetime.strptime(
+                f'{taken_at:%Y-%m-%d %H:%M:%S}{offset}', '%Y-%m-%d %H:%M:%S%z'
+            )
+        return timezone.make_aware(taken_at)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def _strip_info(image):
+    """画像情報から保存時に書き込まれるメタデータを取り除く"""
+    for key in list(image.info):
+        if key not in _KEPT_INFO:
+            del image.info[key]
+
+def _get_executor():
+    """縮小画像の生成に使用するスレッドプールを取得する（初回のみ生成）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POST_PHOTO_RENDITION_WORKERS,
+                thread_name_prefix='photo-renditions'
+            )
+        return _executor
+
+class ImageService:
+    """投稿写真の縮小画像（サムネイル・カード・全画面用）を管理するサービスクラス"""
+
+    @staticmethod
+    def render_renditions(image):
+        """
+        デコード済みの画像から各サイズの縮小画像を生成する
+
+        大きいサイズから順に縮小し、次のサイズは直前の縮小画像から生成するため
+        元画像の縮小は1回で済む
+
+        Args:
+            image: 向きを補正済みのPIL画像
+
+        Returns:
+            dict: 縮小画像の種類をキーとしたJPEGデータ（bytes）の辞書
+        """
+        # 透過部分は白で塗りつぶしてJPEGに変換する
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        renditions = {}
+        current = image
+        for name, size in sorted(
+            settings.POST_PHOTO_RENDITIONS.items(), key=lambda item: -item[1]
+        ):
+            current = current.copy()
+            current.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            current.save(
+                buffer, 'JPEG',
+                quality=settings.POST_PHOTO_RENDITION_QUALITY,
+                optimize=True, progressive=True
+            )
+            renditions[name] = buffer.getvalue()
+        return renditions
+
+    @staticmethod
+    def read_metadata(image_file):
+        """
+        アップロードされた画像のEXIFから撮影位置・撮影日時を読み取る
+
+        画素データはデコードせず、ヘッダーとEXIFのみを読み込む。
+        向きの補正・メタデータの除去・縮小画像の生成はコミット後にバックグラウンドで
+        1回のデコードでまとめて行う（generate_renditions）
+
+        Args:
+            image_file: 検証済みのアップロードファイル
+
+        Returns:
+            dict: 以下のキーを持つ辞書
+                location: EXIFの撮影位置（Point、ない場合はNone）
+                taken_at: EXIFの撮影日時（ない場合はNone）
+
+        Raises:
+            ValueError: 画像を読み込めない場合
+        """
+        try:
+            image_file.seek(0)
+            try:
+                image = Image.open(image_file)
+            except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+                raise ValueError('画像を読み込めませんでした。')
+
+            with image:
+                exif = image.getexif()
+                metadata = {
+                    'location': _read_location(exif),
+                    'taken_at': _read_taken_at(exif),
+                }
+            image_file.seek(0)
+            return metadata
+
+        except Exception as e:
+            logger.error(f"アップロード画像のEXIF読み取り中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def strip_image(image):
+        """
+        画像のEXIFの向きを補正し、メタデータを除いて保存し直す
+
+        位置情報・コメント・XMPなどのメタデータを書き込まずに保存し直す。
+        向きの補正が不要なJPEGは元の量子化テーブルを使い画質を保つ。
+        GIFはアニメーションを保つため全フレームを保存し直す。
+        補正後の画像はそのまま縮小画像の生成に使用できる
+
+        Args:
+            image: 開いた画像（PIL画像、補正後の画像に置き換えられる）
+
+        Returns:
+            File: メタデータを除いた画像（呼び出し側で閉じる）
+        """
+        image_format = image.format
+        orientation = image.getexif().get(_EXIF_ORIENTATION, 1)
+        options = {'icc_profile': image.info.get('icc_profile'), **_EMPTY_METADATA}
+
+        # 大きい画像はディスクに退避する
+        buffer = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        if image_format == 'GIF':
+            _strip_info(image)
+            image.save(
+                buffer, 'GIF', save_all=getattr(image, 'is_animated', False), **options
+            )
+            image.seek(0)
+        else:
+            # 複製を作らずにデコード済みの画像をそのまま回転する
+            ImageOps.exif_transpose(image, in_place=True)
+            _strip_info(image)
+            if image_format == 'JPEG' and orientation == 1:
+                image.save(buffer, 'JPEG', quality='keep', **options)
+            elif image_format in ('JPEG', 'MPO'):
+                image.save(
+                    buffer, 'JPEG', quality=settings.POST_PHOTO_INGEST_QUALITY, **options
+                )
+            else:
+                image.save(buffer, 'PNG', optimize=True, **options)
+        buffer.seek(0)
+        return File(buffer)
+
+    @staticmethod
+    def strip_upload(image_file):
+        """
+        アップロードされた画像からメタデータを除いた画像を生成する（プロフィール画像用）
+
+        Args:
+            image_file: 検証済みのアップロードファイル
+
+        Returns:
+            File: メタデータを除いた画像（呼び出し側で閉じる）
+
+        Raises:
+            ValueError: 画像を読み込めない場合
+        """
+        try:
+            image_file.seek(0)
+            try:
+                image = Image.open(image_file)
+                with image:
+                    return ImageService.strip_image(image)
+            except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+                raise ValueError('画像を読み込めませんでした。')
+
+        except Exception as e:
+            logger.error(f"アップロード画像のメタデータ除去中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def process_image(image):
+        """
+        投稿写真を1回デコードし、メタデータを除いた元画像と縮小画像を生成する
+
+        Args:
+            image: 開いた投稿写真（PIL画像）
+
+        Returns:
+            tuple: (File: メタデータを除いた元画像（呼び出し側で閉じる）,
+                    dict: render_renditionsの戻り値)
+        """
+        content = ImageService.strip_image(image)
+        return content, ImageService.render_renditions(image)
+
+    @staticmethod
+    def save_processed(post, content=None, renditions=None, source_sha256=''):
+        """
+        メタデータを除いた元画像と縮小画像を保存して投稿に登録する
+
+        元画像と縮小画像は内容のハッシュで保存し、処理前の画像の参照を解除する。
+        content・renditionsを省略した場合は、同じアップロードから生成済みの画像を参照する。
+        投稿のsave()は集計値の更新を伴うため、画像のフィールドのみ更新する
+
+        Args:
+            post: 投稿
+            content: process_imageで生成した元画像
+            renditions: render_renditionsの戻り値
+            source_sha256: 処理前の画像のSHA-256
+
+        Returns:
+            bool: 登録した場合はTrue（処理中に投稿が削除・画像が変更された場合はFalse）
+        """
+        original_name = post.photo_image.name
+
+        with transaction.atomic():
+            if content is None:
+                stored = StoredImage.acquire(StoredImage.processed(source_sha256))
+                if stored is None:
+                    return False
+            else:
+                # メタデータを除いて保存し直した画像はアップロードより大きくなる場合がある
+                stored = StoredImage.store(content, max_size=None)
+                stored.save_renditions(renditions, source_sha256)
+
+            # 処理中に投稿の画像が変わっていない場合のみ登録する
+            image_fields = Posts.image_fields(stored)
+            updated = Posts.objects.filter(
+                pk=post.pk, photo_image=original_name
+            ).update(
+                rendition_failures=0,
+                rendition_failed_at=None,
+                **image_fields
+            )
+            if not updated:
+                StoredImage.release(stored.name)
+                return False
+
+            # 処理前の画像の参照を解除する（ハッシュで管理していない画像はコミット後に削除）
+            if not StoredImage.release(original_name):
+                StoredImage.delete_file_on_commit(original_name)
+            for field, name in image_fields.items():
+                getattr(post, field).name = name
+
+        # 画像URLを含むキャッシュ（場所詳細・プロフィール・ランキング）を無効化
+        CacheService.bump_versions_on_commit('place', post.place_id)
+        CacheService.bump_versions_on_commit('ranking', 'posts')
+        Users.invalidate_profile_caches(post.user_id)
+        return True
+
+    @staticmethod
+    def generate_renditions(post_id):
+        """
+        投稿写真のメタデータを除去し、縮小画像を生成する
+
+        画像のデコードは1回のみ行い、同じデコード結果から元画像と縮小画像を保存する。
+        同じ内容のアップロードを処理済みの場合はデコードせずにその結果を参照する。
+        生成に失敗した場合は投稿の失敗回数を1増やす
+
+        Args:
+            post_id: 投稿のID
+
+        Returns:
+            bool: 生成した場合はTrue（投稿が存在しない・生成済みの場合はFalse）
+        """
+        try:
+            post = Posts.objects.filter(pk=post_id).first()
+            if post is None or not post.photo_image or post.renditions_ready:
+                return False
+
+            source_sha256 = StoredImage.objects.filter(
+                name=post.photo_image.name
+            ).values_list('sha256', flat=True).first() or ''
+            if source_sha256 and StoredImage.processed(source_sha256).exists():
+                return ImageService.save_processed(post, source_sha256=source_sha256)
+
+            with post.photo_image.open('rb') as file:
+                with Image.open(file) as image:
+                    content, renditions = ImageService.process_image(image)
+
+            try:
+                return ImageService.save_processed(post, content, renditions, source_sha256)
+            finally:
+                content.close()
+
+        except Exception as e:
+            logger.error(f"縮小画像の生成中にエラー: post {post_id}: {str(e)}")
+            ImageService.record_rendition_failure(post_id)
+            raise
+
+    @staticmethod
+    def record_rendition_failure(post_id):
+        """
+        縮小画像の生成に失敗した回数と日時を記録する
+
+        Args:
+            post_id: 投稿のID
+        """
+        try:
+            Posts.objects.filter(pk=post_id).update(
+                rendition_failures=F('rendition_failures') + 1,
+                rendition_failed_at=timezone.now()
+            )
+        except Exception as e:
+            # 記録の失敗で元のエラーを隠さない
+            logger.error(f"縮小画像の生成失敗の記録中にエラー: post {post_id}: {str(e)}")
+
+    @staticmethod
+    def _generate_in_background(post_id):
+        """バックグラウンドのスレッドで縮小画像を生成する"""
+        try:
+            ImageService.generate_renditions(post_id)
+        except Exception:
+            # 生成に失敗した投稿はgenerate_renditionsコマンドで再処理される
+            logger.exception(f"縮小画像のバックグラウンド生成中にエラー: 投稿ID {post_id}")
+        finally:
+            connection.close()
+
+    @staticmethod
+    def queue_renditions(post_id):
+        """
+        トランザクションのコミット後に縮小画像の生成をバックグラウンドで開始する
+
+        Args:
+            post_id: 投稿のID
+        """
+        transaction.on_commit(
+            lambda: _get_executor().submit(ImageService._generate_in_background, post_id)
+        )
+
+    @staticmethod
+    def generate_pending_renditions(batch_size=100, retry_failed=False):
+        """
+        縮小画像が未生成の投稿をまとめて処理する
+
+        生成にPOST_PHOTO_RENDITION_MAX_ATTEMPTS回失敗した投稿は、画像が壊れている
+        可能性が高いため処理しない
+
+        Args:
+            batch_size: 1回に処理する投稿数
+            retry_failed: Trueの場合は失敗回数をリセットして上限に達した投稿も処理する
+
+        Returns:
+            tuple: (int: 生成した投稿数, int: 失敗した投稿数)
+        """
+        try:
+            pending = Q()
+            for field in Posts.RENDITION_FIELDS.values():
+                pending |= Q(**{field: ''})
+
+            if retry_failed:
+                Posts.objects.filter(pending, rendition_failures__gt=0).update(
+                    rendition_failures=0, rendition_failed_at=None
+                )
+
+            generated = failed = 0
+            last_id = 0
+            while True:
+                post_ids = list(Posts.objects.filter(
+                    pending,
+                    id__gt=last_id,
+                    rendition_failures__lt=settings.POST_PHOTO_RENDITION_MAX_ATTEMPTS
+                ).exclude(photo_image='').order_by('id').values_list(
+                    'id', flat=True
+                )[:batch_size])
+                if not post_ids:
+                    break
+                for post_id in post_ids:
+                    try:
+                        if ImageService.generate_renditions(post_id):
+                            generated += 1
+                    except Exception:
+                        failed += 1
+                last_id = post_ids[-1]
+
+            return generated, failed
+
+        except Exception as e:
+            logger.error(f"未生成の縮小画像の処理中にエラー: {str(e)}")
+            raise
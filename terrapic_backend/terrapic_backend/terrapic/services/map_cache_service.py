@@ -0,0 +1,239 @@
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.cache import cache
+from django.db.models import Count
+from ..models import Places
+from ..serializers import PlaceWithPostsSerializer
+from ..utils import (
+    lonlat_to_tile, tile_bounds, tile_to_cell, cell_key_expression, encode_cursor
+)
+from .cache_service import CacheService
+from .place_service import PlaceService
+from decimal import Decimal
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 場所が多すぎるためキャッシュしないタイルを表す値
+DENSE_TILE = 'dense'
+
+class MapCacheService:
+    """
+    地図の境界ボックス検索の結果をタイル単位でキャッシュするサービスクラス
+
+    境界ボックスを固定のタイルグリッドに揃え、タイルごとにシリアライズ済みの
+    場所データをキャッシュする。キャッシュはベクタータイルと同じタイルの
+    バージョンで管理するため、投稿・お気に入りの更新時は該当タイルのみ無効化される。
+    場所がMAP_BBOX_CACHE_TILE_MAX_PLACESを超えるタイルはキャッシュせず、
+    データベースの件数制限付きの検索に任せる
+    """
+
+    @staticmethod
+    def _tile_range(min_lat, max_lat, min_lon, max_lon, zoom):
+        """境界ボックスを覆うタイルの範囲を取得する"""
+        min_x, min_y = lonlat_to_tile(min_lon, max_lat, zoom)
+        max_x, max_y = lonlat_to_tile(max_lon, min_lat, zoom)
+        return min_x, min_y, max_x, max_y
+
+    @staticmethod
+    def choose_zoom(min_lat, max_lat, min_lon, max_lon):
+        """
+        境界ボックスのキャッシュに使用するタイルのズームレベルを決定する
+
+        タイル数が上限以内に収まる最も細かいズームレベルを選ぶ
+
+        Returns:
+            int: ズームレベル（上限内に収まらない場合はNone）
+        """
+        for zoom in range(settings.MAP_BBOX_CACHE_MAX_ZOOM,
+                          settings.MAP_BBOX_CACHE_MIN_ZOOM - 1, -1):
+            min_x, min_y, max_x, max_y = MapCacheService._tile_range(
+                min_lat, max_lat, min_lon, max_lon, zoom
+            )
+            tile_count = (max_x - min_x + 1) * (max_y - min_y + 1)
+            if tile_count <= settings.MAP_BBOX_CACHE_MAX_TILES:
+                return zoom
+        return None
+
+    @staticmethod
+    def _sort_key(entry, order):
+        """キャッシュした場所データのソートキーを取得する"""
+        if order == 'popularity':
+            return entry['post_count']
+        if order == 'rating':
+            return entry['rating']
+        return entry['latest_post_id']
+
+    @staticmethod
+    def _build_fragments(zoom, tiles):
+        """
+        キャッシュのないタイルの場所データをまとめて生成する
+
+        Args:
+            zoom: ズームレベル
+            tiles: (x, y) のリスト
+
+        Returns:
+            dict: (x, y) をキーとしたタイル内の場所データのリスト
+                  （場所が多すぎるタイルはDENSE_TILE）
+        """
+        def to_area(tiles):
+            return MultiPolygon([
+                Polygon.from_bbox(tile_bounds(x, y, zoom)) for x, y in tiles
+            ])
+
+        # 空間セルIDでタイルごとの場所数を数え、多すぎるタイルは読み込まない
+        cell_key, _ = cell_key_expression(zoom)
+        tile_cells = {tile_to_cell(x, y, zoom): (x, y) for x, y in tiles}
+        counts = Places.objects.filter(
+            location__intersects=to_area(tiles)
+        ).annotate(
+            cell=cell_key
+        ).values('cell').annotate(
+            place_count=Count('id')
+        ).order_by()
+        dense = {
+            tile_cells[row['cell']]
+            for row in counts
+            if row['cell'] in tile_cells
+            and row['place_count'] > settings.MAP_BBOX_CACHE_TILE_MAX_PLACES
+        }
+
+        fragments = {
+            tile: DENSE_TILE if tile in dense else [] for tile in tiles
+        }
+        sparse = [tile for tile in tiles if tile not in dense]
+        if not sparse:
+            return fragments
+
+        places = Places.objects.filter(
+            location__intersects=to_area(sparse)
+        ).prefetch_related(PlaceService.location_posts_prefetch())
+
+        places = list(places)
+        data = PlaceWithPostsSerializer(places, many=True).data
+
+        for place, item in zip(places, data):
+            # 無効化と同じ計算で所属タイルを決め、境界上の場所の重複を防ぐ
+            tile = lonlat_to_tile(place.location.x, place.location.y, zoom)
+            if fragments.get(tile, DENSE_TILE) == DENSE_TILE:
+                continue
+            fragments[tile].append({
+                'id': place.id,
+                'post_count': place.post_count,
+                'rating': place.rating if place.rating is not None else Decimal('0'),
+                'latest_post_id': place.latest_post_id or 0,
+                'data': dict(item),
+            })
+
+        return fragments
+
+    @staticmethod
+    def find_places_in_bounds(min_lat, max_lat, min_lon, max_lon,
+                              order='popularity', limit=None, cursor=None):
+        """
+        タイル単位のキャッシュから境界ボックス内の場所を取得する
+
+        並び順・件数・カーソルの扱いはPlaceService.find_places_in_boundsと同じ
+
+        Args:
+            min_lat: 最小緯度
+            max_lat: 最大緯度
+            min_lon: 最小経度
+            max_lon: 最大経度
+            order: 並び順（popularity/rating/recency）
+            limit: 取得件数（上限はMAP_PLACES_MAX_LIMIT）
+            cursor: 前回の結果で返されたカーソル
+
+        Returns:
+            tuple: (list: シリアライズ済みの場所リスト, str: 次ページのカーソル)
+                   タイル数が多すぎる、または場所の多すぎるタイルを含むため
+                   キャッシュを使えない場合はNone
+        """
+        try:
+            min_lat, max_lat = float(min_lat), float(max_lat)
+            min_lon, max_lon = float(min_lon), float(max_lon)
+            if not all(math.isfinite(v) for v in (min_lat, max_lat, min_lon, max_lon)):
+                raise ValueError('座標が不正です。')
+            order, limit = PlaceService.normalize_bounds_params(order, limit)
+
+            zoom = MapCacheService.choose_zoom(min_lat, max_lat, min_lon, max_lon)
+            if zoom is None:
+                return None
+
+            min_x, min_y, max_x, max_y = MapCacheService._tile_range(
+                min_lat, max_lat, min_lon, max_lon, zoom
+            )
+            tiles = [
+                (x, y)
+                for x in range(min_x, max_x + 1)
+                for y in range(min_y, max_y + 1)
+            ]
+
+            # タイルのバージョンをまとめて取得し、キャッシュキーを組み立てる
+            versions = CacheService.get_versions(
+                'tile', [f'{zoom}/{x}/{y}' for x, y in tiles]
+            )
+            cache_keys = {
+                (x, y): f'map_places_{zoom}_{x}_{y}_{versions[f"{zoom}/{x}/{y}"]}'
+                for x, y in tiles
+            }
+
+            cached = cache.get_many(list(cache_keys.values()))
+            fragments = {
+                tile: cached[key] for tile, key in cache_keys.items() if key in cached
+            }
+
+            if DENSE_TILE in fragments.values():
+                return None
+
+            missing = [tile for tile in tiles if tile not in fragments]
+            if missing:
+                built = MapCacheService._build_fragments(zoom, missing)
+                cache.set_many(
+                    {cache_keys[tile]: entries for tile, entries in built.items()},
+                    settings.MAP_TILE_CACHE_TIMEOUT
+                )
+                if DENSE_TILE in built.values():
+                    return None
+                fragments.update(built)
+
+            # 境界ボックスの範囲に絞り込む
+            entries = [
+                entry
+                for tile_entries in fragments.values()
+                for entry in tile_entries
+                if min_lat <= entry['data']['latitude'] <= max_lat
+                and min_lon <= entry['data']['longitude'] <= max_lon
+            ]
+
+            # カーソル以降の場所に絞り込む（キーセットページング）
+            if cursor:
+                cursor_key, cursor_id = PlaceService.decode_bounds_cursor(cursor, order)
+                entries = [
+                    entry for entry in entries
+                    if (MapCacheService._sort_key(entry, order), entry['id'])
+                    < (cursor_key, cursor_id)
+                ]
+
+            entries.sort(
+                key=lambda entry: (MapCacheService._sort_key(entry, order), entry['id']),
+                reverse=True
+            )
+
+            next_cursor = None
+            if len(entries) > limit:
+                entries = entries[:limit]
+                last = entries[-1]
+                next_cursor = encode_cursor({
+                    'order': order,
+                    'key': str(MapCacheService._sort_key(last, order)),
+                    'id': last['id'],
+                })
+
+            return [entry['data'] for entry in entries], next_cursor
+
+        except Exception as e:
+            logger.error(f"タイルキャッシュからの場所検索中にエラー: {str(e)}")
+            raise
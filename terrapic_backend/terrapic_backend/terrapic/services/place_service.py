@@ -1,108 +1,552 @@
-from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.geos import Point, Polygon, MultiPoint
+from django.contrib.gis.db.models.functions import Distance, GeometryDistance
 from django.contrib.gis.measure import D
-from django.db.models import Count, Avg, Q, Prefetch
+from django.db.models import (
+    Count, Avg, Min, Max, F, Q, Value, DecimalField, IntegerField, Prefetch
+)
+from django.db.models.functions import Coalesce
 from django.core.cache import cache
 from django.conf import settings
+from django.utils.dateparse import parse_datetime
 from ..models import Places, Posts
-from ..utils import validate_location_data, get_period_filter
+from ..utils import (
+    validate_location_data,
+    get_period_filter,
+    PointX,
+    PointY,
+    FirstByOrdering,
+    cell_key_expression,
+    radius_to_degrees,
+    haversine_m,
+    validate_bbox,
+    encode_cursor,
+    decode_cursor
+)
+from decimal import Decimal, InvalidOperation
+import math
 import logging
 import requests
 
 logger = logging.getLogger(__name__)
 
+# 近くの場所検索で位置を丸める際に検索範囲へ加える余裕（km）
+NEARBY_ROUNDING_MARGIN_KM = 0.1
+
+
 class PlaceService:
     """場所に関連するビジネスロジックを管理するサービスクラス"""
+
+    # 境界ボックス検索で指定可能な並び順
+    BOUNDS_ORDERS = ('popularity', 'rating', 'recency')
     
     @staticmethod
-    def find_nearby_places(latitude, longitude, radius_km=5):
+    def find_nearby_places(latitude, longitude, radius_km=5, limit=None):
         """
-        指定された位置の近くにある場所を検索する
+        指定された位置の近くにある場所を距離順に検索する
+        
+        GiSTインデックスのKNN演算子（<->）で近い順に候補を取得する。
+        候補は約100m単位に丸めた位置ごとにキャッシュし、距離と並び順は
+        リクエストごとに丸める前の位置からの大円距離で計算する
         
         Args:
             latitude: 緯度
             longitude: 経度
             radius_km: 検索半径（km）
+            limit: 取得件数（省略時はNEARBY_PLACES_LIMIT）
+            
+        Returns:
+            list: 場所の辞書（id, name, latitude, longitude, rating, distance(km)）のリスト
         """
         try:
             validate_location_data(latitude, longitude)
-            
-            user_location = Point(float(longitude), float(latitude))
-            cache_key = f'nearby_places_{latitude}_{longitude}_{radius_km}'
-            
-            # キャッシュをチェック
-            cached_results = cache.get(cache_key)
-            if cached_results:
-                return cached_results
-
-            # 近くの場所を検索
-            places = Places.objects.filter(
-                location__distance_lte=(user_location, D(km=radius_km))
-            ).annotate(
-                distance=D('location', user_location),
-                post_count=Count('posts'),
-                avg_rating=Avg('posts__rating')
-            ).order_by('distance')
-
-            # 結果をキャッシュ（5分間）
-            cache.set(cache_key, places, 300)
-            
-            return places
+            limit = int(limit or settings.NEARBY_PLACES_LIMIT)
+
+            latitude = float(latitude)
+            longitude = float(longitude)
+
+            # 候補は約100m単位に丸めた位置で検索し、近くのユーザー間でキャッシュを共有する
+            cell_latitude = round(latitude, 3)
+            cell_longitude = round(longitude, 3)
+            cache_key = f'nearby_places_{cell_latitude}_{cell_longitude}_{radius_km}_{limit}'
+
+            candidates = cache.get(cache_key)
+            if candidates is None:
+                cell_location = Point(cell_longitude, cell_latitude, srid=4326)
+                # 丸めによるずれ（最大約80m）の分だけ検索範囲を広げる
+                search_km = radius_km + NEARBY_ROUNDING_MARGIN_KM
+
+                # 度単位の範囲でインデックスを使って絞り込む（経度方向は緯度に応じて広げる）
+                radius_degrees = radius_to_degrees(cell_latitude, search_km)
+
+                # KNNの並びは平面上の距離のため、多めに取得して実距離で並べ直す
+                places = Places.objects.filter(
+                    location__dwithin=(cell_location, radius_degrees)
+                ).annotate(
+                    distance=Distance('location', cell_location, spheroid=True)
+                ).filter(
+                    distance__lte=D(km=search_km)
+                ).order_by(
+                    GeometryDistance('location', cell_location)
+                )[:limit * 2]
+
+                candidates = [{
+                    'id': place.id,
+                    'name': place.name,
+                    'latitude': place.location.y,
+                    'longitude': place.location.x,
+                    'rating': float(place.rating) if place.rating else None,
+                } for place in places]
+
+                # 候補をキャッシュ（5分間）
+                cache.set(cache_key, candidates, 300)
+
+            # 距離は丸める前の位置から計算する
+            results = []
+            for place in candidates:
+                distance = haversine_m(
+                    longitude, latitude, place['longitude'], place['latitude']
+                ) / 1000
+                if distance <= radius_km:
+                    results.append({**place, 'distance': distance})
+            results.sort(key=lambda place: place['distance'])
+
+            return results[:limit]
 
         except Exception as e:
             logger.error(f"近くの場所検索中にエラー: {str(e)}")
             raise
 
     @staticmethod
-    def find_places_in_bounds(min_lat, max_lat, min_lon, max_lon):
+    def _bounds_sort_key(order):
+        """
+        境界ボックス検索の並び順に対応するソートキーの式を取得する
+
+        Args:
+            order: 並び順（popularity/rating/recency）
+        """
+        if order == 'popularity':
+            return F('post_count')
+        if order == 'rating':
+            return Coalesce(
+                'rating', Value(Decimal('0')),
+                output_field=DecimalField(max_digits=3, decimal_places=2)
+            )
+        # 投稿IDは作成順に増加するため最新投稿のIDで並べる
+        return Coalesce(
+            F('latest_post_id'), Value(0), output_field=IntegerField()
+        )
+
+    @staticmethod
+    def location_posts_prefetch():
+        """
+        撮影スポットのある投稿をlocation_postsとして先読みする設定を取得する
+
+        投稿の多い場所で読み込み量が増えないよう、場所ごとにトップ投稿と同じ並び順で
+        MAP_PLACE_SPOTS_LIMIT件までに制限する
+        """
+        return Prefetch(
+            'posts',
+            queryset=Posts.objects.exclude(
+                photo_spot_location__isnull=True
+            ).only(
+                'id', 'place_id', 'photo_spot_location'
+            ).order_by(
+                *Places.top_post_ordering()
+            )[:settings.MAP_PLACE_SPOTS_LIMIT],
+            to_attr='location_posts'
+        )
+
+    @staticmethod
+    def normalize_bounds_params(order, limit):
+        """
+        境界ボックス検索の並び順と取得件数を検証する
+
+        Args:
+            order: 並び順（popularity/rating/recency）
+            limit: 取得件数（省略時はMAP_PLACES_DEFAULT_LIMIT）
+
+        Returns:
+            tuple: (str: 並び順, int: 上限を適用した取得件数)
+        """
+        if order not in PlaceService.BOUNDS_ORDERS:
+            raise ValueError(f'並び順は{", ".join(PlaceService.BOUNDS_ORDERS)}のいずれかを指定してください。')
+        limit = min(
+            int(limit or settings.MAP_PLACES_DEFAULT_LIMIT),
+            settings.MAP_PLACES_MAX_LIMIT
+        )
+        if limit <= 0:
+            raise ValueError('取得件数は1以上を指定してください。')
+        return order, limit
+
+    @staticmethod
+    def decode_bounds_cursor(cursor, order):
+        """
+        境界ボックス検索のカーソルをデコードして検証する
+
+        Args:
+            cursor: 前回の結果で返されたカーソル
+            order: 並び順（カーソルの並び順と一致する必要がある）
+
+        Returns:
+            tuple: (Decimal: ソートキー, int: 場所ID)
+
+        Raises:
+            ValueError: カーソルが不正な場合
+        """
+        position = decode_cursor(cursor)
+        if position.get('order') != order:
+            raise ValueError('カーソルの並び順が一致しません。')
+        try:
+            sort_key = Decimal(str(position['key']))
+            place_id = int(position['id'])
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise ValueError('カーソルが不正です。')
+        if not sort_key.is_finite():
+            raise ValueError('カーソルが不正です。')
+        return sort_key, place_id
+
+    @staticmethod
+    def find_places_in_bounds(min_lat, max_lat, min_lon, max_lon,
+                              order='popularity', limit=None, cursor=None,
+                              with_posts=False):
         """
         指定された境界ボックス内の場所を検索する
         
+        件数はサーバー側の上限で打ち切り、続きはカーソルで取得する
+        
         Args:
             min_lat: 最小緯度
             max_lat: 最大緯度
             min_lon: 最小経度
             max_lon: 最大経度
+            order: 並び順（popularity/rating/recency）
+            limit: 取得件数（上限はMAP_PLACES_MAX_LIMIT）
+            cursor: 前回の結果で返されたカーソル
+            with_posts: 撮影スポットのある投稿を含めるか
+            
+        Returns:
+            tuple: (list: 場所リスト, str: 次ページのカーソル（続きがない場合はNone）)
         """
         try:
+            min_lat, max_lat = float(min_lat), float(max_lat)
+            min_lon, max_lon = float(min_lon), float(max_lon)
+            order, limit = PlaceService.normalize_bounds_params(order, limit)
+
             bbox = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
             
             places = Places.objects.filter(
                 location__within=bbox
             ).annotate(
-                post_count=Count('posts'),
-                favorites_count=Count('favorites')
+                sort_key=PlaceService._bounds_sort_key(order),
             )
+
+            # カーソル以降の場所に絞り込む（キーセットページング）
+            if cursor:
+                sort_key, place_id = PlaceService.decode_bounds_cursor(cursor, order)
+                places = places.filter(
+                    Q(sort_key__lt=sort_key) |
+                    Q(sort_key=sort_key, id__lt=place_id)
+                )
+
+            places = places.order_by('-sort_key', '-id')
+
+            if with_posts:
+                places = places.prefetch_related(PlaceService.location_posts_prefetch())
+
+            # 1件多く取得して続きがあるかを判定する
+            places = list(places[:limit + 1])
+            next_cursor = None
+            if len(places) > limit:
+                places = places[:limit]
+                last = places[-1]
+                next_cursor = encode_cursor({
+                    'order': order,
+                    'key': str(last.sort_key),
+                    'id': last.id,
+                })
             
-            return places
+            return places, next_cursor
 
         except Exception as e:
             logger.error(f"境界ボックス内の場所検索中にエラー: {str(e)}")
             raise
 
+    @staticmethod
+    def encode_viewport(min_lat, max_lat, min_lon, max_lon, complete=True):
+        """
+        表示範囲を次回の差分取得に使うトークンにエンコードする
+
+        Args:
+            complete: 表示範囲内の場所をすべて返したか（件数の上限で打ち切っていないか）
+
+        Returns:
+            str: 表示範囲のトークン
+        """
+        return encode_cursor({
+            'bbox': [float(min_lon), float(min_lat), float(max_lon), float(max_lat)],
+            'complete': bool(complete),
+        })
 
     @staticmethod
-    def get_photo_at_location(place_id, latitude, longitude):
+    def decode_viewport(token):
+        """
+        表示範囲のトークンをデコードする
+
+        Returns:
+            tuple: ((min_lat, max_lat, min_lon, max_lon),
+                    bool: 前回のレスポンスが範囲内の場所をすべて返したか)
+
+        Raises:
+            ValueError: トークンが不正な場合
+        """
+        data = decode_cursor(token)
+        bbox = data.get('bbox')
+        if not isinstance(bbox, list) or len(bbox) != 4:
+            raise ValueError('表示範囲のトークンが不正です。')
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox)
+        except (TypeError, ValueError):
+            raise ValueError('表示範囲のトークンが不正です。')
+        return (min_lat, max_lat, min_lon, max_lon), data.get('complete') is True
+
+    @staticmethod
+    def find_viewport_delta(bounds, previous_bounds, limit=None, previous_complete=None,
+                            order='popularity'):
+        """
+        前回の表示範囲との差分で、表示範囲に入った場所と外れた場所を検索する
+
+        前回のレスポンスが件数の上限で打ち切られていた場合や、差分が上限を超える場合は
+        クライアントが重なる範囲の場所をすべて持っている保証がないため差分を返さない
+
+        Args:
+            bounds: 現在の表示範囲 (min_lat, max_lat, min_lon, max_lon)
+            previous_bounds: 前回の表示範囲 (min_lat, max_lat, min_lon, max_lon)
+            limit: 追加・削除する場所の取得件数（上限はMAP_PLACES_MAX_LIMIT）
+            previous_complete: 前回のレスポンスが範囲内の場所をすべて返したか
+                （Noneの場合は前回の範囲内の場所数から判定する）
+            order: 表示範囲に入った場所の並び順（popularity/rating/recency）
+
+        Returns:
+            tuple: (list: 表示範囲に入った場所, list: 表示範囲から外れた場所のID)
+                   差分を返せない場合はNone
+        """
+        try:
+            order, limit = PlaceService.normalize_bounds_params(order, limit)
+
+            def to_polygon(min_lat, max_lat, min_lon, max_lon):
+                return Polygon.from_bbox((
+                    float(min_lon), float(min_lat), float(max_lon), float(max_lat)
+                ))
+
+            current = to_polygon(*bounds)
+            previous = to_polygon(*previous_bounds)
+
+            if previous_complete is None:
+                previous_complete = Places.objects.filter(
+                    location__within=previous
+                ).values('id')[:limit + 1].count() <= limit
+            if not previous_complete:
+                return None
+
+            # 新しく表示された範囲と表示されなくなった範囲
+            entered = current.difference(previous)
+            left = previous.difference(current)
+
+            removed_ids = []
+            if not left.empty:
+                removed_ids = list(Places.objects.filter(
+                    location__within=left
+                ).order_by('id').values_list('id', flat=True)[:limit + 1])
+                if len(removed_ids) > limit:
+                    return None
+
+            added = []
+            if not entered.empty:
+                # 全件の形式と同じ並び順で返す
+                added = list(Places.objects.filter(
+                    location__within=entered
+                ).annotate(
+                    sort_key=PlaceService._bounds_sort_key(order),
+                ).prefetch_related(
+                    PlaceService.location_posts_prefetch()
+                ).order_by('-sort_key', '-id')[:limit + 1])
+                if len(added) > limit:
+                    return None
+
+            return added, removed_ids
+
+        except Exception as e:
+            logger.error(f"表示範囲の差分検索中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def cluster_places_in_bounds(min_lat, max_lat, min_lon, max_lon, zoom):
+        """
+        境界ボックス内の場所をズームレベルに応じたグリッドでクラスタリングする
+
+        Args:
+            min_lat: 最小緯度
+            max_lat: 最大緯度
+            min_lon: 最小経度
+            max_lon: 最大経度
+            zoom: 地図のズームレベル
+
+        Returns:
+            list: クラスタ情報（中心座標、件数、代表場所ID、範囲）のリスト
+
+        Raises:
+            ValueError: 範囲が不正、またはズームレベルに対して広すぎる場合
+        """
+        try:
+            # 返すクラスタ数を抑えるため、範囲を覆うタイル数をズームレベルに応じて制限する
+            validate_bbox(
+                min_lat, max_lat, min_lon, max_lon, zoom, settings.MAP_CLUSTER_MAX_TILES
+            )
+            bbox = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+            # 1タイルをMAP_CLUSTER_CELLS_PER_TILE分割したセルのズームレベル
+            cell_zoom = zoom + int(math.log2(settings.MAP_CLUSTER_CELLS_PER_TILE))
+            cell_key, _ = cell_key_expression(cell_zoom)
+            lon = PointX('location')
+            lat = PointY('location')
+
+            # 事前計算した空間セルID単位で集約する
+            cells = Places.objects.filter(
+                location__within=bbox,
+                cell_z16__isnull=False
+            ).annotate(
+                cell=cell_key,
+            ).values(
+                'cell'
+            ).annotate(
+                place_count=Count('id'),
+                center_lon=Avg(lon),
+                center_lat=Avg(lat),
+                min_lon=Min(lon),
+                max_lon=Max(lon),
+                min_lat=Min(lat),
+                max_lat=Max(lat),
+                top_place_id=FirstByOrdering(
+                    'id',
+                    ordering=(F('rating').desc(nulls_last=True), 'id')
+                ),
+            ).order_by()
+
+            return [{
+                'latitude': cell['center_lat'],
+                'longitude': cell['center_lon'],
+                'count': cell['place_count'],
+                'top_place_id': cell['top_place_id'],
+                'bounds': {
+                    'min_lat': cell['min_lat'],
+                    'min_lon': cell['min_lon'],
+                    'max_lat': cell['max_lat'],
+                    'max_lon': cell['max_lon'],
+                },
+            } for cell in cells]
+
+        except Exception as e:
+            logger.error(f"場所のクラスタリング中にエラー: {str(e)}")
+            raise
+
+
+    @staticmethod
+    def get_photo_at_location(place_id, latitude, longitude, radius_m=None):
         """
         特定の位置での投稿写真を取得
         
+        座標の完全一致ではなく、許容半径内で最も近い撮影位置の投稿を
+        GiSTインデックスのKNN演算子（<->）で取得する。
+        同じ撮影位置に複数の投稿がある場合はいいね数の多い投稿を返す
+        
         Args:
             place_id: 場所のID
             latitude: 緯度
             longitude: 経度
+            radius_m: 許容半径（メートル。省略時はPHOTO_SPOT_MATCH_RADIUS）
             
         Returns:
             Posts: 投稿オブジェクト（見つからない場合はNone）
         """
         try:
+            radius_m = float(radius_m or settings.PHOTO_SPOT_MATCH_RADIUS)
             location = Point(longitude, latitude, srid=4326)
             return Posts.objects.filter(
                 place_id=place_id,
-                photo_spot_location=location
-            ).order_by('-like_count', '-created_at').first()
+                photo_spot_location__dwithin=(
+                    location, radius_to_degrees(latitude, radius_m / 1000)
+                )
+            ).annotate(
+                distance=Distance('photo_spot_location', location, spheroid=True)
+            ).filter(
+                distance__lte=D(m=radius_m)
+            ).order_by(
+                GeometryDistance('photo_spot_location', location),
+                '-like_count',
+                '-created_at'
+            ).first()
         except Exception as e:
             logger.error(f"特定位置での写真取得中にエラー: {str(e)}")
             return None
 
+    @staticmethod
+    def get_photos_at_locations(spots, place_id=None, radius_m=None):
+        """
+        複数の撮影位置の投稿写真を1回のクエリでまとめて取得する
+
+        地図に表示中の撮影スポットの写真を先読みするために使用する。
+        各位置の許容半径内の投稿をまとめて取得し、位置ごとに最も近い
+        （同じ距離の場合はいいね数の多い）投稿を選ぶ
+
+        Args:
+            spots: (緯度, 経度) のリスト
+            place_id: 場所のID（指定した場合はその場所の投稿に限定する）
+            radius_m: 許容半径（メートル。省略時はPHOTO_SPOT_MATCH_RADIUS）
+
+        Returns:
+            list: spotsと同じ順の投稿オブジェクト（見つからない位置はNone）のリスト
+        """
+        try:
+            if not spots:
+                return []
+            radius_m = float(radius_m or settings.PHOTO_SPOT_MATCH_RADIUS)
+            points = [Point(lon, lat, srid=4326) for lat, lon in spots]
+            radius_degrees = max(
+                radius_to_degrees(lat, radius_m / 1000) for lat, _ in spots
+            )
+
+            posts = Posts.objects.filter(
+                photo_spot_location__dwithin=(
+                    MultiPoint(points, srid=4326), radius_degrees
+                )
+            )
+            if place_id is not None:
+                posts = posts.filter(place_id=place_id)
+            candidates = list(posts.only(
+                'id', 'place_id', 'photo_image', 'photo_spot_location',
+                'like_count', 'created_at'
+            ))
+
+            results = []
+            for lat, lon in spots:
+                best = None
+                for post in candidates:
+                    distance = haversine_m(
+                        lon, lat,
+                        post.photo_spot_location.x, post.photo_spot_location.y
+                    )
+                    if distance > radius_m:
+                        continue
+                    key = (distance, -post.like_count, -post.created_at.timestamp())
+                    if best is None or key < best[0]:
+                        best = (key, post)
+                results.append(best[1] if best else None)
+
+            return results
+
+        except Exception as e:
+            logger.error(f"撮影位置の写真の一括取得中にエラー: {str(e)}")
+            raise
+
     @staticmethod
     def get_top_rated_photo(place_id):
         """
@@ -115,142 +559,114 @@ class PlaceService:
             Posts: 投稿オブジェクト（見つからない場合はNone）
         """
         try:
-            return Posts.objects.filter(
-                place_id=place_id
-            ).order_by('-like_count', '-created_at').first()
+            # トップ投稿は場所に保持しているため主キーで取得できる
+            place = Places.objects.select_related('top_post').filter(
+                id=place_id
+            ).first()
+            return place.top_post if place else None
         except Exception as e:
             logger.error(f"トップ写真取得中にエラー: {str(e)}")
             return None
 
     @staticmethod
-    def get_place_photos(place_id, page=1, per_page=10):
+    def get_top_photos(place_ids):
         """
-        場所の写真一覧を取得
-        
+        複数の場所とトップ投稿を1回のクエリでまとめて取得する
+
         Args:
-            place_id: 場所のID
-            page: ページ番号
-            per_page: 1ページあたりの写真数
-            
+            place_ids: 場所IDのリスト
+
         Returns:
-            tuple: (写真リスト, 総数)
+            list: 場所のリスト（指定した順。存在しない場所は含まない）
         """
         try:
-            photos = Posts.objects.filter(
-                place_id=place_id
-            ).order_by('-created_at')
-            
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            
-            return photos[start_idx:end_idx], photos.count()
+            places = Places.objects.filter(
+                id__in=place_ids
+            ).select_related('top_post').in_bulk()
+
+            return [places[place_id] for place_id in place_ids if place_id in places]
+
         except Exception as e:
-            logger.error(f"写真一覧取得中にエラー: {str(e)}")
+            logger.error(f"トップ写真の一括取得中にエラー: {str(e)}")
             raise
 
     @staticmethod
-    def get_place_details(place_id):
+    def get_place_photos(place_id, cursor=None, limit=None):
         """
-        場所の詳細情報を取得する
-        
+        場所の写真をいいね数順にキーセットページングで取得する
+
+        並び順は (-like_count, -created_at, id) で、投稿ユーザーも合わせて取得する
+
         Args:
             place_id: 場所のID
-            
+            cursor: 前回の結果で返されたカーソル
+            limit: 取得件数（上限はPLACE_PHOTOS_MAX_PAGE_SIZE）
+
         Returns:
-            dict: 場所の詳細情報と写真一覧を含む辞書
+            tuple: (list: 投稿リスト, str: 次ページのカーソル（続きがない場合はNone）)
         """
         try:
-            place = Places.objects.get(id=place_id)
-            
-            # 投稿を取得（いいね数順）
+            limit = min(
+                int(limit or settings.PLACE_PHOTOS_PAGE_SIZE),
+                settings.PLACE_PHOTOS_MAX_PAGE_SIZE
+            )
+            if limit <= 0:
+                raise ValueError('取得件数は1以上を指定してください。')
+
             posts = Posts.objects.filter(
-                place=place
-            ).order_by('-like_count', '-created_at')
-            
-            total_ratings = posts.count()
-
-            # 評価の分布を計算
-            if total_ratings > 0:
-                ratings_distribution = {
-                    rating: posts.filter(rating=rating).count()
-                    for rating in range(1, 6)
-                }
-                
-                rating_percentages = {
-                    f"{rating}_star": (count / total_ratings) * 100
-                    for rating, count in ratings_distribution.items()
-                }
-            else:
-                rating_percentages = {f"{i}_star": 0 for i in range(1, 6)}
-
-            # トップ画像の取得（いいね数が最も多い投稿）
-            top_post = posts.first()
-            image_url = top_post.photo_image.url if top_post and top_post.photo_image else None
-
-            # 写真一覧データの作成
-            photos_data = []
-            for post in posts:
-                if post.photo_image:
-                    photos_data.append({
-                        'id': post.id,
-                        'photo_image': post.photo_image.url,
-                        'description': post.description,
-                        'rating': float(post.rating) if post.rating else None,
-                        'like_count': post.like_count,
-                        'created_at': post.created_at.isoformat(),
-                        'user': {
-                            'id': post.user.id,
-                            'username': post.user.username,
-                            'profile_image': post.user.profile_image.url if post.user.profile_image else None,
-                        },
-                        'photo_spot_location': {
-                            'type': 'Point',
-                            'coordinates': [
-                                post.photo_spot_location.x,
-                                post.photo_spot_location.y
-                            ]
-                        } if post.photo_spot_location else None
-                    })
-
-            return {
-                'id': place.id,
-                'name': place.name,
-                'image_url': image_url,
-                'rating': float(place.rating) if place.rating else None,
-                'total_reviews': total_ratings,
-                'rating_distribution': rating_percentages,
-                'favorite_count': place.favorite_count,
-                'photos': photos_data,
-                'latitude': place.location.y,
-                'longitude': place.location.x,
-            }
+                place_id=place_id
+            ).select_related('user')
+
+            # カーソル以降の写真に絞り込む（キーセットページング）
+            if cursor:
+                position = decode_cursor(cursor)
+                try:
+                    likes = int(position['likes'])
+                    created_at = parse_datetime(position['created_at'])
+                    post_id = int(position['id'])
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError('カーソルが不正です。')
+                if created_at is None:
+                    raise ValueError('カーソルが不正です。')
+                posts = posts.filter(
+                    Q(like_count__lt=likes) |
+                    Q(like_count=likes, created_at__lt=created_at) |
+                    Q(like_count=likes, created_at=created_at, id__gt=post_id)
+                )
+
+            # 1件多く取得して続きがあるかを判定する
+            posts = list(posts.order_by('-like_count', '-created_at', 'id')[:limit + 1])
+            next_cursor = None
+            if len(posts) > limit:
+                posts = posts[:limit]
+                last = posts[-1]
+                next_cursor = encode_cursor({
+                    'likes': last.like_count,
+                    'created_at': last.created_at.isoformat(),
+                    'id': last.id,
+                })
+
+            return posts, next_cursor
 
-        except Places.DoesNotExist:
-            logger.warning(f"場所が見つかりません: ID {place_id}")
-            raise
         except Exception as e:
-            logger.error(f"場所の詳細取得中にエラー: {str(e)}")
+            logger.error(f"場所の写真取得中にエラー: {str(e)}")
             raise
 
     @staticmethod
     def update_place_rating(place_id):
         """
-        場所の評価を更新する
-        
+        場所の評価を投稿から再計算する
+
+        平均だけでなく合計・件数・分布もPlaces.recalculate_ratingsで揃えて更新する
+
         Args:
             place_id: 場所のID
         """
         try:
             place = Places.objects.get(id=place_id)
-            
-            # 評価の平均を計算
-            avg_rating = Posts.objects.filter(
-                place=place
-            ).aggregate(Avg('rating'))['rating__avg']
-            
-            place.rating = avg_rating
-            place.save()
-            
+            place.update_rating()
+            place.invalidate_caches()
+
             return place
 
         except Places.DoesNotExist:
@@ -274,15 +690,8 @@ class PlaceService:
             
             places = Places.objects.filter(
                 name__icontains=query
-            ).annotate(
-                post_count=Count('posts', distinct=True),
-                favorites_count=Count('favorites', distinct=True)
-            ).prefetch_related(
-                Prefetch(
-                    'posts',
-                    queryset=Posts.objects.order_by('-like_count'),
-                    to_attr='top_posts'
-                )
+            ).select_related(
+                'top_post'
             ).order_by('-post_count')[:limit]
 
             logger.debug(f"検索結果: {places.count()}件")
@@ -361,8 +770,6 @@ class PlaceService:
         try:
             return Places.objects.filter(
                 name__istartswith=query
-            ).annotate(
-                post_count=Count('posts')
             ).order_by(
                 '-post_count'
             )[:limit]
@@ -382,15 +789,22 @@ class PlaceService:
         """
         try:
             period_filter = get_period_filter(period, 'Places')
+
+            # 全期間は集計値を使い、期間指定時のみ投稿数を集計する
+            if period_filter:
+                ranking_post_count = Count('posts', filter=period_filter, distinct=True)
+            else:
+                ranking_post_count = F('post_count')
             
             places = Places.objects.annotate(
-                post_count=Count('posts', filter=period_filter, distinct=True),
-                favorites_count=Count('favorites', distinct=True)  # periodフィルターを一時的に除外
+                ranking_post_count=ranking_post_count
             ).filter(
-                Q(post_count__gt=0) | Q(favorites_count__gt=0)
+                Q(ranking_post_count__gt=0) | Q(favorite_count__gt=0)
+            ).select_related(
+                'latest_post'
             ).order_by(
-                '-favorites_count',
-                '-post_count'
+                '-favorite_count',
+                '-ranking_post_count'
             )[:limit]
 
             return places
@@ -1,15 +1,14 @@
 from django.contrib.gis.geos import Point
 from django.db.models import F, Window, Q
 from django.db.models.functions import DenseRank
-from django.core.files.base import ContentFile
 from django.db import transaction
-from ..models import Posts, Places, Likes
+from ..models import Posts, Places, Likes, Users, HeatmapCell, StoredImage
 from ..utils import (
     validate_image_file,
     validate_location_data,
-    generate_unique_filename,
     get_period_filter
 )
+from .image_service import ImageService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,6 +26,8 @@ class PostService:
             user: 投稿ユーザー
             image_file: 投稿画像ファイル
             place_data: 場所情報（name, latitude, longitude）
+                撮影位置（photo_spot_latitude, photo_spot_longitude）の指定がない場合は
+                画像のEXIFの位置情報を使用する
             description: 投稿の説明文
             rating: 評価（オプション）
             weather: 天気（オプション）
@@ -53,34 +54,42 @@ class PostService:
                 defaults={'location': location}
             )
 
-            # 撮影位置の設定
+            # 画素データはデコードせずにEXIFの撮影位置・撮影日時のみを読み取る
+            metadata = ImageService.read_metadata(image_file)
+
+            # 撮影位置の設定（指定がない場合はEXIFの位置情報、それもなければ場所の位置）
             photo_spot_location = None
             if 'photo_spot_latitude' in place_data and 'photo_spot_longitude' in place_data:
                 photo_spot_location = Point(
                     float(place_data['photo_spot_longitude']),
                     float(place_data['photo_spot_latitude'])
                 )
+            elif metadata['location'] is not None:
+                photo_spot_location = metadata['location']
 
-            # 画像の保存処理
-            filename = generate_unique_filename(image_file.name)
-            image_content = ContentFile(image_file.read())
+            # 画像の保存処理（内容のハッシュで保存し、保存済みの画像は書き込みを省略する。
+            # 同じ画像を処理済みの場合はメタデータを除いた画像と縮小画像をそのまま参照する）
+            stored = StoredImage.store(image_file)
 
-            # 投稿の作成
-            post = Posts.objects.create(
+            # 投稿の作成（画像を保存してから1回で登録する）
+            post = Posts(
                 user=user,
                 place=place,
-                photo_image=filename,
                 description=description,
                 rating=rating,
                 weather=weather or '',
                 season=season or '',
-                photo_spot_location=photo_spot_location or location
+                photo_spot_location=photo_spot_location or location,
+                taken_at=metadata['taken_at'],
+                **Posts.image_fields(stored)
             )
-            
-            # 画像コンテンツの保存
-            post.photo_image.save(filename, image_content, save=False)
             post.save()
 
+            # 向きの補正・メタデータの除去・縮小画像の生成はコミット後に
+            # バックグラウンドで1回のデコードでまとめて行う
+            if not post.renditions_ready:
+                ImageService.queue_renditions(post.id)
+
             return post
 
         except Exception as e:
@@ -88,6 +97,7 @@ class PostService:
             raise
 
     @staticmethod
+    @transaction.atomic
     def toggle_like(user, post_id):
         """
         投稿のいいねを切り替える
@@ -97,11 +107,16 @@ class PostService:
             post_id: 投稿ID
         """
         try:
-            post = Posts.objects.get(id=post_id)
+            post = Posts.objects.select_related('place').get(id=post_id)
             like, created = Likes.objects.get_or_create(
                 user=user,
                 post=post
             )
+
+            # いいね数はタイル・場所詳細・投稿者のプロフィールに含まれるためキャッシュを無効化
+            post.place.invalidate_caches(post.photo_spot_location)
+            Users.invalidate_profile_caches(post.user_id)
+            HeatmapCell.mark_dirty(post.photo_spot_location)
             
             if not created:
                 # いいねの解除
@@ -109,12 +124,21 @@ class PostService:
                 Posts.objects.filter(id=post_id).update(
                     like_count=F('like_count') - 1
                 )
+                Places.adjust_counters(post.place_id, total_likes=-1)
+                # トップ投稿のいいねが減った場合のみトップ投稿を選び直す
+                Places.refresh_top_post(post.place_id, post_id=post.id)
                 return False
             else:
                 # いいねの追加
                 Posts.objects.filter(id=post_id).update(
                     like_count=F('like_count') + 1
                 )
+                Places.adjust_counters(post.place_id, total_likes=1)
+                # いいね数が現在のトップ投稿を上回った場合はトップ投稿にする
+                post.refresh_from_db(fields=['like_count'])
+                Places.promote_top_post(
+                    post.place_id, post.id, post.like_count, post.created_at
+                )
                 return True
 
         except Posts.DoesNotExist:
@@ -124,6 +148,26 @@ class PostService:
             logger.error(f"いいね処理中にエラー: {str(e)}")
             raise
 
+    @staticmethod
+    @transaction.atomic
+    def delete_post(post_id):
+        """
+        投稿を削除する
+        
+        Args:
+            post_id: 投稿ID
+        """
+        try:
+            post = Posts.objects.select_related('place').get(id=post_id)
+            post.delete()
+
+        except Posts.DoesNotExist:
+            logger.warning(f"投稿が見つかりません: ID {post_id}")
+            raise
+        except Exception as e:
+            logger.error(f"投稿削除中にエラー: {str(e)}")
+            raise
+
     @staticmethod
     def get_user_posts(user_id, page=1, per_page=12):
         """
@@ -1,14 +1,18 @@
 from django.db.models import Sum, Count
-from django.core.files.base import ContentFile
 from django.db import transaction
-from django.db.models import Q
-from ..models import Users, Follows, Posts, Places
+from django.db.models import Q, Window
+from django.utils.dateparse import parse_datetime
+from ..models import Users, Follows, Posts, Places, Favorites, StoredImage
 from ..utils import (
     validate_image_file,
-    generate_unique_filename,
     validate_text_length,
-    get_period_filter
+    get_period_filter,
+    encode_cursor,
+    decode_cursor
 )
+from .cache_service import CacheService
+from .image_service import ImageService
+import math
 import logging
 
 logger = logging.getLogger(__name__)
@@ -73,14 +77,19 @@ class ProfileService:
             # プロフィール画像の処理
             if profile_image:
                 validate_image_file(profile_image)
-                filename = generate_unique_filename(profile_image.name)
-                image_content = ContentFile(profile_image.read())
+                # 位置情報などのメタデータを除き、向きを補正してから保存する
+                content = ImageService.strip_upload(profile_image)
+                try:
+                    # 内容のハッシュで保存し、保存済みの画像は書き込みを省略する
+                    image_name = StoredImage.store(content, max_size=None).name
+                finally:
+                    content.close()
                 
-                # 既存の画像を削除
-                if user.profile_image:
+                # 既存の画像の参照を解除（ハッシュで管理していない画像は削除）
+                if user.profile_image and not StoredImage.release(user.profile_image.name):
                     user.profile_image.delete(save=False)
                 
-                user.profile_image.save(filename, image_content, save=False)
+                user.profile_image = image_name
 
             # ユーザー名の重複チェック
             if 'username' in profile_data:
@@ -100,6 +109,14 @@ class ProfileService:
                 user.bio = profile_data['bio']
 
             user.save()
+
+            # ユーザー名と画像は投稿した場所の詳細にも表示されるため合わせて無効化
+            Users.invalidate_profile_caches(user.id)
+            place_ids = Posts.objects.filter(user=user).values_list(
+                'place_id', flat=True
+            ).distinct()
+            CacheService.bump_versions_on_commit('place', *place_ids)
+            CacheService.bump_versions_on_commit('ranking', 'posts')
             return user
 
         except Exception as e:
@@ -140,6 +157,9 @@ class ProfileService:
                 )
                 is_following = True
 
+            # フォロー数・フォロワー数は双方のプロフィールに含まれるため無効化
+            Users.invalidate_profile_caches(follower_id, followed_id)
+
             # 最新のフォロワー数を取得
             follower_count = Follows.objects.filter(
                 followed_id=followed_id
@@ -205,6 +225,82 @@ class ProfileService:
             logger.error(f"フォロー中ユーザー取得中にエラー: {str(e)}")
             raise
 
+    @staticmethod
+    def get_favorite_places(user_id, cursor=None, page=1, per_page=10):
+        """
+        ユーザーのお気に入り場所をお気に入り登録の新しい順に1回のクエリで取得する
+
+        場所の集計値とトップ投稿は場所に保持しているものを結合して取得する。
+        カーソルを指定した場合は (-created_at, -id) のキーセットページング、
+        指定しない場合はページ番号で取得する（総数はウィンドウ関数で同じクエリから求める）。
+        ページ番号が最終ページを超える場合は最終ページを返す
+
+        Args:
+            user_id: ユーザーID
+            cursor: 前回の結果で返されたカーソル
+            page: ページ番号（カーソルを指定しない場合に使用）
+            per_page: 1ページあたりの表示数
+
+        Returns:
+            tuple: (list: お気に入りのリスト（placeとplace.top_postを結合済み）,
+                    str: 次ページのカーソル（続きがない場合はNone）,
+                    int: 総数（ページ番号指定時は常に返し、カーソル指定時はNone）)
+        """
+        try:
+            favorites = Favorites.objects.filter(
+                user_id=user_id
+            ).select_related('place__top_post')
+
+            offset = 0
+            if cursor:
+                # カーソル以降のお気に入りに絞り込む（キーセットページング）
+                position = decode_cursor(cursor)
+                try:
+                    created_at = parse_datetime(position['created_at'])
+                    favorite_id = int(position['id'])
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError('カーソルが不正です。')
+                if created_at is None:
+                    raise ValueError('カーソルが不正です。')
+                favorites = favorites.filter(
+                    Q(created_at__lt=created_at) |
+                    Q(created_at=created_at, id__lt=favorite_id)
+                )
+            else:
+                favorites = favorites.annotate(total_count=Window(expression=Count('id')))
+                offset = (max(int(page), 1) - 1) * per_page
+
+            # 1件多く取得して続きがあるかを判定する
+            ordered = favorites.order_by('-created_at', '-id')
+            favorites = list(ordered[offset:offset + per_page + 1])
+
+            total_count = None
+            if not cursor:
+                if favorites:
+                    total_count = favorites[0].total_count
+                else:
+                    # 範囲外のページではウィンドウ関数の結果がないため別途数え、
+                    # 最終ページに丸めて取得し直す
+                    total_count = Favorites.objects.filter(user_id=user_id).count() if offset else 0
+                    if total_count:
+                        offset = (math.ceil(total_count / per_page) - 1) * per_page
+                        favorites = list(ordered[offset:offset + per_page + 1])
+
+            next_cursor = None
+            if len(favorites) > per_page:
+                favorites = favorites[:per_page]
+                last = favorites[-1]
+                next_cursor = encode_cursor({
+                    'created_at': last.created_at.isoformat(),
+                    'id': last.id,
+                })
+
+            return favorites, next_cursor, total_count
+
+        except Exception as e:
+            logger.error(f"お気に入り場所取得中にエラー: {str(e)}")
+            raise
+
     @staticmethod
     def search_users(query, limit=10):
         """ユーザーを検索する"""
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from ..models import Places, Posts
+from ..utils import lonlat_to_tile
+from .cache_service import CacheService
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TileService:
+    """地図のベクタータイル（MVT）を管理するサービスクラス"""
+
+    # タイル内の座標の分解能
+    TILE_EXTENT = 4096
+
+    @staticmethod
+    def get_tile_version(zoom, x, y):
+        """タイルのバージョンを取得する"""
+        return CacheService.get_version('tile', f'{zoom}/{x}/{y}')
+
+    @staticmethod
+    def get_tile(zoom, x, y):
+        """
+        ベクタータイルを取得する（キャッシュがあればキャッシュから返す）
+
+        Args:
+            zoom: ズームレベル
+            x: タイルのX座標
+            y: タイルのY座標
+
+        Returns:
+            tuple: (bytes: タイルデータ, int: タイルのバージョン)
+        """
+        try:
+            version = TileService.get_tile_version(zoom, x, y)
+            cache_key = f'mvt_{zoom}_{x}_{y}_{version}'
+
+            tile = cache.get(cache_key)
+            if tile is None:
+                tile = TileService.build_tile(zoom, x, y)
+                cache.set(cache_key, tile, settings.MAP_TILE_CACHE_TIMEOUT)
+
+            return tile, version
+
+        except Exception as e:
+            logger.error(f"タイル取得中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def build_tile(zoom, x, y):
+        """
+        PostGISでベクタータイルを生成する
+
+        場所のレイヤー（places）と、詳細表示のズームレベル以上では
+        撮影スポットのレイヤー（photo_spots）を含む
+
+        Args:
+            zoom: ズームレベル
+            x: タイルのX座標
+            y: タイルのY座標
+
+        Returns:
+            bytes: MVT形式のタイルデータ
+        """
+        include_spots = zoom >= settings.MAP_CLUSTER_MAX_ZOOM
+
+        sql = f"""
+            WITH bounds AS (
+                SELECT ST_TileEnvelope(%(zoom)s, %(x)s, %(y)s) AS geom
+            ),
+            places AS (
+                SELECT
+                    ST_AsMVTGeom(
+                        ST_Transform(p.location, 3857), bounds.geom,
+                        %(extent)s
+                    ) AS geom,
+                    p.id,
+                    p.name,
+                    p.rating::float8 AS rating,
+                    p.post_count,
+                    p.favorite_count,
+                    p.top_post_id
+                FROM {Places._meta.db_table} p, bounds
+                WHERE p.location && ST_Transform(bounds.geom, 4326)
+            ),
+            spots AS (
+                SELECT
+                    ST_AsMVTGeom(
+                        ST_Transform(ps.photo_spot_location, 3857), bounds.geom,
+                        %(extent)s
+                    ) AS geom,
+                    ps.id,
+                    ps.place_id,
+                    ps.like_count
+                FROM {Posts._meta.db_table} ps, bounds
+                WHERE %(include_spots)s
+                    AND ps.photo_spot_location && ST_Transform(bounds.geom, 4326)
+            )
+            SELECT
+                COALESCE((SELECT ST_AsMVT(places, 'places', %(extent)s, 'geom') FROM places), ''::bytea)
+                || COALESCE((SELECT ST_AsMVT(spots, 'photo_spots', %(extent)s, 'geom') FROM spots), ''::bytea)
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {
+                'zoom': zoom,
+                'x': x,
+                'y': y,
+                'extent': TileService.TILE_EXTENT,
+                'include_spots': include_spots,
+            })
+            row = cursor.fetchone()
+
+        return bytes(row[0]) if row and row[0] is not None else b''
+
+    @staticmethod
+    def invalidate_locations(locations):
+        """
+        指定された位置を含む全ズームレベルのタイルを無効化する
+
+        Args:
+            locations: Pointのリスト
+        """
+        try:
+            for location in locations:
+                if location is None:
+                    continue
+                for zoom in range(settings.MAP_TILE_MAX_ZOOM + 1):
+                    x, y = lonlat_to_tile(location.x, location.y, zoom)
+                    CacheService.bump_version('tile', f'{zoom}/{x}/{y}')
+        except Exception as e:
+            # キャッシュの無効化失敗で書き込み処理を失敗させない
+            logger.error(f"タイルの無効化中にエラー: {str(e)}")
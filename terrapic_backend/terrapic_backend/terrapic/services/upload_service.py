@@ -0,0 +1,318 @@
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from ..models import UploadSession
+from .post_service import PostService
+from datetime import timedelta
+import fcntl
+import os
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 受信したバイト列を一時ファイルに書き込む単位
+_BLOCK_SIZE = 64 * 1024
+
+class UploadOffsetError(ValueError):
+    """アップロードの開始位置が受信済みのバイト数と一致しない場合の例外"""
+
+    def __init__(self, message, received_size):
+        super().__init__(message)
+        self.received_size = received_size
+
+def _remove_staging_file(path):
+    """一時ファイルを削除する（存在しない場合は何もしない）"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class UploadService:
+    """
+    再開可能な画像アップロード（アップロードセッション）を管理するサービスクラス
+
+    受信したバイト列はセッションごとの一時ファイルに追記するため、
+    接続が切れた場合も受信済みの位置から再開でき、完了時にチャンクを結合し直す必要がない
+    """
+
+    @staticmethod
+    def _active_sessions(user):
+        """ユーザーの有効期限内のアップロードセッションを取得する"""
+        return UploadSession.objects.filter(
+            user=user, expires_at__gt=timezone.now()
+        )
+
+    @staticmethod
+    def create_session(user, filename, total_size):
+        """
+        アップロードセッションを作成する
+
+        Args:
+            user: アップロードするユーザー
+            filename: 元のファイル名
+            total_size: ファイル全体のバイト数
+
+        Returns:
+            UploadSession: 作成したセッション
+
+        Raises:
+            ValueError: ファイル名・サイズが不正な場合
+        """
+        try:
+            if not filename:
+                raise ValueError('ファイル名は必須です。')
+            try:
+                total_size = int(total_size)
+            except (TypeError, ValueError):
+                raise ValueError('ファイルサイズが不正です。')
+            if total_size <= 0:
+                raise ValueError('ファイルサイズが不正です。')
+            if total_size > settings.IMAGE_UPLOAD_MAX_SIZE:
+                raise ValueError('ファイルサイズは5MB以下にしてください。')
+            if UploadService._active_sessions(user).count() >= settings.UPLOAD_SESSION_MAX_ACTIVE:
+                raise ValueError('同時に行えるアップロードの数を超えています。')
+
+            session = UploadSession.objects.create(
+                user=user,
+                filename=os.path.basename(filename)[:255],
+                total_size=total_size,
+                expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TIMEOUT)
+            )
+
+            os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+            open(session.staging_path, 'wb').close()
+
+            return session
+
+        except Exception as e:
+            logger.error(f"アップロードセッション作成中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def get_session(user, session_id):
+        """
+        ユーザーの有効期限内のアップロードセッションを取得する
+
+        Raises:
+            UploadSession.DoesNotExist: セッションが存在しない・期限切れの場合
+        """
+        return UploadService._active_sessions(user).get(id=session_id)
+
+    @staticmethod
+    def append_chunk(user, session_id, offset, stream, length):
+        """
+        受信したバイト列を一時ファイルに追記する
+
+        接続が途中で切れた場合も、それまでに受信したバイト列は受信済みとして記録する。
+        受信中はトランザクションや行ロックを保持せず、同じセッションへの同時書き込みは
+        一時ファイルのロックで防ぐ。受信済みのバイト数は開始位置が変わっていない場合のみ
+        条件付きのUPDATEで更新する
+
+        Args:
+            user: アップロードするユーザー
+            session_id: セッションのID
+            offset: バイト列の開始位置
+            stream: リクエストボディのストリーム
+            length: バイト列の長さ
+
+        Returns:
+            UploadSession: 更新後のセッション
+
+        Raises:
+            UploadOffsetError: 開始位置が受信済みのバイト数と一致しない場合
+            ValueError: バイト列がファイルサイズを超える場合
+        """
+        try:
+            session = UploadService.get_session(user, session_id)
+
+            with open(session.staging_path, 'r+b') as staging:
+                # 同じセッションへの同時書き込みを防ぐため一時ファイルをロックする
+                try:
+                    fcntl.flock(staging, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise UploadOffsetError(
+                        '別のリクエストがこのアップロードに書き込み中です。',
+                        session.received_size
+                    )
+
+                # ロックの取得前に他のリクエストが書き込んだ場合に備えて読み直す
+                session.refresh_from_db(fields=['received_size'])
+                if offset != session.received_size:
+                    raise UploadOffsetError(
+                        '開始位置が受信済みのバイト数と一致しません。',
+                        session.received_size
+                    )
+                if length <= 0 or offset + length > session.total_size:
+                    raise ValueError('バイト列の範囲がファイルサイズを超えています。')
+
+                # 前回の中断で書きかけになったバイト列を切り捨てる
+                staging.seek(offset)
+                staging.truncate()
+                written = 0
+                while written < length:
+                    try:
+                        block = stream.read(min(_BLOCK_SIZE, length - written))
+                    except OSError:
+                        # 接続が切れた場合は受信済みの分のみ記録する
+                        break
+                    if not block:
+                        break
+                    staging.write(block)
+                    written += len(block)
+                staging.flush()
+
+                # 受信中にセッションが削除・期限切れになった場合は記録しない
+                now = timezone.now()
+                updated = UploadSession.objects.filter(
+                    id=session.id, received_size=offset, expires_at__gt=now
+                ).update(received_size=offset + written, updated_at=now)
+                if not updated:
+                    raise UploadSession.DoesNotExist('アップロードが見つかりません')
+
+            session.received_size = offset + written
+            session.updated_at = now
+            return session
+
+        except Exception as e:
+            logger.error(f"アップロードのバイト列受信中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def finalize(user, session_id, place_data, description, rating=None, weather=None, season=None):
+        """
+        受信が完了したアップロードから投稿を作成する
+
+        一時ファイルをそのまま投稿画像として保存し、セッションを削除する
+
+        Args:
+            user: アップロードしたユーザー
+            session_id: セッションのID
+            place_data: 場所情報（name, latitude, longitude）
+            description: 投稿の説明文
+            rating: 評価（オプション）
+            weather: 天気（オプション）
+            season: 季節（オプション）
+
+        Returns:
+            Posts: 作成した投稿
+
+        Raises:
+            UploadOffsetError: ファイル全体を受信していない場合
+        """
+        try:
+            with transaction.atomic():
+                session = UploadService._active_sessions(user).select_for_update().get(
+                    id=session_id
+                )
+                if not session.is_complete:
+                    raise UploadOffsetError(
+                        'ファイル全体のアップロードが完了していません。',
+                        session.received_size
+                    )
+
+                staging_path = session.staging_path
+                with open(staging_path, 'rb') as staging:
+                    post = PostService.create_post(
+                        user=user,
+                        image_file=File(staging, name=session.filename),
+                        place_data=place_data,
+                        description=description,
+                        rating=rating,
+                        weather=weather,
+                        season=season
+                    )
+
+                session.delete()
+                transaction.on_commit(lambda: _remove_staging_file(staging_path))
+
+            return post
+
+        except Exception as e:
+            logger.error(f"アップロードからの投稿作成中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def delete_session(user, session_id):
+        """
+        アップロードセッションを中止して一時ファイルを削除する
+
+        Raises:
+            UploadSession.DoesNotExist: セッションが存在しない場合
+        """
+        try:
+            with transaction.atomic():
+                session = UploadSession.objects.get(id=session_id, user=user)
+                staging_path = session.staging_path
+                session.delete()
+                transaction.on_commit(lambda: _remove_staging_file(staging_path))
+
+        except Exception as e:
+            logger.error(f"アップロードセッション削除中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def delete_expired_sessions():
+        """
+        期限切れのアップロードセッションと一時ファイルを削除する
+
+        セッションの削除後に一時ファイルの削除が失敗した場合などに残った、
+        対応するセッションのない一時ファイルも削除する
+
+        Returns:
+            tuple: (int: 削除したセッション数, int: 削除したセッションのない一時ファイル数)
+        """
+        try:
+            deleted = 0
+            expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+            for session in expired.iterator():
+                _remove_staging_file(session.staging_path)
+                session.delete()
+                deleted += 1
+            return deleted, UploadService._delete_orphan_staging_files()
+
+        except Exception as e:
+            logger.error(f"期限切れのアップロードセッション削除中にエラー: {str(e)}")
+            raise
+
+    @staticmethod
+    def _delete_orphan_staging_files():
+        """
+        対応するセッションのない一時ファイルを削除する
+
+        作成直後のセッションと競合しないよう、セッションの有効期間より古いファイルのみ対象とする
+
+        Returns:
+            int: 削除したファイル数
+        """
+        try:
+            entries = os.scandir(settings.UPLOAD_SESSION_DIR)
+        except FileNotFoundError:
+            return 0
+
+        cutoff = time.time() - settings.UPLOAD_SESSION_TIMEOUT
+        candidates = {}
+        with entries:
+            for entry in entries:
+                stem, extension = os.path.splitext(entry.name)
+                if extension != '.part' or not entry.is_file():
+                    continue
+                try:
+                    session_id = uuid.UUID(stem)
+                except ValueError:
+                    continue
+                if entry.stat().st_mtime < cutoff:
+                    candidates[session_id] = entry.path
+
+        existing = set(UploadSession.objects.filter(
+            id__in=candidates
+        ).values_list('id', flat=True))
+
+        deleted = 0
+        for session_id, path in candidates.items():
+            if session_id not in existing:
+                _remove_staging_file(path)
+                deleted += 1
+        return deleted
@@ -0,0 +1,156 @@
+from decimal import Decimal
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+from ..models import Users, Places, Posts, Favorites
+from ..services import PostService
+
+class PlaceCounterTests(TestCase):
+    """投稿・いいね・お気に入りによる場所の集計値と評価の差分更新のテスト"""
+
+    def setUp(self):
+        self.user = Users.objects.create_user(
+            email='owner@example.com', username='owner', password='password'
+        )
+        self.other_user = Users.objects.create_user(
+            email='viewer@example.com', username='viewer', password='password'
+        )
+        self.place = Places.objects.create(name='東京タワー', location=Point(139.7454, 35.6586))
+        self.other_place = Places.objects.create(name='浅草寺', location=Point(139.7967, 35.7148))
+
+    def create_post(self, rating=None, place=None, location=None):
+        return Posts.objects.create(
+            user=self.user,
+            place=place or self.place,
+            photo_image='images/00/00/test.jpg',
+            photo_spot_location=location,
+            description='テスト投稿',
+            rating=rating,
+            weather='晴れ',
+            season='春'
+        )
+
+    def assert_ratings_match_recalculation(self, *places):
+        """差分で更新した評価が投稿からの再計算と一致することを確認する"""
+        fields = [
+            'rating', 'rating_count', 'rating_sum',
+            *(f'rating_count_{bucket}' for bucket in range(1, 6))
+        ]
+        ids = [place.id for place in places]
+        adjusted = list(Places.objects.filter(id__in=ids).order_by('id').values(*fields))
+        Places.recalculate_ratings(Places.objects.filter(id__in=ids))
+        recalculated = list(Places.objects.filter(id__in=ids).order_by('id').values(*fields))
+        self.assertEqual(adjusted, recalculated)
+
+    def test_create_post_adjusts_counters_and_rating(self):
+        self.create_post(rating=Decimal('4.0'))
+        self.create_post(rating=Decimal('2.5'))
+        latest = self.create_post()
+
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.post_count, 3)
+        self.assertEqual(self.place.rating_count, 2)
+        self.assertEqual(self.place.rating_sum, Decimal('6.5'))
+        self.assertEqual(self.place.rating, Decimal('3.25'))
+        # 2.5は四捨五入して星3に数える
+        self.assertEqual(self.place.rating_histogram, {1: 0, 2: 0, 3: 1, 4: 1, 5: 0})
+        # いいね数が同じ場合は新しい投稿がトップ投稿になる
+        self.assertEqual(self.place.top_post_id, latest.id)
+        self.assertEqual(self.place.latest_post_id, latest.id)
+        self.assert_ratings_match_recalculation(self.place)
+
+    def test_update_rating_moves_histogram_bucket(self):
+        post = self.create_post(rating=Decimal('5.0'))
+        post.rating = Decimal('1.0')
+        post.save(update_fields=['rating'])
+
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.rating_count, 1)
+        self.assertEqual(self.place.rating, Decimal('1.00'))
+        self.assertEqual(self.place.rating_histogram, {1: 1, 2: 0, 3: 0, 4: 0, 5: 0})
+        self.assert_ratings_match_recalculation(self.place)
+
+    def test_save_without_rating_change_keeps_rating(self):
+        post = self.create_post(rating=Decimal('3.0'))
+        post.description = '説明を変更'
+        post.save()
+
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.rating_count, 1)
+        self.assertEqual(self.place.rating_sum, Decimal('3.0'))
+
+    def test_delete_post_reverts_counters_and_rating(self):
+        kept = self.create_post(rating=Decimal('4.0'))
+        removed = self.create_post(rating=Decimal('2.0'))
+        PostService.toggle_like(self.other_user, removed.id)
+
+        removed.refresh_from_db()
+        removed.delete()
+
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.post_count, 1)
+        self.assertEqual(self.place.total_likes, 0)
+        self.assertEqual(self.place.rating, Decimal('4.00'))
+        self.assertEqual(self.place.top_post_id, kept.id)
+        self.assertEqual(self.place.latest_post_id, kept.id)
+        self.assert_ratings_match_recalculation(self.place)
+
+    def test_delete_last_rated_post_clears_rating(self):
+        post = self.create_post(rating=Decimal('3.5'))
+        post.delete()
+
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.rating_count, 0)
+        self.assertIsNone(self.place.rating)
+        self.assertIsNone(self.place.top_post_id)
+
+    def test_moving_post_transfers_counters_and_rating(self):
+        post = self.create_post(rating=Decimal('4.5'), location=Point(139.7455, 35.6587))
+        PostService.toggle_like(self.other_user, post.id)
+
+        post.refresh_from_db()
+        post.place = self.other_place
+        post.rating = Decimal('3.0')
+        post.save()
+
+        self.place.refresh_from_db()
+        self.other_place.refresh_from_db()
+        self.assertEqual(self.place.post_count, 0)
+        self.assertEqual(self.place.total_likes, 0)
+        self.assertEqual(self.place.rating_count, 0)
+        self.assertIsNone(self.place.top_post_id)
+        self.assertEqual(self.other_place.post_count, 1)
+        self.assertEqual(self.other_place.total_likes, 1)
+        self.assertEqual(self.other_place.rating, Decimal('3.00'))
+        self.assertEqual(self.other_place.top_post_id, post.id)
+        self.assert_ratings_match_recalculation(self.place, self.other_place)
+
+    def test_toggle_like_updates_total_likes_and_top_post(self):
+        first = self.create_post()
+        second = self.create_post()
+
+        self.assertTrue(PostService.toggle_like(self.other_user, first.id))
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.total_likes, 1)
+        self.assertEqual(self.place.top_post_id, first.id)
+
+        self.assertFalse(PostService.toggle_like(self.other_user, first.id))
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.total_likes, 0)
+        # いいね数が同じ場合は新しい投稿がトップ投稿になる
+        self.assertEqual(self.place.top_post_id, second.id)
+
+    def test_favorites_adjust_favorite_count(self):
+        favorite = Favorites.objects.create(user=self.other_user, place=self.place)
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.favorite_count, 1)
+
+        favorite.delete()
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.favorite_count, 0)
+
+    def test_rating_bucket_rounds_half_up(self):
+        self.assertIsNone(Places.rating_bucket(None))
+        self.assertEqual(Places.rating_bucket(Decimal('1.4')), 1)
+        self.assertEqual(Places.rating_bucket(Decimal('1.5')), 2)
+        self.assertEqual(Places.rating_bucket(Decimal('4.5')), 5)
+        self.assertEqual(Places.rating_bucket(Decimal('0.0')), 1)
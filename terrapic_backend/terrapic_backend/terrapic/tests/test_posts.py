@@ -0,0 +1,114 @@
+from io import BytesIO
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from ..models import Users, Places, Posts, StoredImage
+import os
+import shutil
+import tempfile
+
+def make_upload(color, name='photo.jpg', format='PNG'):
+    """指定した色の画像のアップロードファイルを生成する"""
+    buffer = BytesIO()
+    Image.new('RGB', (16, 16), color).save(buffer, format=format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+class StoredImageTests(TestCase):
+    """内容のハッシュで管理する画像の保存・重複排除のテスト"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def temp_files(self):
+        path = os.path.join(self.media_root, StoredImage.TEMP_DIRECTORY)
+        return os.listdir(path) if os.path.isdir(path) else []
+
+    def test_same_content_is_stored_once(self):
+        first = StoredImage.store(make_upload('red', name='a.jpg'))
+        second = StoredImage.store(make_upload('red', name='b.png'))
+
+        self.assertEqual(first.sha256, second.sha256)
+        self.assertEqual(StoredImage.objects.count(), 1)
+        self.assertEqual(StoredImage.objects.get().ref_count, 2)
+        self.assertTrue(default_storage.exists(first.name))
+        self.assertEqual(self.temp_files(), [])
+
+    def test_name_is_derived_from_content(self):
+        stored = StoredImage.store(make_upload('blue', name='photo.jpg'))
+
+        self.assertEqual(stored.name, StoredImage.content_name(stored.sha256, '.png'))
+        self.assertTrue(stored.name.startswith(
+            f'{StoredImage.DIRECTORY}/{stored.sha256[:2]}/{stored.sha256[2:4]}/'
+        ))
+        with default_storage.open(stored.name, 'rb') as saved:
+            self.assertEqual(len(saved.read()), stored.size)
+
+    def test_different_content_is_stored_separately(self):
+        red = StoredImage.store(make_upload('red'))
+        green = StoredImage.store(make_upload('green'))
+
+        self.assertNotEqual(red.sha256, green.sha256)
+        self.assertNotEqual(red.name, green.name)
+        self.assertEqual(StoredImage.objects.count(), 2)
+
+    def test_oversized_upload_is_rejected_without_leftovers(self):
+        upload = make_upload('red')
+        with self.assertRaises(ValidationError):
+            StoredImage.store(upload, max_size=upload.size - 1)
+
+        self.assertFalse(StoredImage.objects.exists())
+        self.assertEqual(self.temp_files(), [])
+
+    def test_release_deletes_unreferenced_file(self):
+        stored = StoredImage.store(make_upload('red'))
+        StoredImage.store(make_upload('red'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(StoredImage.release(stored.name))
+        self.assertTrue(default_storage.exists(stored.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(StoredImage.release(stored.name))
+        self.assertFalse(StoredImage.objects.exists())
+        self.assertFalse(default_storage.exists(stored.name))
+
+    def test_release_ignores_unmanaged_files(self):
+        self.assertFalse(StoredImage.release('post_images/legacy.jpg'))
+        self.assertFalse(StoredImage.release(''))
+
+class PostPhotoUrlTests(TestCase):
+    """投稿画像のURLのテスト"""
+
+    def setUp(self):
+        user = Users.objects.create_user(
+            email='owner@example.com', username='owner', password='password'
+        )
+        place = Places.objects.create(name='東京タワー', location=Point(139.7454, 35.6586))
+        self.post = Posts.objects.create(
+            user=user,
+            place=place,
+            photo_image='images/00/00/original.jpg',
+            description='テスト投稿',
+            weather='晴れ',
+            season='春'
+        )
+
+    def test_unprocessed_photo_returns_placeholder(self):
+        self.assertFalse(self.post.renditions_ready)
+        self.assertTrue(self.post.photo_url().endswith(settings.POST_PHOTO_PLACEHOLDER))
+        self.assertTrue(self.post.photo_url('thumb').endswith(settings.POST_PHOTO_PLACEHOLDER))
+
+    def test_processed_photo_returns_rendition(self):
+        for name, field in Posts.RENDITION_FIELDS.items():
+            setattr(self.post, field, f'images/00/00/original_{name}.jpg')
+
+        self.assertTrue(self.post.photo_url('thumb').endswith('original_thumb.jpg'))
+        self.assertTrue(self.post.photo_url().endswith('original.jpg'))
@@ -0,0 +1,100 @@
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase
+from ..models import Users, Places, Favorites
+from ..services import ProfileService, PlaceService
+from ..utils import encode_cursor, decode_cursor
+
+class CursorTests(SimpleTestCase):
+    """ページングのカーソルのエンコード・デコードのテスト"""
+
+    def test_round_trip(self):
+        data = {'created_at': '2024-05-01T12:00:00+09:00', 'id': 42, 'order': 'rating'}
+        cursor = encode_cursor(data)
+        self.assertEqual(decode_cursor(cursor), data)
+
+    def test_cursor_is_url_safe_without_padding(self):
+        cursor = encode_cursor({'key': '場所?&/+', 'id': 1})
+        self.assertNotIn('=', cursor)
+        self.assertRegex(cursor, r'^[A-Za-z0-9_-]+$')
+
+    def test_invalid_cursor_raises_value_error(self):
+        for cursor in ('!!!', 'bm90IGpzb24', encode_cursor([1, 2, 3])):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    decode_cursor(cursor)
+
+    def test_bounds_cursor_requires_matching_order(self):
+        cursor = encode_cursor({'order': 'rating', 'key': '4.5', 'id': 10})
+        self.assertEqual(
+            PlaceService.decode_bounds_cursor(cursor, 'rating')[1], 10
+        )
+        with self.assertRaises(ValueError):
+            PlaceService.decode_bounds_cursor(cursor, 'popularity')
+
+    def test_bounds_cursor_rejects_non_finite_key(self):
+        cursor = encode_cursor({'order': 'rating', 'key': 'NaN', 'id': 10})
+        with self.assertRaises(ValueError):
+            PlaceService.decode_bounds_cursor(cursor, 'rating')
+
+class FavoritePlacesTests(TestCase):
+    """お気に入り場所一覧のページングのテスト"""
+
+    def setUp(self):
+        self.user = Users.objects.create_user(
+            email='owner@example.com', username='owner', password='password'
+        )
+        self.favorites = []
+        for i in range(5):
+            place = Places.objects.create(
+                name=f'場所{i}', location=Point(139.7 + i * 0.01, 35.6)
+            )
+            self.favorites.append(Favorites.objects.create(user=self.user, place=place))
+        # 新しい順に並ぶ
+        self.favorites.reverse()
+
+    def ids(self, favorites):
+        return [favorite.id for favorite in favorites]
+
+    def test_cursor_pages_cover_all_favorites_once(self):
+        seen = []
+        cursor = None
+        while True:
+            favorites, cursor, total = ProfileService.get_favorite_places(
+                self.user.id, cursor=cursor, per_page=2
+            )
+            seen.extend(self.ids(favorites))
+            self.assertIsNone(total)
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.ids(self.favorites))
+
+    def test_page_number_returns_total(self):
+        favorites, next_cursor, total = ProfileService.get_favorite_places(
+            self.user.id, page=2, per_page=2
+        )
+        self.assertEqual(self.ids(favorites), self.ids(self.favorites[2:4]))
+        self.assertIsNotNone(next_cursor)
+        self.assertEqual(total, 5)
+
+    def test_page_past_the_end_returns_last_page(self):
+        favorites, next_cursor, total = ProfileService.get_favorite_places(
+            self.user.id, page=10, per_page=2
+        )
+        self.assertEqual(self.ids(favorites), self.ids(self.favorites[4:]))
+        self.assertIsNone(next_cursor)
+        self.assertEqual(total, 5)
+
+    def test_no_favorites(self):
+        Favorites.objects.filter(user=self.user).delete()
+        favorites, next_cursor, total = ProfileService.get_favorite_places(
+            self.user.id, page=3, per_page=2
+        )
+        self.assertEqual(favorites, [])
+        self.assertIsNone(next_cursor)
+        self.assertEqual(total, 0)
+
+    def test_invalid_cursor_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            ProfileService.get_favorite_places(
+                self.user.id, cursor=encode_cursor({'id': 1})
+            )
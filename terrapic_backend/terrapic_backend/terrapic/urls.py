@@ -10,7 +10,7 @@ from .api import (
 
     # 場所関連のビュー
     NearbyPlacesView, PlaceSearchView, FavoriteView,
-    FavoriteStatusView, get_top_photo, place_details,
+    FavoriteStatusView, get_top_photo, top_photos, spot_photos, place_details, place_photos,
 
     # 投稿関連のビュー
     CreatePostView, LikeView, LikeStatusView, delete_post, update_post,
@@ -19,7 +19,19 @@ from .api import (
     places_ranking, posts_ranking,
 
     # 検索関連のビュー
-    search, search_suggestions
+    search, search_suggestions,
+
+    # タイル関連のビュー
+    vector_tile,
+
+    # ヒートマップ関連のビュー
+    heatmap,
+
+    # 状態取得関連のビュー
+    bulk_status,
+
+    # アップロード関連のビュー
+    create_upload_session, upload_session, finalize_upload_session
 )
 
 urlpatterns = [
@@ -36,9 +48,16 @@ urlpatterns = [
     # 場所関連のエンドポイント
     path('api/places/', NearbyPlacesView.as_view(), name='nearby_places'),
     path('api/places/<int:place_id>/top_photo/', get_top_photo, name='top_photo'),
+    path('api/places/top_photos/', top_photos, name='top_photos'),
+    path('api/places/spot_photos/', spot_photos, name='spot_photos'),
     path('api/places/<int:place_id>/details/', place_details, name='place_details'),
+    path('api/places/<int:place_id>/photos/', place_photos, name='place_photos'),
     path('api/places/<int:place_id>/favorite/', FavoriteView.as_view(), name='toggle_favorite'),
     path('api/places/<int:place_id>/favorite/status/', FavoriteStatusView.as_view(), name='favorite_status'),
+
+    # 地図タイルのエンドポイント
+    path('api/tiles/<int:z>/<int:x>/<int:y>.mvt', vector_tile, name='vector_tile'),
+    path('api/heatmap/', heatmap, name='heatmap'),
     
     # 検索関連のエンドポイント
     path('api/search/', search, name='search'),
@@ -46,11 +65,17 @@ urlpatterns = [
     
     # 投稿関連のエンドポイント
     path('api/post/create/', CreatePostView.as_view(), name='create_post'),
+    path('api/uploads/', create_upload_session, name='create_upload_session'),
+    path('api/uploads/<uuid:session_id>/', upload_session, name='upload_session'),
+    path('api/uploads/<uuid:session_id>/finalize/', finalize_upload_session, name='finalize_upload_session'),
     path('api/post_place_search/', PlaceSearchView.as_view(), name='search_place_post'),
     path('api/post/<int:post_id>/like/', LikeView.as_view(), name='toggle_like'),
     path('api/post/<int:post_id>/like/status/', LikeStatusView.as_view(), name='like_status'),
     path('api/post/<int:post_id>/delete/', delete_post, name='delete_post'),
     path('api/post/<int:post_id>/update/', update_post, name='update_post'),
+
+    # いいね・お気に入り状態の一括取得
+    path('api/status/bulk/', bulk_status, name='bulk_status'),
     
     # ランキングのエンドポイント
     path('api/ranking/places', places_ranking, name='places_ranking'),
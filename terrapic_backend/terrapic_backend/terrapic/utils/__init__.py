@@ -5,15 +5,39 @@ from .auth import (
 )
 from .validators import (
     validate_image_file,
+    detect_image_extension,
     validate_location_data,
     validate_text_length
 )
 from .helpers import (
     generate_unique_filename,
     handle_uploaded_file,
+    HashingFile,
     format_api_error,
     get_client_ip,
-    get_period_filter
+    get_period_filter,
+    encode_cursor,
+    decode_cursor,
+    build_etag,
+    etag_matches
+)
+from .geo import (
+    PointX,
+    PointY,
+    FirstByOrdering,
+    validate_zoom,
+    validate_tile,
+    validate_bbox,
+    cluster_cell_size,
+    lonlat_to_tile,
+    tile_bounds,
+    tile_to_cell,
+    cell_to_tile,
+    lonlat_to_cell,
+    cell_key_expression,
+    radius_to_degrees,
+    haversine_m,
+    SPATIAL_CELL_ZOOMS
 )
 
 __all__ = [
@@ -24,13 +48,37 @@ __all__ = [
     
     # バリデーション関連
     'validate_image_file',
+    'detect_image_extension',
     'validate_location_data',
     'validate_text_length',
     
     # ヘルパー関数
     'generate_unique_filename',
     'handle_uploaded_file',
+    'HashingFile',
     'format_api_error',
     'get_client_ip',
     'get_period_filter',
+    'encode_cursor',
+    'decode_cursor',
+    'build_etag',
+    'etag_matches',
+
+    # 地図関連
+    'PointX',
+    'PointY',
+    'FirstByOrdering',
+    'validate_zoom',
+    'validate_tile',
+    'validate_bbox',
+    'cluster_cell_size',
+    'lonlat_to_tile',
+    'tile_bounds',
+    'tile_to_cell',
+    'cell_to_tile',
+    'lonlat_to_cell',
+    'cell_key_expression',
+    'radius_to_degrees',
+    'haversine_m',
+    'SPATIAL_CELL_ZOOMS',
 ]
\ No newline at end of file
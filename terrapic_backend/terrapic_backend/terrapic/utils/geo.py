@@ -0,0 +1,276 @@
+from django.contrib.gis.db.models.functions import GeoFunc
+from django.contrib.postgres.aggregates.mixins import OrderableAggMixin
+from django.db.models import Aggregate, BigIntegerField, F, FloatField, Value
+
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Web地図で扱う最大ズームレベル
+MAX_MAP_ZOOM = 22
+# Webメルカトル図法で表現できる最大緯度
+MAX_MERCATOR_LATITUDE = 85.0511287798
+# 場所・投稿に事前計算する空間セルのズームレベル
+SPATIAL_CELL_ZOOMS = (8, 12, 16)
+# 地球の平均半径（メートル）
+EARTH_RADIUS_M = 6371008.8
+
+
+class PointX(GeoFunc):
+    """ポイントの経度（ST_X）を返すDB関数"""
+    function = 'ST_X'
+    output_field = FloatField()
+
+
+class PointY(GeoFunc):
+    """ポイントの緯度（ST_Y）を返すDB関数"""
+    function = 'ST_Y'
+    output_field = FloatField()
+
+
+class FirstByOrdering(OrderableAggMixin, Aggregate):
+    """
+    指定した並び順で先頭となる値を返す集約関数
+
+    (ARRAY_AGG(expr ORDER BY ...))[1] を生成する
+    """
+    function = 'ARRAY_AGG'
+    template = '(%(function)s(%(distinct)s%(expressions)s %(ordering)s))[1]'
+    allow_distinct = True
+
+
+def validate_zoom(zoom):
+    """
+    ズームレベルを検証して整数に変換する
+
+    Args:
+        zoom: ズームレベル（文字列または数値）
+
+    Returns:
+        int: ズームレベル
+
+    Raises:
+        ValueError: ズームレベルが不正な場合
+    """
+    zoom = int(float(zoom))
+    if not (0 <= zoom <= MAX_MAP_ZOOM):
+        raise ValueError(f'ズームレベルは0から{MAX_MAP_ZOOM}の間である必要があります。')
+    return zoom
+
+
+def cluster_cell_size(zoom, cells_per_tile):
+    """
+    ズームレベルに応じたクラスタグリッドのセルサイズ（度）を計算する
+
+    Args:
+        zoom: ズームレベル
+        cells_per_tile: 1タイルあたりの分割数
+
+    Returns:
+        float: セルの一辺の長さ（度）
+    """
+    return 360.0 / (2 ** zoom) / cells_per_tile
+
+
+def radius_to_degrees(latitude, radius_km):
+    """
+    検索半径を、インデックスで絞り込むための度単位の範囲に変換する
+
+    経度方向の1度は緯度が高いほど短くなるため、経度方向に合わせて広げる。
+    範囲は実際の半径より広くなるため、絞り込み後に実距離で判定する
+
+    Args:
+        latitude: 中心の緯度
+        radius_km: 検索半径（km）
+
+    Returns:
+        float: 範囲（度）
+    """
+    lat_degrees = radius_km / 111.32
+    lon_degrees = lat_degrees / max(math.cos(math.radians(latitude)), 0.01)
+    return min(max(lat_degrees, lon_degrees), 180.0)
+
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    """
+    2点間の大円距離（メートル）を計算する
+
+    Args:
+        lon1, lat1: 1点目の経度・緯度
+        lon2, lat2: 2点目の経度・緯度
+
+    Returns:
+        float: 距離（メートル）
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (math.sin(d_phi / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(math.sqrt(a), 1.0))
+
+
+def lonlat_to_tile(lon, lat, zoom):
+    """
+    経度・緯度をタイル座標に変換する
+
+    Args:
+        lon: 経度
+        lat: 緯度
+        zoom: ズームレベル
+
+    Returns:
+        tuple: (x, y) タイル座標
+    """
+    lat = max(min(lat, MAX_MERCATOR_LATITUDE), -MAX_MERCATOR_LATITUDE)
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(x, y, zoom):
+    """
+    タイル座標の範囲を経度・緯度で取得する
+
+    Args:
+        x: タイルのX座標
+        y: タイルのY座標
+        zoom: ズームレベル
+
+    Returns:
+        tuple: (min_lon, min_lat, max_lon, max_lat)
+    """
+    n = 2 ** zoom
+
+    def tile_lat(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return (
+        x / n * 360.0 - 180.0,
+        tile_lat(y + 1),
+        (x + 1) / n * 360.0 - 180.0,
+        tile_lat(y),
+    )
+
+
+def validate_bbox(min_lat, max_lat, min_lon, max_lon, zoom, max_tiles):
+    """
+    境界ボックスを検証し、ズームレベルに対して広すぎないかを確認する
+
+    返すセル数を抑えるため、範囲を覆うタイル数をズームレベルに応じて制限する
+
+    Args:
+        min_lat, max_lat, min_lon, max_lon: 境界ボックス
+        zoom: 地図のズームレベル
+        max_tiles: 範囲に含められるタイル数の上限
+
+    Raises:
+        ValueError: 範囲が不正、またはズームレベルに対して広すぎる場合
+    """
+    if not all(math.isfinite(v) for v in (min_lat, max_lat, min_lon, max_lon)):
+        raise ValueError('座標が不正です。')
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError('表示範囲が不正です。')
+
+    min_tile_x, min_tile_y = lonlat_to_tile(min_lon, max_lat, zoom)
+    max_tile_x, max_tile_y = lonlat_to_tile(max_lon, min_lat, zoom)
+    tile_count = (max_tile_x - min_tile_x + 1) * (max_tile_y - min_tile_y + 1)
+    if tile_count > max_tiles:
+        raise ValueError('表示範囲がズームレベルに対して広すぎます。')
+
+
+def validate_tile(zoom, x, y, max_zoom=MAX_MAP_ZOOM):
+    """
+    タイル座標を検証する
+
+    Raises:
+        ValueError: タイル座標が範囲外の場合
+    """
+    if not (0 <= zoom <= max_zoom):
+        raise ValueError(f'ズームレベルは0から{max_zoom}の間である必要があります。')
+    n = 2 ** zoom
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError('タイル座標が範囲外です。')
+
+
+def tile_to_cell(x, y, zoom):
+    """
+    タイル座標を空間セルID（モートン符号）に変換する
+
+    X・Yのビットを交互に並べるため、ズームレベルzのセルIDを
+    2 * (z - z') ビット右シフトするとズームレベルz'の親セルIDになる
+
+    Args:
+        x: タイルのX座標
+        y: タイルのY座標
+        zoom: ズームレベル
+
+    Returns:
+        int: 空間セルID
+    """
+    cell = 0
+    for bit in range(zoom):
+        cell |= ((x >> bit) & 1) << (2 * bit)
+        cell |= ((y >> bit) & 1) << (2 * bit + 1)
+    return cell
+
+
+def cell_to_tile(cell, zoom):
+    """
+    空間セルIDをタイル座標に変換する
+
+    Args:
+        cell: 空間セルID
+        zoom: ズームレベル
+
+    Returns:
+        tuple: (x, y) タイル座標
+    """
+    x = y = 0
+    for bit in range(zoom):
+        x |= ((cell >> (2 * bit)) & 1) << bit
+        y |= ((cell >> (2 * bit + 1)) & 1) << bit
+    return x, y
+
+
+def lonlat_to_cell(lon, lat, zoom):
+    """
+    経度・緯度を空間セルIDに変換する
+
+    Args:
+        lon: 経度
+        lat: 緯度
+        zoom: ズームレベル
+
+    Returns:
+        int: 空間セルID
+    """
+    x, y = lonlat_to_tile(lon, lat, zoom)
+    return tile_to_cell(x, y, zoom)
+
+
+def cell_key_expression(zoom):
+    """
+    指定したズームレベルの空間セルIDを求める式を取得する
+
+    事前計算したセルIDのうち、指定したズームレベル以上で最も粗い列を
+    親セルの単位に切り詰めるため、空間関数を使わずに整数でグループ化できる
+
+    Args:
+        zoom: セルのズームレベル
+
+    Returns:
+        tuple: (式, 実際に使用したズームレベル)
+            事前計算した最大のズームレベルを超える場合は最大のズームレベルを使用する
+    """
+    cell_zoom = next(
+        (z for z in SPATIAL_CELL_ZOOMS if z >= zoom), SPATIAL_CELL_ZOOMS[-1]
+    )
+    zoom = min(zoom, cell_zoom)
+    expression = F(f'cell_z{cell_zoom}')
+    if cell_zoom > zoom:
+        # 1ズームレベルごとにセルIDは2ビット（4倍）ずつ増える
+        expression = expression / Value(4 ** (cell_zoom - zoom), output_field=BigIntegerField())
+    return expression, zoom
@@ -1,8 +1,12 @@
 from datetime import timedelta
-from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile, File
 from django.db.models import Q
 from django.utils import timezone
 
+import base64
+import hashlib
+import json
 import uuid
 import logging
 
@@ -42,6 +46,35 @@ def handle_uploaded_file(file, directory='uploads/'):
         logger.error(f"ファイル処理中にエラー: {str(e)}")
         raise
 
+class HashingFile(File):
+    """
+    アップロードファイルをチャンク単位で読み出しながらSHA-256とサイズを計算するラッパー
+
+    ストレージへの保存時にchunks()で読み出されるのと同時にハッシュを計算し、
+    サイズの上限も検証するため、ファイル全体をメモリに保持しない
+    """
+
+    def __init__(self, file, name=None, max_size=None):
+        super().__init__(file, name or getattr(file, 'name', None))
+        self.max_size = max_size
+        self._sha256 = hashlib.sha256()
+        self.bytes_read = 0
+
+    def chunks(self, chunk_size=None):
+        # 読み出しのたびに先頭から計算し直す
+        self._sha256 = hashlib.sha256()
+        self.bytes_read = 0
+        for chunk in super().chunks(chunk_size):
+            self.bytes_read += len(chunk)
+            if self.max_size is not None and self.bytes_read > self.max_size:
+                raise ValidationError('ファイルサイズが上限を超えています。')
+            self._sha256.update(chunk)
+            yield chunk
+
+    def hexdigest(self):
+        """読み出したデータのSHA-256（16進数）を取得する"""
+        return self._sha256.hexdigest()
+
 def format_api_error(message, status_code=400):
     """
     API エラーレスポンスを整形する
@@ -101,4 +134,69 @@ def get_period_filter(period, model_name):
         return Q(created_at__gte=start_date)
     elif model_name == 'Users':
         return Q(posts__created_at__gte=start_date)
-    return Q()
\ No newline at end of file
+    return Q()
+
+def encode_cursor(data):
+    """
+    ページングのカーソルを不透明な文字列にエンコードする
+    
+    Args:
+        data: カーソルに含めるデータ（JSONに変換可能な辞書）
+        
+    Returns:
+        str: URLセーフなカーソル文字列
+    """
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    カーソル文字列をデコードする
+    
+    Args:
+        cursor: encode_cursorで生成したカーソル文字列
+        
+    Returns:
+        dict: カーソルに含まれるデータ
+        
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('カーソルが不正です。')
+    if not isinstance(data, dict):
+        raise ValueError('カーソルが不正です。')
+    return data
+
+def build_etag(*parts):
+    """
+    レスポンスの内容を決める要素から強いETagを生成する
+    
+    Args:
+        parts: バージョンや閲覧ユーザーIDなど、レスポンスの内容を決める要素
+        
+    Returns:
+        str: 引用符で囲まれたETag
+    """
+    raw = ':'.join(str(part) for part in parts).encode('utf-8')
+    return f'"{hashlib.sha1(raw).hexdigest()}"'
+
+def etag_matches(request, etag):
+    """
+    リクエストのIf-None-MatchがETagと一致するかを判定する
+    
+    Args:
+        request: リクエスト
+        etag: build_etagで生成したETag
+        
+    Returns:
+        bool: 一致する場合はTrue
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in candidates
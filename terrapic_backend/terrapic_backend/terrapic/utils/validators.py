@@ -1,13 +1,24 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
 import magic
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 画像形式（MIMEタイプ）ごとの保存時の拡張子
+IMAGE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+}
+
 def validate_image_file(file):
     """
     アップロードされた画像ファイルを検証する
     
+    ファイル形式の判定には先頭のバイト列のみを読み込むため、
+    ファイル全体をメモリに読み込まない
+    
     Args:
         file: アップロードされたファイルオブジェクト
         
@@ -16,22 +27,41 @@ def validate_image_file(file):
     """
     try:
         # ファイルサイズの検証（5MB制限）
-        if file.size > 5 * 1024 * 1024:
+        if file.size > settings.IMAGE_UPLOAD_MAX_SIZE:
             raise ValidationError('ファイルサイズは5MB以下にしてください。')
 
-        # ファイルタイプの検証
-        file_content = file.read()
-        file_type = magic.from_buffer(file_content, mime=True)
+        # ファイルタイプの検証（先頭のバイト列から判定する）
+        file.seek(0)
+        header = file.read(settings.IMAGE_SNIFF_BYTES)
         file.seek(0)  # ファイルポインタをリセット
+        file_type = magic.from_buffer(header, mime=True)
 
-        allowed_types = ['image/jpeg', 'image/png', 'image/gif']
-        if file_type not in allowed_types:
+        if file_type not in IMAGE_EXTENSIONS:
             raise ValidationError('JPG、PNG、GIF形式の画像のみアップロード可能です。')
 
+    except ValidationError:
+        raise
     except Exception as e:
         logger.error(f"画像検証中にエラー: {str(e)}")
         raise ValidationError('画像の検証中にエラーが発生しました。')
 
+def detect_image_extension(file):
+    """
+    画像の先頭のバイト列から形式を判定し、保存時の拡張子を取得する
+
+    元のファイル名ではなく内容から判定するため、拡張子と形式が食い違わない
+
+    Args:
+        file: 画像ファイルオブジェクト
+
+    Returns:
+        str: 拡張子（判定できない場合は空文字）
+    """
+    file.seek(0)
+    header = file.read(settings.IMAGE_SNIFF_BYTES)
+    file.seek(0)
+    return IMAGE_EXTENSIONS.get(magic.from_buffer(header, mime=True), '')
+
 def validate_location_data(latitude, longitude):
     """
     位置情報データを検証する
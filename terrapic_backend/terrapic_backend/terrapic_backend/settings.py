@@ -90,10 +90,12 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# 複数ワーカーで運用する場合はRedisなどの共有キャッシュを指定する
+# （タイルなどのキャッシュのバージョンをワーカー間で共有するため）
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'profile_cache',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'profile_cache'),
         'TIMEOUT': 300,  # 5分
         'OPTIONS': {
             'MAX_ENTRIES': 1000
@@ -216,6 +218,22 @@ DEFAULT_CHARSET = 'utf-8'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# アップロード画像のサイズ上限（バイト）
+IMAGE_UPLOAD_MAX_SIZE = 5 * 1024 * 1024
+# 画像のファイル形式の判定に読み込む先頭のバイト数
+IMAGE_SNIFF_BYTES = 2048
+# この値を超えるアップロードはメモリではなく一時ファイルに受信する（バイト）
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+# 再開可能なアップロードの受信中のバイト列を保存するローカルディレクトリ
+UPLOAD_SESSION_DIR = os.environ.get(
+    'UPLOAD_SESSION_DIR', os.path.join(BASE_DIR, 'upload_sessions')
+)
+# アップロードセッションの有効期限（秒）
+UPLOAD_SESSION_TIMEOUT = 24 * 60 * 60
+# 1ユーザーが同時に作成できるアップロードセッションの上限
+UPLOAD_SESSION_MAX_ACTIVE = 5
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -258,4 +276,74 @@ if not os.path.isfile(GDAL_LIBRARY_PATH):
     raise FileNotFoundError(f"GDAL library not found at {GDAL_LIBRARY_PATH}")
 
 # Google Places API設定
-GOOGLE_PLACES_API_KEY = os.environ.get('GOOGLE_PLACES_API_KEY', '')
\ No newline at end of file
+GOOGLE_PLACES_API_KEY = os.environ.get('GOOGLE_PLACES_API_KEY', '')
+
+# 地図表示の設定
+# このズームレベル未満では個々の場所ではなくクラスタを返す
+MAP_CLUSTER_MAX_ZOOM = int(os.environ.get('MAP_CLUSTER_MAX_ZOOM', 14))
+# クラスタリング時の1タイルあたりのグリッド分割数（2の累乗）
+MAP_CLUSTER_CELLS_PER_TILE = 4
+# クラスタリングの1回の取得で範囲に含められるタイル数の上限（ズームレベルごとのタイル単位）
+MAP_CLUSTER_MAX_TILES = int(os.environ.get('MAP_CLUSTER_MAX_TILES', 64))
+# 地図の場所取得APIの件数（デフォルトと上限）
+MAP_PLACES_DEFAULT_LIMIT = 200
+MAP_PLACES_MAX_LIMIT = int(os.environ.get('MAP_PLACES_MAX_LIMIT', 500))
+# 地図の場所データに含める場所ごとの撮影スポット数の上限（いいね数の多い順）
+MAP_PLACE_SPOTS_LIMIT = int(os.environ.get('MAP_PLACE_SPOTS_LIMIT', 20))
+# ベクタータイルを提供する最大ズームレベル
+MAP_TILE_MAX_ZOOM = int(os.environ.get('MAP_TILE_MAX_ZOOM', 18))
+# 生成したタイルのキャッシュ保持時間（秒）
+MAP_TILE_CACHE_TIMEOUT = 60 * 60 * 24
+# バージョン指定のないタイルのHTTPキャッシュ保持時間（秒）
+MAP_TILE_HTTP_MAX_AGE = 60
+# 境界ボックス検索の結果をタイル単位でキャッシュする際のズームレベルの範囲
+MAP_BBOX_CACHE_MIN_ZOOM = int(os.environ.get('MAP_BBOX_CACHE_MIN_ZOOM', 10))
+MAP_BBOX_CACHE_MAX_ZOOM = min(
+    int(os.environ.get('MAP_BBOX_CACHE_MAX_ZOOM', 16)), MAP_TILE_MAX_ZOOM
+)
+# 1回の検索で使用するタイル数の上限（超える場合はデータベースを直接検索する）
+MAP_BBOX_CACHE_MAX_TILES = int(os.environ.get('MAP_BBOX_CACHE_MAX_TILES', 16))
+# 1タイルにキャッシュする場所数の上限（超えるタイルを含む検索はデータベースを直接検索する）
+MAP_BBOX_CACHE_TILE_MAX_PLACES = int(os.environ.get('MAP_BBOX_CACHE_TILE_MAX_PLACES', 200))
+
+# ヒートマップの1タイルあたりのグリッド分割数（2の累乗）
+MAP_HEATMAP_CELLS_PER_TILE = 16
+# ヒートマップの1回の取得で範囲に含められるタイル数の上限（ズームレベルごとのタイル単位）
+MAP_HEATMAP_MAX_TILES = int(os.environ.get('MAP_HEATMAP_MAX_TILES', 64))
+
+# ホーム画面の近くの場所の取得件数
+NEARBY_PLACES_LIMIT = int(os.environ.get('NEARBY_PLACES_LIMIT', 50))
+
+# 場所の詳細画面の写真一覧の取得件数（デフォルトと上限）
+PLACE_PHOTOS_PAGE_SIZE = 20
+PLACE_PHOTOS_MAX_PAGE_SIZE = 100
+# トップ写真の一括取得APIで指定できる場所IDの上限
+TOP_PHOTOS_MAX_IDS = int(os.environ.get('TOP_PHOTOS_MAX_IDS', 100))
+# いいね・お気に入り状態の一括取得APIで指定できるIDの上限（投稿・場所それぞれ）
+STATUS_BULK_MAX_IDS = int(os.environ.get('STATUS_BULK_MAX_IDS', 200))
+# 撮影位置から写真を探す際の許容半径（メートル）
+PHOTO_SPOT_MATCH_RADIUS = float(os.environ.get('PHOTO_SPOT_MATCH_RADIUS', 25))
+# 撮影スポットの写真の一括取得APIで指定できる撮影位置の上限
+SPOT_PHOTOS_MAX_SPOTS = int(os.environ.get('SPOT_PHOTOS_MAX_SPOTS', 100))
+# 場所の詳細情報（閲覧ユーザーに依存しない部分）のキャッシュ保持時間（秒）
+PLACE_DETAILS_CACHE_TIMEOUT = 60 * 60
+
+# 投稿写真の縮小画像の種類と長辺の最大ピクセル数
+POST_PHOTO_RENDITIONS = {
+    'thumb': 320,
+    'card': 720,
+    'full': 1600,
+}
+# 縮小画像のJPEG品質
+POST_PHOTO_RENDITION_QUALITY = 85
+# 向きを補正した元画像を保存し直す際のJPEG品質
+POST_PHOTO_INGEST_QUALITY = 95
+# 縮小画像を生成するバックグラウンドスレッド数（1プロセスあたり）
+POST_PHOTO_RENDITION_WORKERS = int(os.environ.get('POST_PHOTO_RENDITION_WORKERS', 2))
+# 縮小画像の生成前（メタデータの除去前）に元画像の代わりに返す画像（静的ファイル）
+POST_PHOTO_PLACEHOLDER = 'terrapic/photo_processing.png'
+# 縮小画像の生成をこの回数失敗した投稿はgenerate_renditionsコマンドで再処理しない
+POST_PHOTO_RENDITION_MAX_ATTEMPTS = 3
+
+# 期間指定のランキングのETagを更新する間隔（秒）
+RANKING_ETAG_WINDOW = 60 * 60